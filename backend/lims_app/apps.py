@@ -11,3 +11,8 @@ class LimsAppConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "lims_app"
+
+    def ready(self) -> None:
+        from . import signals
+
+        signals.connect()
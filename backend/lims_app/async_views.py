@@ -0,0 +1,112 @@
+"""
+Async read path for high-traffic viewsets.
+
+Django REST Framework views are synchronous, so under ASGI each request
+occupies a worker thread for its whole duration, including the wait for a
+slow list query.  `AsyncReadMixin` gives a viewset native `async` list and
+retrieve handlers built on Django's async ORM:
+
+* the filtered `values()` query of the fast list path (see `fieldsets.py`)
+  is iterated with `async for`, and pages come from
+  `KeysetPagination.apaginate_queryset`;
+* retrieve fetches one row with `afirst()`;
+* everything else — writes, other actions, `?expand=` reads and serializers
+  without a `values()` fast path — is handed to the regular synchronous
+  view through `sync_to_async`, so behaviour is unchanged.
+
+The async routes are only installed when `LIMS_ASYNC_READS` is enabled, which
+`lims_backend/asgi.py` does by default.  WSGI deployments keep plain
+synchronous views, since an async view under WSGI pays for an event loop on
+every request.  `python manage.py benchmark_async` compares the two.
+"""
+
+from __future__ import annotations
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+from rest_framework.response import Response
+
+from .fieldsets import render_rows
+
+ASYNC_ACTIONS = {"list": "alist", "retrieve": "aretrieve"}
+
+
+class AsyncReadMixin:
+    """Viewset mixin serving GET list/retrieve from async handlers.
+
+    Must be combined with `SparseFieldsetMixin` (as in `LimsModelViewSet`),
+    whose column mapping and `values()` query it reuses.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.LIMS_ASYNC_READS or actions.get("get") not in ASYNC_ACTIONS:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method == "GET":
+                self = cls(**initkwargs)
+                self.action_map = actions
+                response = await self.adispatch(request, *args, **kwargs)
+                if response is not None:
+                    return response
+            return await sync_view(request, *args, **kwargs)
+
+        for name in ("cls", "initkwargs", "actions", "csrf_exempt"):
+            setattr(async_view, name, getattr(view, name))
+        return async_view
+
+    def supports_async_read(self) -> bool:
+        paginator = self.paginator
+        if paginator is not None and not hasattr(paginator, "apaginate_queryset"):
+            return False
+        return self._fast_columns() is not None
+
+    async def adispatch(self, request, *args, **kwargs):
+        """`APIView.dispatch` for the async actions.
+
+        Returns `None` when the request has to be served by the sync view.
+        """
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            # Authentication may load the session user from the database.
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if not self.supports_async_read():
+                return None
+            handler = getattr(self, ASYNC_ACTIONS[self.action])
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        columns = self._fast_columns()
+        rows = self._values(columns)
+        page = None
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(rows, request, view=self)
+        if page is None:
+            return Response(render_rows([row async for row in rows], columns))
+        return self.get_paginated_response(render_rows(page, columns))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        columns = self._fast_columns()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        rows = self._values(columns, ordering=False)
+        try:
+            row = await rows.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}).afirst()
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        if row is None:
+            raise Http404(f"No {rows.model._meta.object_name} matches the given query.")
+        return Response(render_rows([row], columns)[0])
@@ -0,0 +1,460 @@
+"""
+Append-only audit log of every change to the LIMS tables.
+
+Saving or deleting a row of any `lims_app` model records an `AuditEntry`:
+the model, the primary key, the action, the user and request that made the
+change (set by `AuditMiddleware`) and, per changed field, `[old, new]`.
+Audited models derive from `models.LimsModel`; the log itself and tables
+derived from others do not.  Old values are the column values the instance
+was loaded with, which `LimsModel.from_db()` keeps by reference, so reads
+cost nothing extra and an update costs no extra query.  An update that
+changes nothing but `auto_now` timestamps records nothing, and a field that
+was deferred when the row was loaded (or an instance that was never loaded)
+is recorded with an old value of `null`.  Signal handlers in `signals.py`
+cover single saves and deletes (including cascades); the bulk result and
+intake endpoints, which write without signals, call `objects_saved()`
+directly.  Set-based `update()`s of derived or workflow columns (stock
+levels, re-graded verdicts, work queue claims, the maintenance sweep) are
+not audited.
+
+Entries are not written by the request that produced them.  When its
+transaction commits they are appended to a spill file
+(`LIMS_AUDIT["SPILL_DIR"]`, one JSON line per entry, one file per process)
+and to an in-memory buffer, which a background thread writes with one
+`bulk_create` every `FLUSH_INTERVAL` seconds, or as soon as `BATCH_SIZE`
+entries are waiting.  Before writing a batch the thread renames the spill
+file aside, and deletes it once the batch is committed.  If the process dies
+or the database is unavailable the file stays behind and is replayed by a
+later flush, by the next process to start, or by `manage.py
+maintain_audit_log`.  Every entry carries a UUID that is unique in the table,
+so a batch written just before a crash is not written twice.  Buffered
+entries are flushed at exit; with `ASYNC` off they are written when the
+transaction commits instead, without the thread or the spill file.
+
+On PostgreSQL the migration creates the table partitioned by range of
+`occurred_at`, one partition per calendar month (UTC) named
+`lims_app_auditentry_yYYYYmMM` plus a default partition.  The writer creates
+the partition of a month before writing its first entry, and
+`maintain_audit_log` creates those of the coming months ahead of time.
+Queries bounded in time only read the partitions they cover, and old months
+can be detached or dropped whole.  SQLite has no partitioning; there the
+`(occurred_at)` and `(model, object_pk, occurred_at)` indexes keep the same
+queries range scans.  On both, triggers reject updates and deletes, except
+deletes on a connection inside `purging()`, which the `flush` command (and so
+test teardown) uses.  `audit-log/` lists the entries, read-only.
+"""
+
+from __future__ import annotations
+
+import atexit
+import datetime
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, close_old_connections, connection, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+Entry = models.AuditEntry
+TABLE = Entry._meta.db_table
+
+_MISSING = object()
+
+_request: ContextVar = ContextVar("lims_audit_request", default=None)
+
+
+def audited_models() -> list:
+    return [model for model in apps.get_app_config("lims_app").get_models() if issubclass(model, models.LimsModel)]
+
+
+class AuditMiddleware:
+    """Make the current request available to the entries it produces."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+    async def __acall__(self, request):
+        token = _request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.reset(token)
+
+
+def _source() -> tuple[Optional[str], str]:
+    """(actor, request) of the change being recorded."""
+
+    request = _request.get()
+    if request is None:
+        return None, ""
+    user = getattr(request, "user", None)
+    actor = user.get_username()[:150] if user is not None and user.is_authenticated else None
+    return actor, f"{request.method} {request.path}"[:255]
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def remember(instance) -> None:
+    """Make the current field values the ones later saves are diffed against."""
+
+    values = instance.__dict__
+    names = [field.attname for field in instance._meta.concrete_fields if field.attname in values]
+    instance._loaded_row = (names, [values[name] for name in names])
+
+
+def _changes(instance, action: str) -> dict:
+    values = instance.__dict__
+    names, row = values.get("_loaded_row") or ((), ())
+    loaded = dict(zip(names, row))
+    changes = {}
+    for field in instance._meta.concrete_fields:
+        new = values.get(field.attname, _MISSING)
+        if new is _MISSING:
+            continue
+        if action == Entry.CREATE:
+            changes[field.name] = [None, _jsonable(new)]
+        elif action == Entry.DELETE:
+            changes[field.name] = [_jsonable(new), None]
+        elif getattr(field, "auto_now", False):
+            continue
+        else:
+            old = loaded.get(field.attname)
+            try:
+                same = old == new and field.attname in loaded
+            except TypeError:
+                same = False
+            if not same:
+                changes[field.name] = [_jsonable(old), _jsonable(new)]
+    return changes
+
+
+def _entries(objs: Iterable, action: str) -> list[dict]:
+    actor, request = _source()
+    occurred_at = timezone.now().isoformat()
+    entries = []
+    for obj in objs:
+        changes = _changes(obj, action)
+        if changes:
+            entries.append({
+                "entry_id": uuid.uuid4().hex,
+                "occurred_at": occurred_at,
+                "model": obj._meta.label_lower,
+                "object_pk": str(obj.pk),
+                "action": action,
+                "actor": actor,
+                "request": request,
+                "changes": changes,
+            })
+        remember(obj)
+    return entries
+
+
+def _submit(entries: list[dict]) -> None:
+    if entries:
+        transaction.on_commit(lambda: writer.submit(entries))
+
+
+def objects_saved(objs: Iterable, created: bool) -> None:
+    """Record the creation, or the changes since loading, of saved objects."""
+
+    if settings.LIMS_AUDIT["ENABLED"]:
+        _submit(_entries(objs, Entry.CREATE if created else Entry.UPDATE))
+
+
+def objects_deleted(objs: Iterable) -> None:
+    if settings.LIMS_AUDIT["ENABLED"]:
+        _submit(_entries(objs, Entry.DELETE))
+
+
+# PostgreSQL monthly partitions known to exist, as (year, month).
+_partitions: set[tuple[int, int]] = set()
+
+
+def _month_start(year: int, month: int) -> datetime.datetime:
+    return datetime.datetime(year + (month - 1) // 12, (month - 1) % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def upcoming_months(count: int) -> list[tuple[int, int]]:
+    """This month and the `count` months after it, as (year, month)."""
+
+    now = timezone.now().astimezone(datetime.timezone.utc)
+    starts = (_month_start(now.year, now.month + offset) for offset in range(count + 1))
+    return [(start.year, start.month) for start in starts]
+
+
+def ensure_partitions(months: Iterable[tuple[int, int]]) -> None:
+    """Create the monthly partitions of `months` that may not exist yet.
+
+    PostgreSQL only.  A month whose rows already went to the default
+    partition cannot get its own; its rows stay where they are.
+    """
+
+    missing = sorted(set(months) - _partitions)
+    if not missing:
+        return
+    with connection.cursor() as cursor:
+        for year, month in missing:
+            name = f"{TABLE}_y{year:04d}m{month:02d}"
+            start, end = _month_start(year, month), _month_start(year, month + 1)
+            try:
+                with transaction.atomic():
+                    cursor.execute(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE}"
+                        f" FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                    )
+            except DatabaseError:
+                logger.warning("Could not create audit log partition %s", name, exc_info=True)
+            _partitions.add((year, month))
+
+
+def install_purge_check(sender, connection, **kwargs) -> None:
+    """`connection_created` handler giving SQLite's delete trigger its check."""
+
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(
+            "lims_audit_purging", 0, lambda: bool(getattr(connection, "audit_purging", False))
+        )
+
+
+@contextmanager
+def purging(using: str = DEFAULT_DB_ALIAS):
+    """Let the block delete audit entries on the `using` connection.
+
+    For `manage.py flush` and test teardown; everything else stays append-only.
+    """
+
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('lims.audit_purge', 'on', false)")
+    connection.audit_purging = True
+    try:
+        yield
+    finally:
+        connection.audit_purging = False
+        if connection.vendor == "postgresql" and connection.connection is not None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('lims.audit_purge', 'off', false)")
+
+
+def write(entries: list[dict]) -> None:
+    """Insert captured entries; entries already in the table are skipped."""
+
+    objs = [Entry(**{**entry, "occurred_at": parse_datetime(entry["occurred_at"])}) for entry in entries]
+    if connection.vendor == "postgresql":
+        utc = (obj.occurred_at.astimezone(datetime.timezone.utc) for obj in objs)
+        ensure_partitions({(moment.year, moment.month) for moment in utc})
+    Entry.objects.bulk_create(objs, batch_size=settings.LIMS_BULK_BATCH_SIZE, ignore_conflicts=True)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class AuditWriter:
+    """Per-process buffer of entries, written by a background thread.
+
+    Spill files are named `audit-<pid>.jsonl` while being appended to and
+    `audit-<pid>-<random>.batch` once set aside for writing.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()
+        self._wake = threading.Event()
+        self._pid: Optional[int] = None
+        self._buffer: list[dict] = []
+        self._spill = None
+        self._pending = True
+
+    def _path(self, pid: int, batch: Optional[str] = None) -> str:
+        name = f"audit-{pid}.jsonl" if batch is None else f"audit-{pid}-{batch}.batch"
+        return os.path.join(settings.LIMS_AUDIT["SPILL_DIR"], name)
+
+    def _set_aside(self, path: str) -> Optional[str]:
+        """Rename a spill file to a new batch of this process's."""
+
+        # Random, so that a batch left by an earlier process with the same pid
+        # is never overwritten.
+        target = self._path(os.getpid(), uuid.uuid4().hex)
+        try:
+            os.replace(path, target)
+        except FileNotFoundError:
+            return None
+        return target
+
+    def _start(self) -> None:
+        # Called with the lock held, in a new process or after a fork.
+        self._pid = os.getpid()
+        self._buffer = []
+        self._spill = None
+        self._pending = True
+        os.makedirs(settings.LIMS_AUDIT["SPILL_DIR"], exist_ok=True)
+        # A file under our pid was left by an earlier process that had it.
+        self._set_aside(self._path(self._pid))
+        threading.Thread(target=self._run, name="lims-audit-writer", daemon=True).start()
+
+    def submit(self, entries: list[dict]) -> None:
+        if not settings.LIMS_AUDIT["ASYNC"]:
+            write(entries)
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            if self._spill is None:
+                self._spill = open(self._path(self._pid), "a", encoding="utf-8")
+            self._spill.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            self._spill.flush()
+            if settings.LIMS_AUDIT["FSYNC"]:
+                os.fsync(self._spill.fileno())
+            self._buffer.extend(entries)
+            full = len(self._buffer) >= settings.LIMS_AUDIT["BATCH_SIZE"]
+        if full:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(settings.LIMS_AUDIT["FLUSH_INTERVAL"])
+            self._wake.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit log flush failed")
+            finally:
+                close_old_connections()
+
+    def flush(self) -> int:
+        """Write the buffered entries, then any spill files left behind.
+
+        Returns the number of entries written.
+        """
+
+        with self._flushing:
+            with self._lock:
+                if self._pid != os.getpid():
+                    batch, path = [], None
+                else:
+                    batch, self._buffer = self._buffer, []
+                    path = None
+                    if self._spill is not None:
+                        self._spill.close()
+                        self._spill = None
+                        path = self._set_aside(self._path(self._pid))
+            written = 0
+            if batch:
+                try:
+                    write(batch)
+                except Exception:
+                    logger.exception("Could not write %d audit entries; they are kept in %s", len(batch), path)
+                    self._pending = True
+                    return 0
+                written = len(batch)
+                if path is not None:
+                    os.remove(path)
+            if self._pending:
+                replayed, self._pending = self._replay()
+                written += replayed
+            return written
+
+    def _replay(self) -> tuple[int, bool]:
+        """Write the spill files of this process and of dead ones.
+
+        Returns the number of entries written and whether some file could
+        not be written.
+        """
+
+        pid = os.getpid()
+        written, failed = 0, False
+        for path in sorted(glob.glob(os.path.join(settings.LIMS_AUDIT["SPILL_DIR"], "audit-*"))):
+            try:
+                owner = int(os.path.basename(path).split("-")[1].split(".")[0])
+            except ValueError:
+                continue
+            if owner == pid:
+                if not path.endswith(".batch"):
+                    continue
+            elif _alive(owner):
+                continue
+            else:
+                # Claim the file, unless another process got there first.
+                path = self._set_aside(path)
+                if path is None:
+                    continue
+            with open(path, encoding="utf-8") as spill:
+                # A crash can cut the last line short; that entry was never committed.
+                entries = []
+                for line in spill:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        logger.warning("Skipping a truncated audit entry in %s", path)
+            try:
+                if entries:
+                    write(entries)
+            except Exception:
+                logger.exception("Could not replay audit spill file %s", path)
+                failed = True
+                continue
+            os.remove(path)
+            written += len(entries)
+        return written, failed
+
+
+writer = AuditWriter()
+
+
+def flush() -> int:
+    """Write everything buffered or spilled; returns the number of entries."""
+
+    return writer.flush()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    if writer._pid == os.getpid():
+        try:
+            writer.flush()
+        except Exception:
+            logger.exception("Could not flush the audit log at exit")
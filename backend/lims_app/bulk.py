@@ -0,0 +1,179 @@
+"""
+Batch writes of sample test results.
+
+Instruments report results in batches of thousands, so the bulk endpoint on
+`SampleTestLinkViewSet` avoids the per-row costs of the regular CRUD path:
+
+* rows are validated by a single `ListSerializer` whose foreign keys are
+  plain integers, so validation itself issues no queries;
+* foreign keys to `Sample` and `Test` are then checked for the whole batch
+  with one `pk__in` lookup per table (tests come from the lookup cache);
+* pass/fail verdicts are computed for the whole batch from one query for
+  the referenced tests' limits (see `evaluation.py`);
+* writes use `bulk_create` / `bulk_update` / a single `DELETE ... WHERE id IN`
+  inside one transaction, with the result statistics adjusted by one
+  aggregated delta per affected key (see `result_stats.py`) and the
+  assigned and completed tests appended to the samples' chain of custody
+  (see `custody.py`) and the changes to the audit log (see `audit.py`).
+
+Batches are all-or-nothing: if any row is invalid nothing is written and the
+response maps each failing row's index in the request to its errors.
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from . import audit, custody, models, result_stats
+from .evaluation import evaluate_objects
+from .lookup_cache import lookups
+from .serializers import SampleTestLinkBulkSerializer
+
+# Foreign keys checked set-based: serializer field name -> (attname, model).
+RESULT_FOREIGN_KEYS = {
+    "sample": ("sample_id", models.Sample),
+    "test": ("test_id", models.Test),
+}
+
+
+def check_batch(rows, what: str = "rows") -> None:
+    if not isinstance(rows, list):
+        raise ValidationError({"detail": f"Expected a list of {what}."})
+    if not rows:
+        raise ValidationError({"detail": f"Expected at least one of {what}."})
+    limit = settings.LIMS_BULK_MAX_ROWS
+    if len(rows) > limit:
+        raise ValidationError({"detail": f"At most {limit} {what} may be sent per request."})
+
+
+def raise_row_errors(errors: dict[int, dict]) -> None:
+    if errors:
+        raise ValidationError({"errors": {index: errors[index] for index in sorted(errors)}})
+
+
+def _missing_foreign_keys(validated: dict[int, dict]) -> dict[int, dict]:
+    """Return per-row errors for foreign keys that do not exist.
+
+    `validated` maps row index to validated data; each referenced table is
+    queried at most once for the whole batch.
+    """
+
+    errors: dict[int, dict] = {}
+    for name, (attname, model) in RESULT_FOREIGN_KEYS.items():
+        wanted = {data[attname] for data in validated.values() if attname in data}
+        if not wanted:
+            continue
+        if lookups.is_cached(model):
+            existing = set(lookups.get_many(model, wanted))
+        else:
+            existing = set(model.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+        for index, data in validated.items():
+            if attname in data and data[attname] not in existing:
+                errors.setdefault(index, {})[name] = [
+                    f'Invalid pk "{data[attname]}" - object does not exist.'
+                ]
+    return errors
+
+
+def _validate(rows, partial: bool) -> dict[int, dict]:
+    serializer = SampleTestLinkBulkSerializer(data=rows, many=True, partial=partial)
+    if not serializer.is_valid():
+        row_errors = serializer.errors
+        # Older DRF releases report a list aligned with the input rows.
+        if isinstance(row_errors, list):
+            row_errors = dict(enumerate(row_errors))
+        raise_row_errors({index: errors for index, errors in row_errors.items() if errors})
+    validated = dict(enumerate(serializer.validated_data))
+    raise_row_errors(_missing_foreign_keys(validated))
+    return validated
+
+
+def bulk_create_results(rows) -> list[int]:
+    """Insert a batch of results and return the new primary keys."""
+
+    check_batch(rows, "results")
+    validated = _validate(rows, partial=False)
+    objs = [models.SampleTestLink(**validated[index]) for index in range(len(rows))]
+    evaluate_objects(objs)
+    with transaction.atomic():
+        created = models.SampleTestLink.objects.bulk_create(
+            objs, batch_size=settings.LIMS_BULK_BATCH_SIZE
+        )
+        result_stats.results_created(created)
+        custody.results_saved(created, created=True)
+        audit.objects_saved(created, created=True)
+    return [obj.pk for obj in created]
+
+
+def bulk_update_results(rows) -> int:
+    """Apply partial updates to a batch of results identified by `id`.
+
+    Returns the number of rows updated.
+    """
+
+    check_batch(rows, "results")
+    errors: dict[int, dict] = {}
+    ids: list[int] = []
+    for index, row in enumerate(rows):
+        pk = row.get("id") if isinstance(row, dict) else None
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            errors[index] = {"id": ["An integer id is required for updates."]}
+        ids.append(pk)
+    raise_row_errors(errors)
+    validated = _validate(rows, partial=True)
+
+    with transaction.atomic():
+        existing = models.SampleTestLink.objects.select_for_update().in_bulk(ids)
+        for index, pk in enumerate(ids):
+            if pk not in existing:
+                errors[index] = {"id": [f'Invalid pk "{pk}" - object does not exist.']}
+        raise_row_errors(errors)
+
+        fields: set[str] = set()
+        for index, pk in enumerate(ids):
+            obj = existing[pk]
+            for attname, value in validated[index].items():
+                setattr(obj, attname, value)
+                fields.add(attname)
+        if not fields:
+            return 0
+        objs = [existing[pk] for pk in dict.fromkeys(ids)]
+        if fields & {"test_result", "test_id"}:
+            evaluate_objects(objs)
+            fields.add("pass_or_fail")
+        updated = models.SampleTestLink.objects.bulk_update(
+            objs,
+            sorted(fields),
+            batch_size=settings.LIMS_BULK_BATCH_SIZE,
+        )
+        result_stats.results_changed(objs)
+        custody.results_saved(objs, created=False)
+        audit.objects_saved(objs, created=False)
+        return updated
+
+
+def bulk_delete_results(ids) -> int:
+    """Delete a batch of results by primary key and return the count."""
+
+    check_batch(ids, "ids")
+    errors = {
+        index: {"id": ["An integer id is required."]}
+        for index, pk in enumerate(ids)
+        if not isinstance(pk, int) or isinstance(pk, bool)
+    }
+    raise_row_errors(errors)
+    with transaction.atomic():
+        queryset = models.SampleTestLink.objects.filter(pk__in=ids)
+        rows = list(queryset.values_list("pk", "sample_id", "sample__product_name"))
+        existing = {pk for pk, _, _ in rows}
+        errors = {
+            index: {"id": [f'Invalid pk "{pk}" - object does not exist.']}
+            for index, pk in enumerate(ids)
+            if pk not in existing
+        }
+        raise_row_errors(errors)
+        with result_stats.batched(names={sample_id: name for _, sample_id, name in rows}):
+            queryset.delete()
+    return len(existing)
@@ -0,0 +1,70 @@
+"""
+Conditional GET (`ETag` / `Last-Modified`) for reference-data endpoints.
+
+Lists such as SOPs and locations change rarely but are fetched on every page
+mount.  Viewsets using `ConditionalGetMixin` answer list and retrieve
+requests by first reading the `TableVersion` stamps of the tables the
+response depends on (one query).  The stamps, the request path and the
+`Accept` header are hashed into an `ETag`; if the client's `If-None-Match`
+(or `If-Modified-Since`) shows its copy is current, a `304 Not Modified` is
+returned without running the queryset or serializer.
+
+Responses carry `Cache-Control: no-cache`, so browsers keep the body but
+revalidate it on every use.
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import TableVersion
+
+
+class ConditionalGetMixin:
+    """Viewset mixin adding `ETag`/`Last-Modified` validation to reads.
+
+    The view's own model is always tracked; `etag_models` lists further
+    models whose changes alter the response (for example through
+    `?expand=`).  Every tracked model must be in `signals.VERSIONED_MODELS`.
+    """
+
+    etag_models: tuple = ()
+
+    def get_validators(self, request) -> tuple[str, int | None]:
+        tracked = [self.queryset.model, *self.etag_models]
+        stamps = TableVersion.current(tracked)
+        versions = []
+        last_modified = None
+        for model in tracked:
+            stamp = stamps.get(model._meta.label_lower)
+            versions.append(f"{model._meta.label_lower}:{stamp.version if stamp else 0}")
+            if stamp and (last_modified is None or stamp.updated_at > last_modified):
+                last_modified = stamp.updated_at
+        key = "|".join([*versions, request.get_full_path(), request.META.get("HTTP_ACCEPT", "")])
+        etag = '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+        # HTTP dates have one-second resolution.
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def conditional(self, request, render):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = render()
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            response["Cache-Control"] = "no-cache"
+            patch_vary_headers(response, ["Accept"])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,300 @@
+"""
+Chain of custody: a precomputed event timeline per sample.
+
+Custody is spread over several tables: the sample's receipt time, location
+and warehouse, the action log (`UserSampleAction`), its tests and the
+shipments leaving its warehouse.  Rather than reassembling it on every
+read, each step is appended to `CustodyEvent` as it is written:
+
+* a new sample is *received* into its location and warehouse; a later save
+  that changes the location or warehouse records a *move* or *transfer*,
+  diffed against the values the sample was loaded with;
+* a new action log entry records who *handled* the sample, and naming an
+  aliquoting analyst records the *aliquoting*;
+* a new test link records the *test assignment*, and setting `completed_at`
+  the *completion* with its verdict.
+
+Signal handlers in `signals.py` cover single saves; the bulk sample intake
+and bulk result endpoints call the batch functions here directly, so a
+batch appends its events with one `bulk_create`.  Events of steps whose
+time the schema does not record (action log entries, test assignments) are
+stamped with the time they were written.
+
+`timeline()` answers `samples/{id}/custody/` with three indexed queries
+whatever the length of the history: the sample, its events (a range scan
+of `custody_sample_time_idx`) and the shipments that left each warehouse
+while it held the sample (`shipment_warehouse_time_idx`), the first
+`LIMS_CUSTODY["MAX_SHIPMENTS"]` of them.  Shipments are not linked to
+individual samples in the schema, so they are joined in by warehouse and
+time rather than stored as events.
+
+`rebuild()` (`manage.py rebuild_custody_events`) recreates the events from
+the current rows; history that was never recorded (earlier locations) is
+lost, and undated steps are placed at the sample's receipt time.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from . import models
+
+Event = models.CustodyEvent
+SHIPPED = "shipped"
+
+_MISSING = object()
+
+
+def _append(events: list[dict]) -> None:
+    if events:
+        models.CustodyEvent.objects.bulk_create(
+            [Event(**event) for event in events], batch_size=settings.LIMS_BULK_BATCH_SIZE
+        )
+
+
+# Each helper below returns the fields of one event.
+
+
+def _received(sample) -> dict:
+    return {
+        "sample_id": sample.pk,
+        "occurred_at": sample.time_received,
+        "event_type": Event.RECEIVED,
+        "location_id": sample.location_id,
+        "warehouse_id": sample.warehouse_id,
+    }
+
+
+def _handled(action, occurred_at) -> dict:
+    return {
+        "sample_id": action.sample_id,
+        "occurred_at": occurred_at,
+        "event_type": Event.HANDLED,
+        "actor": action.receiving_analyst,
+        "detail": f"Logged by user {action.user_account_id}",
+    }
+
+
+def _aliquoted(action, occurred_at) -> dict:
+    return {
+        "sample_id": action.sample_id,
+        "occurred_at": occurred_at,
+        "event_type": Event.ALIQUOTED,
+        "actor": action.aliquoting_analyst,
+    }
+
+
+def _assigned(result, occurred_at) -> dict:
+    return {
+        "sample_id": result.sample_id,
+        "occurred_at": occurred_at,
+        "event_type": Event.TEST_ASSIGNED,
+        "sample_test_link_id": result.pk,
+        "detail": f"Test {result.test_id}, due {result.deadline:%Y-%m-%d %H:%M}",
+    }
+
+
+def _completed(result) -> dict:
+    verdict = "pass" if result.pass_or_fail else "fail"
+    return {
+        "sample_id": result.sample_id,
+        "occurred_at": result.completed_at,
+        "event_type": Event.TEST_COMPLETED,
+        "actor": result.testing_analyst,
+        "sample_test_link_id": result.pk,
+        "detail": f"Test {result.test_id}: {result.test_result} ({verdict})",
+    }
+
+
+def samples_saved(samples: Iterable[models.Sample], created: bool) -> None:
+    """Record the receipt of new samples or the moves of updated ones."""
+
+    now = timezone.now()
+    events = []
+    for sample in samples:
+        current = (sample.location_id, sample.warehouse_id)
+        loaded = getattr(sample, "_loaded_custody", None)
+        if created:
+            events.append(_received(sample))
+        elif loaded is not None:
+            if loaded[0] != current[0]:
+                events.append({
+                    "sample_id": sample.pk,
+                    "occurred_at": now,
+                    "event_type": Event.MOVED,
+                    "location_id": current[0],
+                    "detail": f"From location {loaded[0]} to location {current[0]}",
+                })
+            if loaded[1] != current[1]:
+                events.append({
+                    "sample_id": sample.pk,
+                    "occurred_at": now,
+                    "event_type": Event.TRANSFERRED,
+                    "warehouse_id": current[1],
+                    "detail": f"From warehouse {loaded[1]} to warehouse {current[1]}",
+                })
+        sample._loaded_custody = current
+    _append(events)
+
+
+def actions_saved(actions: Iterable[models.UserSampleAction], created: bool) -> None:
+    """Record new action log entries and newly named aliquoting analysts."""
+
+    now = timezone.now()
+    events = []
+    for action in actions:
+        loaded = None if created else getattr(action, "_loaded_aliquoting", _MISSING)
+        if created:
+            events.append(_handled(action, now))
+        if action.aliquoting_analyst and loaded is not _MISSING and loaded != action.aliquoting_analyst:
+            events.append(_aliquoted(action, now))
+        action._loaded_aliquoting = action.aliquoting_analyst
+    _append(events)
+
+
+def results_saved(results: Iterable[models.SampleTestLink], created: bool) -> None:
+    """Record new test assignments and tests that were just completed."""
+
+    now = timezone.now()
+    events = []
+    for result in results:
+        loaded = None if created else getattr(result, "_loaded_completed_at", _MISSING)
+        if created:
+            events.append(_assigned(result, now))
+        if result.completed_at is not None and loaded is None:
+            events.append(_completed(result))
+        result._loaded_completed_at = result.completed_at
+    _append(events)
+
+
+def _warehouse_periods(events: list[dict]) -> list[tuple]:
+    """(warehouse, start, end) spans during which the sample was held."""
+
+    periods = []
+    for event in events:
+        if event["event_type"] in (Event.RECEIVED, Event.TRANSFERRED) and event["warehouse"] is not None:
+            if periods:
+                periods[-1][2] = event["occurred_at"]
+            periods.append([event["warehouse"], event["occurred_at"], None])
+    return [tuple(period) for period in periods]
+
+
+def _shipments(periods: list[tuple]) -> list[dict]:
+    if not periods:
+        return []
+    held = Q()
+    for warehouse, start, end in periods:
+        span = Q(warehouse_id=warehouse, shipping_time__gte=start)
+        held |= span & Q(shipping_time__lt=end) if end is not None else span
+    rows = models.WarehouseClientLink.objects.filter(held).order_by("shipping_time", "id")
+    rows = rows.values(
+        "id", "warehouse_id", "client_id", "quantity_shipped", "delivery_service", "shipping_time", "delivery_time"
+    )
+    return [
+        {
+            "occurred_at": row["shipping_time"],
+            "event_type": SHIPPED,
+            "actor": None,
+            "detail": (
+                f"{row['quantity_shipped']} unit(s) to client {row['client_id']} by "
+                f"{row['delivery_service']}, delivered {row['delivery_time']:%Y-%m-%d %H:%M}"
+            ),
+            "location": None,
+            "warehouse": row["warehouse_id"],
+            "sample_test_link": None,
+            "shipment": row["id"],
+        }
+        for row in rows[:settings.LIMS_CUSTODY["MAX_SHIPMENTS"]]
+    ]
+
+
+def timeline(sample_id: int) -> dict:
+    """The custody history of one sample, oldest first."""
+
+    sample = (
+        models.Sample.objects.filter(pk=sample_id)
+        .values("id", "product_name", "sample_type", "time_received", "location_id", "warehouse_id")
+        .first()
+    )
+    if sample is None:
+        raise NotFound(f"No sample with id {sample_id}.")
+    events = list(
+        models.CustodyEvent.objects.filter(sample_id=sample_id)
+        .order_by("occurred_at", "id")
+        .values(
+            "occurred_at",
+            "event_type",
+            "actor",
+            "detail",
+            "location",
+            "warehouse",
+            "sample_test_link",
+        )
+    )
+    for event in events:
+        event["shipment"] = None
+    entries = events + _shipments(_warehouse_periods(events))
+    entries.sort(key=lambda entry: entry["occurred_at"])
+    return {
+        "sample": sample["id"],
+        "product_name": sample["product_name"],
+        "sample_type": sample["sample_type"],
+        "location": sample["location_id"],
+        "warehouse": sample["warehouse_id"],
+        "events": entries,
+    }
+
+
+def rebuild() -> int:
+    """Recreate every custody event from the current rows.
+
+    Returns the number of events written.
+    """
+
+    batch_size = settings.LIMS_BULK_BATCH_SIZE
+    written = 0
+    batch = []
+
+    def add(fields: dict) -> None:
+        nonlocal batch, written
+        batch.append(models.CustodyEvent(**fields))
+        if len(batch) >= batch_size:
+            models.CustodyEvent.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+
+    with transaction.atomic():
+        models.CustodyEvent.objects.all().delete()
+        samples = models.Sample.objects.order_by("pk").only("time_received", "location_id", "warehouse_id")
+        for sample in samples.iterator(chunk_size=batch_size):
+            add(_received(sample))
+
+        actions = models.UserSampleAction.objects.order_by("pk").values(
+            "sample_id", "user_account_id", "receiving_analyst", "aliquoting_analyst",
+            received=F("sample__time_received"),
+        )
+        for row in actions.iterator(chunk_size=batch_size):
+            action = SimpleNamespace(**row)
+            add(_handled(action, action.received))
+            if action.aliquoting_analyst:
+                add(_aliquoted(action, action.received))
+
+        results = models.SampleTestLink.objects.order_by("pk").values(
+            "pk", "sample_id", "test_id", "deadline", "completed_at", "testing_analyst", "test_result",
+            "pass_or_fail", received=F("sample__time_received"),
+        )
+        for row in results.iterator(chunk_size=batch_size):
+            result = SimpleNamespace(**row)
+            add(_assigned(result, result.received))
+            if result.completed_at is not None:
+                add(_completed(result))
+
+        models.CustodyEvent.objects.bulk_create(batch)
+    return written + len(batch)
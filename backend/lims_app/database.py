@@ -0,0 +1,44 @@
+"""
+Per-connection database tuning.
+
+The database profile is chosen in `settings.py` from the environment:
+
+* PostgreSQL (`LIMS_DB_ENGINE=postgresql`) keeps connections open between
+  requests (`CONN_MAX_AGE`, with health checks) or, with psycopg 3, draws
+  them from a per-process pool (`LIMS_DB_POOL_SIZE`).
+* SQLite, the default, is tuned for a web server with several concurrent
+  writers: every new connection gets the PRAGMAs in `LIMS_SQLITE_PRAGMAS`
+  (WAL journal, `synchronous=NORMAL`, memory-mapped I/O and a busy timeout),
+  and on Django 5.1+ transactions start `IMMEDIATE`.
+
+`python manage.py benchmark_db` measures concurrent sample intake under each
+profile.
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs) -> None:
+    """`connection_created` handler applying the SQLite PRAGMAs."""
+
+    if connection.vendor != "sqlite":
+        return
+    pragmas = settings.LIMS_SQLITE_PRAGMAS
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def sqlite_pragmas(connection) -> dict:
+    """Read back the tuned PRAGMAs of an open SQLite connection."""
+
+    values = {}
+    with connection.cursor() as cursor:
+        for name in settings.LIMS_SQLITE_PRAGMAS or ("journal_mode", "synchronous", "mmap_size", "busy_timeout"):
+            cursor.execute(f"PRAGMA {name}")
+            values[name] = cursor.fetchone()[0]
+    return values
@@ -0,0 +1,110 @@
+"""
+Server-side pass/fail evaluation of sample test results.
+
+A result passes when `test_result` lies within the owning test's
+`min_acceptable_result` / `max_acceptable_result` (inclusive); a missing
+limit is unbounded on that side.  The verdict is computed here rather than
+trusted from clients:
+
+* single results are evaluated in `SampleTestLink.save()`;
+* batches written through `bulk.py` are evaluated in Python after fetching
+  every referenced test's limits in one query;
+* when a test's limits change, its historical results are re-evaluated with
+  set-based `UPDATE` statements, optionally in primary-key chunks so that
+  very large tables are processed with bounded lock and transaction size
+  (see the `evaluate_results` management command).  The test's result
+  statistics are then rebuilt, since pass counts may have moved.
+
+Limits are always read from the database, never from the lookup cache (see
+`lookup_cache.py`): another worker's cache may still hold a test whose
+limits were just changed, and a verdict computed from them would stay wrong
+after the re-evaluation above.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Max, Min, Q
+
+from . import models
+from .result_stats import rebuild
+
+Limits = tuple[Optional[Decimal], Optional[Decimal]]
+
+
+def evaluate(result, minimum, maximum) -> bool:
+    """Return whether `result` lies within the inclusive limits."""
+
+    if minimum is not None and result < minimum:
+        return False
+    if maximum is not None and result > maximum:
+        return False
+    return True
+
+
+def limits_for(test_ids: Iterable[int]) -> dict[int, Limits]:
+    """Fetch `(min, max)` acceptance limits for several tests in one query."""
+
+    rows = models.Test.objects.filter(pk__in=set(test_ids)).values_list(
+        "pk", "min_acceptable_result", "max_acceptable_result"
+    )
+    return {pk: (minimum, maximum) for pk, minimum, maximum in rows}
+
+
+def evaluate_objects(results: Iterable[models.SampleTestLink]) -> None:
+    """Set `pass_or_fail` on unsaved or modified result instances in place."""
+
+    results = list(results)
+    limits = limits_for(result.test_id for result in results)
+    for result in results:
+        minimum, maximum = limits[result.test_id]
+        result.pass_or_fail = evaluate(result.test_result, minimum, maximum)
+
+
+def passing_q(minimum, maximum) -> Q:
+    """Build a filter matching results within the given limits."""
+
+    condition = Q()
+    if minimum is not None:
+        condition &= Q(test_result__gte=minimum)
+    if maximum is not None:
+        condition &= Q(test_result__lte=maximum)
+    return condition
+
+
+def _apply(results, minimum, maximum) -> int:
+    """Flip the verdict of rows in `results` whose stored value is stale."""
+
+    passing = passing_q(minimum, maximum)
+    changed = results.filter(passing, pass_or_fail=False).update(pass_or_fail=True)
+    if minimum is not None or maximum is not None:
+        changed += results.filter(pass_or_fail=True).exclude(passing).update(pass_or_fail=False)
+    return changed
+
+
+def reevaluate_test(test_id: int, minimum, maximum, chunk_size: Optional[int] = None) -> int:
+    """Re-evaluate every stored result of one test against new limits.
+
+    Without `chunk_size` the whole test is updated in one statement per
+    verdict.  With it, the test's results are walked in primary-key ranges of
+    that width, each committed in its own transaction.  Only rows whose
+    verdict actually changes are written.  Returns the number of rows changed.
+    """
+
+    results = models.SampleTestLink.objects.filter(test_id=test_id)
+    if chunk_size is None:
+        changed = _apply(results, minimum, maximum)
+    else:
+        changed = 0
+        bounds = results.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is not None:
+            for start in range(bounds["low"], bounds["high"] + 1, chunk_size):
+                with transaction.atomic():
+                    chunk = results.filter(pk__gte=start, pk__lt=start + chunk_size)
+                    changed += _apply(chunk, minimum, maximum)
+    if changed:
+        rebuild(test_ids=[test_id])
+    return changed
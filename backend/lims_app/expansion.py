@@ -0,0 +1,123 @@
+"""
+Optional expanded (nested) read representations.
+
+By default related objects are rendered as primary keys.  Read requests may
+ask for nested objects instead with `?expand=`, a comma-separated list of
+dotted paths, e.g. `?expand=sample,test.sop`.  Each serializer declares what
+may be expanded in `expandable_fields`::
+
+    expandable_fields = {
+        "sop": ("SOPSerializer", {}),
+        "maintenance_logs": ("MaintenanceLogSerializer", {"source": "maintenancelog_set", "many": True}),
+    }
+
+Serializer names are resolved in the declaring serializer's module, and the
+options are passed to the nested serializer.  The viewset mixin
+(`ExpandableViewSetMixin`) turns the same expansion tree into
+`select_related` (single-valued paths) and `prefetch_related` (paths through
+a to-many relation) calls, so an expanded page costs a fixed number of SQL
+queries however many rows it holds.
+"""
+
+from __future__ import annotations
+
+import sys
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+ExpandTree = dict[str, "ExpandTree"]
+
+EXPAND_QUERY_PARAM = "expand"
+
+
+def parse_expand(value: str) -> ExpandTree:
+    """Parse `"sample,test.sop"` into `{"sample": {}, "test": {"sop": {}}}`."""
+
+    tree: ExpandTree = {}
+    for path in value.split(","):
+        node = tree
+        for name in filter(None, (part.strip() for part in path.split("."))):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def requested_expansion(request) -> ExpandTree:
+    if request is None or request.method not in SAFE_METHODS:
+        return {}
+    return parse_expand(request.query_params.get(EXPAND_QUERY_PARAM, ""))
+
+
+def _resolve(serializer_class, name: str, path: str):
+    try:
+        serializer_name, options = serializer_class.expandable_fields[name]
+    except (AttributeError, KeyError):
+        raise ValidationError({EXPAND_QUERY_PARAM: [f"Cannot expand {path!r}."]})
+    target = getattr(sys.modules[serializer_class.__module__], serializer_name)
+    return target, options
+
+
+def plan_expansion(serializer_class, tree: ExpandTree) -> tuple[list[str], list[str]]:
+    """Return the `(select_related, prefetch_related)` lookups for `tree`."""
+
+    select: list[str] = []
+    prefetch: list[str] = []
+
+    def walk(serializer_class, tree, prefix, path_prefix, through_many):
+        for name, children in tree.items():
+            path = path_prefix + name
+            target, options = _resolve(serializer_class, name, path)
+            lookup = prefix + options.get("source", name).replace(".", "__")
+            many = through_many or options.get("many", False)
+            (prefetch if many else select).append(lookup)
+            walk(target, children, lookup + "__", path + ".", many)
+
+    walk(serializer_class, tree, "", "", False)
+    return select, prefetch
+
+
+class ExpandableFieldsMixin:
+    """Serializer mixin replacing primary-key fields with nested objects.
+
+    The expansion comes from the `expand` keyword argument when given (used
+    for nested serializers) and otherwise from the request's `?expand=`
+    parameter on safe methods, so writes always use the flat representation.
+    """
+
+    expandable_fields: dict[str, tuple[str, dict]] = {}
+
+    def __init__(self, *args, expand: ExpandTree | None = None, **kwargs):
+        self._expand = expand
+        super().__init__(*args, **kwargs)
+
+    def get_expand(self) -> ExpandTree:
+        if self._expand is not None:
+            return self._expand
+        return requested_expansion(self.context.get("request"))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, children in self.get_expand().items():
+            target, options = _resolve(type(self), name, name)
+            if issubclass(target, ExpandableFieldsMixin):
+                options = {**options, "expand": children}
+            fields[name] = target(read_only=True, **options)
+        return fields
+
+
+class ExpandableViewSetMixin:
+    """Viewset mixin applying the query plan for `?expand=` on reads."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve"):
+            return queryset
+        tree = requested_expansion(self.request)
+        if not tree:
+            return queryset
+        select, prefetch = plan_expansion(self.get_serializer_class(), tree)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
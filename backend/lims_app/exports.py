@@ -0,0 +1,103 @@
+"""
+Streaming bulk exports for the LIMS backend API.
+
+Audit exports can cover every row of a table, so they bypass serializers and
+model instances entirely: rows are read with `QuerySet.values()` in chunks
+(server-side cursors on PostgreSQL) and encoded one line at a time into a
+`StreamingHttpResponse`.  Memory use stays flat regardless of table size and
+the first bytes reach the client as soon as the first chunk is read.
+
+Two formats are supported, selected with `?output=`:
+
+* `ndjson` (default) – one JSON object per line, keyed like the regular API.
+* `csv` – a header row followed by one row per record.
+
+Viewsets mix in `StreamingExportMixin` for an `export/` action; samples and
+results have one.
+"""
+
+from __future__ import annotations
+
+import csv
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+
+class _Echo:
+    """Pseudo-buffer whose `write()` hands the value straight back.
+
+    This lets `csv.writer` format a single row without accumulating output.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def export_columns(model) -> list[tuple[str, str]]:
+    """Return `(output name, database attribute)` pairs for a model.
+
+    Foreign keys are exported under their field name (e.g. `sample`) holding
+    the related primary key, matching the regular `ModelSerializer` output.
+    """
+
+    return [(field.name, field.attname) for field in model._meta.concrete_fields]
+
+
+def iter_values(queryset, attnames: list[str]) -> Iterator[tuple]:
+    """Yield value tuples from `queryset` in bounded-memory chunks."""
+
+    chunk_size = settings.LIMS_EXPORT_CHUNK_SIZE
+    return queryset.values_list(*attnames).order_by("pk").iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(names: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + "\n"
+
+
+def iter_csv(names: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+EXPORT_FORMATS = {
+    "ndjson": (iter_ndjson, "application/x-ndjson", "ndjson"),
+    "csv": (iter_csv, "text/csv", "csv"),
+}
+
+
+def streaming_export(queryset, output: str, filename: str) -> StreamingHttpResponse:
+    """Build a streaming response exporting every row of `queryset`."""
+
+    try:
+        encode, content_type, extension = EXPORT_FORMATS[output]
+    except KeyError:
+        raise ValidationError(
+            {"output": f"Unsupported export format {output!r}; choose one of {sorted(EXPORT_FORMATS)}."}
+        )
+    columns = export_columns(queryset.model)
+    names = [name for name, _ in columns]
+    rows = iter_values(queryset, [attname for _, attname in columns])
+    response = StreamingHttpResponse(encode(names, rows), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+class StreamingExportMixin:
+    """Adds a `GET <prefix>/export/` action streaming the filtered queryset."""
+
+    export_filename: str = "export"
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def export(self, request):
+        output = request.query_params.get("output", "ndjson").lower()
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_export(queryset, output, self.export_filename)
@@ -0,0 +1,114 @@
+"""
+Sample intake: a sample, its subtype detail and its action log in one call.
+
+Registering a sample through the CRUD endpoints takes three requests (the
+`Sample`, then its `InProcess`/`Stability`/`FinishedProduct` row, then a
+`UserSampleAction`) and three transactions.  The intake endpoints on
+`SampleViewSet` take all three in one payload:
+
+* `samples/intake/` registers one sample and returns the three rows;
+* `samples/intake/bulk/` registers a whole shipment, all or nothing, and
+  returns the new sample ids.
+
+Rows are validated by `serializers.SampleIntakeSerializer`, which requires
+the detail object matching `sample_type` (`in_process`, `stability` or
+`finished_product`).  Lookup-table foreign keys come from the lookup cache
+and the acting users are checked with one query per batch, so validation
+cost does not grow with queries per row.  The rows are then written with one
+`bulk_create` per table inside a single transaction, and the new samples are
+added to the search index and the chain of custody in the same transaction
+(see `search.py` and `custody.py`).  All rows are recorded in the audit log
+(see `audit.py`).
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from . import audit, custody, models, search
+from .bulk import check_batch, raise_row_errors
+from .serializers import SampleIntakeSerializer
+
+# sample_type -> (payload field, detail model).
+DETAIL_MODELS = {
+    code: (SampleIntakeSerializer.detail_fields[code], model)
+    for model, code in models.SAMPLE_DETAIL_TYPES.items()
+}
+
+
+def _unknown_users(validated: dict[int, dict]) -> dict[int, dict]:
+    """Per-row errors for action log users that do not exist."""
+
+    wanted = {data["action"]["user_account_id"] for data in validated.values()}
+    existing = set(models.UserAccount.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+    errors = {}
+    for index, data in validated.items():
+        pk = data["action"]["user_account_id"]
+        if pk not in existing:
+            errors[index] = {"action": {"user_account": [f'Invalid pk "{pk}" - object does not exist.']}}
+    return errors
+
+
+def _write(validated: list[dict]) -> list[tuple]:
+    """Insert the rows of validated intakes; returns (sample, detail, action)."""
+
+    batch_size = settings.LIMS_BULK_BATCH_SIZE
+    samples, details, actions = [], [], []
+    for data in validated:
+        data = dict(data)
+        field, model = DETAIL_MODELS[data["sample_type"]]
+        action = data.pop("action")
+        detail = data.pop(field)
+        samples.append(models.Sample(**data))
+        details.append(model(**detail))
+        actions.append(models.UserSampleAction(**action))
+
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            models.Sample.objects.bulk_create(samples, batch_size=batch_size)
+            search.index_objects(samples)
+            custody.samples_saved(samples, created=True)
+            audit.objects_saved(samples, created=True)
+        else:
+            for sample in samples:
+                sample.save(force_insert=True)
+        for sample, detail, action in zip(samples, details, actions):
+            detail.sample = sample
+            action.sample = sample
+        for _, model in DETAIL_MODELS.values():
+            rows = [detail for detail in details if isinstance(detail, model)]
+            if rows:
+                model.objects.bulk_create(rows, batch_size=batch_size)
+                audit.objects_saved(rows, created=True)
+        models.UserSampleAction.objects.bulk_create(actions, batch_size=batch_size)
+        custody.actions_saved(actions, created=True)
+        audit.objects_saved(actions, created=True)
+    return list(zip(samples, details, actions))
+
+
+def intake_sample(data) -> tuple:
+    """Register one sample; returns its (sample, detail, action) rows."""
+
+    serializer = SampleIntakeSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    errors = _unknown_users({0: serializer.validated_data})
+    if errors:
+        raise ValidationError(errors[0])
+    return _write([serializer.validated_data])[0]
+
+
+def intake_samples(rows) -> list[int]:
+    """Register a batch of samples and return the new sample ids."""
+
+    check_batch(rows, "samples")
+    serializer = SampleIntakeSerializer(data=rows, many=True)
+    if not serializer.is_valid():
+        row_errors = serializer.errors
+        if isinstance(row_errors, list):
+            row_errors = dict(enumerate(row_errors))
+        raise_row_errors({index: errors for index, errors in row_errors.items() if errors})
+    validated = dict(enumerate(serializer.validated_data))
+    raise_row_errors(_unknown_users(validated))
+    return [sample.pk for sample, _, _ in _write(serializer.validated_data)]
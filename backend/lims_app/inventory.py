@@ -0,0 +1,173 @@
+"""
+Reagent inventory: stock on hand, expiry queries and stock-out projection.
+
+Every `Reagent` row is a lot.  Its `quantity_on_hand` is maintained
+incrementally rather than summed on read:
+
+* a new lot starts with `quantity_received`, and editing the receipt moves
+  the stock by the difference (`Reagent.save()`);
+* saving or deleting a `TestReagentLink` subtracts the change in consumption
+  from the affected lots with `F()` updates, using the values the link was
+  loaded with (signal handlers in `signals.py`), so concurrent writers never
+  overwrite each other's adjustments;
+* `rebuild_stock()` recomputes every lot from its receipt and consumption in
+  one statement, for data loaded behind the ORM's back.
+
+Lots whose receipt was never entered (those received before stock was
+tracked, or created without `quantity_received`) have an unknown (NULL)
+`quantity_on_hand`.  They are treated as possibly in stock:
+listed as expiring, counted as usable, and never projected to run out.
+
+Expiry questions are single indexed queries: `expiring()` lists lots with
+stock that expire within N days (`reagent_expiration_idx`), and
+`blocked_tests()` lists open tests needing a reagent of which no unexpired
+lot with stock is left.  A test's reagent links name the lot it was set up
+with, but any lot of the same reagent (the same CAS number) will do, which
+`reagent_cas_expiry_idx` looks up.
+
+`project_stock()` is the batch job behind `manage.py project_reagent_stock`:
+one aggregate over the last `USAGE_WINDOW_DAYS` of consumption gives each
+lot's daily usage, from which its stock-out date is projected and written
+back with `bulk_update`.  `low_stock()` then reads lots running out within
+`LOW_STOCK_DAYS` from `reagent_stockout_idx`.  The reagent endpoints
+`expiring/`, `low-stock/` and `blocked-tests/` serve these queries.
+"""
+
+from __future__ import annotations
+
+import datetime
+import math
+from decimal import Decimal
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, Exists, F, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import models
+
+
+def _adjust(reagent_id: int, consumed) -> None:
+    if consumed:
+        models.Reagent.objects.filter(pk=reagent_id).update(quantity_on_hand=F("quantity_on_hand") - consumed)
+
+
+def usage_saved(link: models.TestReagentLink, created: bool) -> None:
+    """Apply the consumption recorded (or changed) by a saved link."""
+
+    loaded = None if created else getattr(link, "_loaded_usage", None)
+    if loaded is None and not created:
+        # Loaded without the usage columns: nothing reliable to diff against.
+        rebuild_stock([link.reagent_id])
+    else:
+        with transaction.atomic():
+            if loaded is not None:
+                _adjust(loaded[0], -loaded[1])
+            _adjust(link.reagent_id, link.volume_used)
+    link._loaded_usage = (link.reagent_id, link.volume_used)
+
+
+def usage_deleted(link: models.TestReagentLink) -> None:
+    """Return the consumption of a deleted link to its lot."""
+
+    loaded = getattr(link, "_loaded_usage", None) or (link.reagent_id, link.volume_used)
+    _adjust(loaded[0], -loaded[1])
+
+
+def rebuild_stock(reagent_ids: Optional[list[int]] = None) -> int:
+    """Recompute `quantity_on_hand` from receipts and consumption."""
+
+    consumed = (
+        models.TestReagentLink.objects.filter(reagent_id=OuterRef("pk"))
+        .values("reagent_id")
+        .annotate(total=Sum("volume_used"))
+        .values("total")
+    )
+    zero = Value(Decimal(0), output_field=DecimalField(max_digits=16, decimal_places=6))
+    queryset = models.Reagent.objects.all()
+    if reagent_ids is not None:
+        queryset = queryset.filter(pk__in=reagent_ids)
+    return queryset.update(quantity_on_hand=F("quantity_received") - Coalesce(Subquery(consumed), zero))
+
+
+# Lots that have (or may have) stock left.
+IN_STOCK = Q(quantity_on_hand__gt=0) | Q(quantity_on_hand__isnull=True)
+
+
+def expiring(days: int):
+    """Lots with stock left that expire within `days` days, soonest first."""
+
+    today = timezone.localdate()
+    return models.Reagent.objects.filter(
+        IN_STOCK,
+        expiration_date__range=(today, today + datetime.timedelta(days=days)),
+    ).order_by("expiration_date", "id")
+
+
+def blocked_tests():
+    """(open test, reagent) pairs, as `values()` rows in deadline order.
+
+    An open test is blocked when a reagent linked to its test has no
+    unexpired lot with stock left.
+    """
+
+    today = timezone.localdate()
+    usable = models.Reagent.objects.filter(IN_STOCK, cas_number=OuterRef("cas_number"), expiration_date__gte=today)
+    return (
+        models.SampleTestLink.objects.filter(completed_at__isnull=True)
+        .annotate(cas_number=F("test__testreagentlink__reagent__cas_number"))
+        .filter(~Exists(usable), cas_number__isnull=False)
+        .order_by("deadline", "id")
+        .values("id", "sample_id", "test_id", "deadline", "cas_number")
+        .annotate(reagent_name=Min("test__testreagentlink__reagent__reagent_name"))
+    )
+
+
+def low_stock(days: int):
+    """Lots that are out of stock or projected to run out within `days` days."""
+
+    cutoff = timezone.localdate() + datetime.timedelta(days=days)
+    return models.Reagent.objects.filter(Q(stockout_date__lte=cutoff) | Q(quantity_on_hand__lte=0)).order_by(
+        F("stockout_date").asc(nulls_first=True), "id"
+    )
+
+
+def project_stock(window_days: Optional[int] = None) -> int:
+    """Refresh `daily_usage` and `stockout_date` of every lot.
+
+    Returns the number of lots updated.
+    """
+
+    window_days = window_days or settings.LIMS_REAGENTS["USAGE_WINDOW_DAYS"]
+    now = timezone.now()
+    today = timezone.localdate()
+    usage = dict(
+        models.TestReagentLink.objects.filter(used_at__gte=now - datetime.timedelta(days=window_days))
+        .values("reagent_id")
+        .annotate(total=Sum("volume_used"))
+        .values_list("reagent_id", "total")
+    )
+    batch_size = settings.LIMS_BULK_BATCH_SIZE
+    updated = 0
+    batch = []
+    rows = models.Reagent.objects.values_list("pk", "quantity_on_hand", "daily_usage", "stockout_date")
+    for pk, on_hand, old_rate, old_date in rows.iterator(chunk_size=batch_size):
+        rate = float(usage[pk]) / window_days if usage.get(pk) else None
+        if on_hand is None:
+            stockout = None
+        elif on_hand <= 0:
+            stockout = today
+        elif rate:
+            stockout = today + datetime.timedelta(days=min(math.floor(float(on_hand) / rate), 36500))
+        else:
+            stockout = None
+        if (rate, stockout) != (old_rate, old_date):
+            batch.append(models.Reagent(pk=pk, daily_usage=rate, stockout_date=stockout))
+        if len(batch) >= batch_size:
+            updated += models.Reagent.objects.bulk_update(batch, ["daily_usage", "stockout_date"])
+            batch = []
+    if batch:
+        updated += models.Reagent.objects.bulk_update(batch, ["daily_usage", "stockout_date"])
+    return updated
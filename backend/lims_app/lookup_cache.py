@@ -0,0 +1,180 @@
+"""
+Read-through cache for small, rarely changing lookup tables.
+
+Validating a sample or result resolves foreign keys to `SOP`, `Location`,
+`Warehouse`, `Client` and `Test` rows, which otherwise costs one query per
+key per request; serializers resolve them through `lookups` instead (their
+`CachedPrimaryKeyRelatedField`).  `lookups` keeps those rows in two tiers:
+
+* an in-process LRU with a time-to-live, consulted first; and
+* optionally a shared Django cache backend (Redis, memcached, file or
+  database cache) named by `LIMS_LOOKUP_CACHE["SHARED_CACHE"]`, so that a
+  row loaded by one worker is reused by the others.
+
+Rows are stored as tuples of column values and rebuilt into fresh model
+instances on every hit, so callers may modify what they get back without
+affecting other requests.  Misses are not cached.  Save and delete signals
+evict the row from the local tier and the shared backend (see `signals.py`);
+other workers' local tiers expire within the configured TTL, and the
+database's foreign-key constraints remain the final check.  Cached rows are
+therefore only used to check that a key exists; values written into other
+rows, such as a test's acceptance limits, are read from the database.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+
+from . import models
+
+CACHED_MODELS = (models.SOP, models.Location, models.Warehouse, models.Client, models.Test)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping with per-entry expiry."""
+
+    def __init__(self, max_entries: int, timeout: float):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return _MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class LookupCache:
+    """Two-tier primary-key cache for the models in `CACHED_MODELS`."""
+
+    def __init__(self):
+        self._local: Optional[LRUCache] = None
+        self._labels = {model._meta.label_lower for model in CACHED_MODELS}
+
+    @property
+    def config(self) -> dict:
+        return settings.LIMS_LOOKUP_CACHE
+
+    @property
+    def local(self) -> LRUCache:
+        if self._local is None:
+            self._local = LRUCache(self.config["MAX_ENTRIES"], self.config["TIMEOUT"])
+        return self._local
+
+    @property
+    def shared(self):
+        alias = self.config.get("SHARED_CACHE")
+        return caches[alias] if alias else None
+
+    def is_cached(self, model) -> bool:
+        return model._meta.label_lower in self._labels
+
+    @staticmethod
+    def _key(model, pk) -> str:
+        return f"lims:lookup:{model._meta.label_lower}:{pk}"
+
+    @staticmethod
+    def _dump(obj) -> tuple:
+        return tuple(getattr(obj, field.attname) for field in obj._meta.concrete_fields)
+
+    @staticmethod
+    def _load(model, values: tuple):
+        names = [field.attname for field in model._meta.concrete_fields]
+        return model.from_db(router.db_for_read(model), names, values)
+
+    def get(self, model, pk):
+        """Return the instance with primary key `pk`, or `None`."""
+
+        return self.get_many(model, [pk]).get(pk)
+
+    def get_many(self, model, pks: Iterable) -> dict:
+        """Return `{pk: instance}` for the rows that exist.
+
+        Keys missing from both tiers are fetched with a single query.
+        """
+
+        pks = list(dict.fromkeys(pks))
+        if not self.is_cached(model):
+            return model._base_manager.in_bulk(pks)
+        found = {}
+        missing = []
+        for pk in pks:
+            values = self.local.get(self._key(model, pk))
+            if values is _MISSING:
+                missing.append(pk)
+            else:
+                found[pk] = self._load(model, values)
+        shared = self.shared
+        if missing and shared is not None:
+            hits = shared.get_many([self._key(model, pk) for pk in missing])
+            still_missing = []
+            for pk in missing:
+                values = hits.get(self._key(model, pk))
+                if values is None:
+                    still_missing.append(pk)
+                    continue
+                self.local.set(self._key(model, pk), values)
+                found[pk] = self._load(model, values)
+            missing = still_missing
+        if missing:
+            loaded = {}
+            for pk, obj in model._base_manager.in_bulk(missing).items():
+                values = self._dump(obj)
+                self.local.set(self._key(model, pk), values)
+                loaded[self._key(model, pk)] = values
+                found[pk] = obj
+            if loaded and shared is not None:
+                shared.set_many(loaded, timeout=self.config["TIMEOUT"])
+        return found
+
+    def invalidate(self, model, pks: Iterable) -> None:
+        """Evict rows from the local tier and the shared backend."""
+
+        if not self.is_cached(model):
+            return
+        keys = [self._key(model, pk) for pk in pks]
+        for key in keys:
+            self.local.delete(key)
+        shared = self.shared
+        if keys and shared is not None:
+            shared.delete_many(keys)
+
+    def clear(self) -> None:
+        """Drop the local tier (the shared backend is left untouched)."""
+
+        self._local = None
+
+
+lookups = LookupCache()
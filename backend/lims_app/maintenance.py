@@ -0,0 +1,128 @@
+"""
+Maintenance intervals, next service dates and the due-equipment sweep.
+
+`MaintenanceLog.service_interval` is free text.  `parse_interval` reads the
+forms used in practice into an `Interval` (a count of days, weeks, months
+or years):
+
+* a count and unit: `90 days`, `6 months`, `every 2 weeks`, `1 yr`, `12m`;
+* a frequency word: `daily`, `weekly`, `monthly`, `quarterly`,
+  `semiannually`, `annually`, ...;
+* an ISO 8601 duration with one component: `P90D`, `P3M`, `P1Y`.
+
+`MaintenanceLog.save()` stores the parsed interval and computes
+`next_service_date` from it; logs whose interval cannot be parsed keep the
+date given by hand.
+
+`flag_due_equipment` takes every instrument whose latest next service date
+falls on or before a cutoff out of service.  It is a single `UPDATE` with a
+grouped subquery, answered from the `(equipment, next_service_date)` index,
+so it can run every minute (`manage.py schedule_maintenance`) over tens of
+thousands of instruments.
+"""
+
+from __future__ import annotations
+
+import calendar
+import datetime
+import re
+from typing import NamedTuple, Optional
+
+from django.db.models import Max
+
+DAY, WEEK, MONTH, YEAR = "D", "W", "M", "Y"
+UNIT_CHOICES = [(DAY, "days"), (WEEK, "weeks"), (MONTH, "months"), (YEAR, "years")]
+
+_UNITS = {
+    "d": DAY, "day": DAY, "days": DAY,
+    "w": WEEK, "wk": WEEK, "wks": WEEK, "week": WEEK, "weeks": WEEK,
+    "m": MONTH, "mo": MONTH, "mos": MONTH, "mth": MONTH, "mths": MONTH, "month": MONTH, "months": MONTH,
+    "y": YEAR, "yr": YEAR, "yrs": YEAR, "year": YEAR, "years": YEAR,
+}
+_WORDS = {
+    "daily": (1, DAY),
+    "weekly": (1, WEEK),
+    "biweekly": (2, WEEK),
+    "fortnightly": (2, WEEK),
+    "monthly": (1, MONTH),
+    "bimonthly": (2, MONTH),
+    "quarterly": (3, MONTH),
+    "semiannual": (6, MONTH),
+    "semiannually": (6, MONTH),
+    "biannual": (6, MONTH),
+    "biannually": (6, MONTH),
+    "annual": (1, YEAR),
+    "annually": (1, YEAR),
+    "yearly": (1, YEAR),
+    "biennial": (2, YEAR),
+    "biennially": (2, YEAR),
+}
+_COUNT_UNIT = re.compile(r"^(?:every\s+)?(\d+)?\s*([a-z]+)$")
+_ISO = re.compile(r"^p(\d+)([dwmy])$")
+
+
+class Interval(NamedTuple):
+    count: int
+    unit: str
+
+    def add_to(self, date: datetime.date) -> datetime.date:
+        """`date` moved forward by this interval.
+
+        Month and year steps keep the day of the month, clamped to the
+        length of the target month (31 Jan + 1 month is 28/29 Feb).
+        """
+
+        if self.unit == DAY:
+            return date + datetime.timedelta(days=self.count)
+        if self.unit == WEEK:
+            return date + datetime.timedelta(weeks=self.count)
+        months = self.count * (12 if self.unit == YEAR else 1)
+        month_index = date.month - 1 + months
+        year, month = date.year + month_index // 12, month_index % 12 + 1
+        return date.replace(year=year, month=month, day=min(date.day, calendar.monthrange(year, month)[1]))
+
+
+def parse_interval(text: Optional[str]) -> Optional[Interval]:
+    """Parse a free-text service interval, or return `None`."""
+
+    if not text:
+        return None
+    value = " ".join(text.strip().lower().replace("-", "").split())
+    if value in _WORDS:
+        return Interval(*_WORDS[value])
+    match = _ISO.match(value.replace(" ", ""))
+    if match:
+        count, unit = int(match.group(1)), match.group(2).upper()
+    else:
+        match = _COUNT_UNIT.match(value.replace(" ", "") if value[:1].isdigit() else value)
+        if match is None or match.group(2) not in _UNITS:
+            return None
+        count, unit = int(match.group(1) or 1), _UNITS[match.group(2)]
+    return Interval(count, unit) if count > 0 else None
+
+
+def due_equipment(cutoff: datetime.date):
+    """Ids of instruments whose latest next service date is on or before `cutoff`."""
+
+    from . import models
+
+    return (
+        models.MaintenanceLog.objects.values("equipment_id")
+        .annotate(next_due=Max("next_service_date"))
+        .filter(next_due__lte=cutoff)
+        .values("equipment_id")
+    )
+
+
+def flag_due_equipment(cutoff: datetime.date) -> int:
+    """Take instruments due for service by `cutoff` out of service.
+
+    Returns the number of instruments newly flagged.  Putting an instrument
+    back in service after it has been serviced is left to the user.
+    """
+
+    from . import models
+
+    return models.Equipment.objects.filter(out_of_service=False, pk__in=due_equipment(cutoff)).update(
+        out_of_service=True
+    )
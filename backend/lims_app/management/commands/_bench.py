@@ -0,0 +1,12 @@
+"""
+Helpers shared by the `benchmark_*` commands.
+
+The leading underscore keeps Django from listing this module as a command.
+"""
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of `values`, `fraction` in [0, 1]."""
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
@@ -0,0 +1,280 @@
+"""
+Management command benchmarking every GET endpoint of the API router.
+
+Usage::
+
+    python manage.py benchmark_api [--repeat 20] [--warmup 2] [--concurrency 1]
+        [--match REGEX] [--exports] [--output report.json]
+        [--compare baseline.json] [--max-regression PCT]
+
+Every route registered on the router in `urls.py` is requested: the list,
+the detail of the first row and each extra GET action (detail actions on
+that same row), named like their URLs (`sample-list`, `test-stats`, ...).
+`--match` keeps the endpoints whose name matches a regular expression;
+streaming exports read whole tables and only run with `--exports`.  Requests
+go through Django's test client in this process, so the numbers cover the
+middleware, views, serializers and database but not a web server.
+
+After `--warmup` unmeasured requests, each endpoint is requested `--repeat`
+times from `--concurrency` threads, recording latency (min, p50, p95, p99,
+max, mean), throughput, SQL queries and their time per request, response
+size and status codes.  The report is written as JSON to `--output` (or
+printed with `--output -`), together with the commit, database and row
+counts, so runs on different commits can be compared:
+
+    python manage.py benchmark_api --output before.json
+    git checkout my-branch
+    python manage.py benchmark_api --compare before.json --max-regression 20
+
+`--compare` prints the change of each endpoint's p50 latency and median
+query count against an earlier report; with `--max-regression` the command
+fails when a p50 grew by more than that percentage or a query count grew.
+Seed a scratch database first with `seed_lims`, and run with `DEBUG` off.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import platform
+import re
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from lims_app.management.commands._bench import percentile
+from lims_app.urls import router
+
+HOST = "localhost"
+REPORT_VERSION = 1
+
+# Query strings for endpoints that need one.
+QUERY_STRINGS = {
+    "search-list": "q=amoxicillin",
+}
+
+
+def endpoints(exports: bool = False) -> list[tuple[str, str]]:
+    """(name, path) of every GET route on the router."""
+
+    found = []
+    for prefix, viewset, basename in router.registry:
+        queryset = getattr(viewset, "queryset", None)
+        pk = queryset.order_by("pk").values_list("pk", flat=True).first() if queryset is not None else None
+        if hasattr(viewset, "list"):
+            found.append((f"{basename}-list", f"/api/{prefix}/"))
+        if hasattr(viewset, "retrieve") and pk is not None:
+            found.append((f"{basename}-detail", f"/api/{prefix}/{pk}/"))
+        for action in viewset.get_extra_actions():
+            if "get" not in action.mapping or (action.url_path == "export" and not exports):
+                continue
+            if action.detail:
+                if pk is None:
+                    continue
+                found.append((f"{basename}-{action.url_name}", f"/api/{prefix}/{pk}/{action.url_path}/"))
+            else:
+                found.append((f"{basename}-{action.url_name}", f"/api/{prefix}/{action.url_path}/"))
+    return [
+        (name, f"{path}?{QUERY_STRINGS[name]}" if name in QUERY_STRINGS else path)
+        for name, path in found
+    ]
+
+
+class QueryCounter:
+    """Execute wrapper counting the statements of one request."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+_clients = threading.local()
+
+
+def fetch(path: str) -> dict:
+    """Issue one GET and measure it."""
+
+    client = getattr(_clients, "client", None)
+    if client is None:
+        client = _clients.client = Client(raise_request_exception=False, HTTP_HOST=HOST)
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        start = time.perf_counter()
+        response = client.get(path)
+        size = len(b"".join(response.streaming_content) if response.streaming else response.content)
+        elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "queries": counter.count,
+        "query_seconds": counter.seconds,
+        "status": response.status_code,
+        "bytes": size,
+    }
+
+
+def measure(path: str, repeat: int, warmup: int, concurrency: int) -> dict:
+    for _ in range(warmup):
+        fetch(path)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(fetch, [path] * repeat))
+    wall = time.perf_counter() - start
+    latencies = [sample["seconds"] * 1000 for sample in samples]
+    queries = [sample["queries"] for sample in samples]
+    statuses: dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+    return {
+        "path": path,
+        "requests": repeat,
+        "errors": sum(sample["status"] >= 400 for sample in samples),
+        "status": statuses,
+        "throughput_rps": round(repeat / wall, 2),
+        "latency_ms": {
+            "min": round(min(latencies), 3),
+            "p50": round(statistics.median(latencies), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(max(latencies), 3),
+            "mean": round(statistics.fmean(latencies), 3),
+        },
+        "queries": {"min": min(queries), "median": statistics.median(queries), "max": max(queries)},
+        "query_ms": {"median": round(statistics.median(sample["query_seconds"] * 1000 for sample in samples), 3)},
+        "bytes": {"median": statistics.median(sample["bytes"] for sample in samples)},
+    }
+
+
+def git_revision() -> dict:
+    def git(*args) -> Optional[str]:
+        try:
+            result = subprocess.run(
+                ["git", *args], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=30
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def environment() -> dict:
+    with connection.cursor():
+        version = ".".join(map(str, connection.get_database_version()))
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "platform": platform.platform(),
+        "database": {"vendor": connection.vendor, "version": version},
+        "debug": settings.DEBUG,
+    }
+
+
+def row_counts() -> dict[str, int]:
+    return {model._meta.label: model.objects.count() for model in apps.get_app_config("lims_app").get_models()}
+
+
+class Command(BaseCommand):
+    help = "Measure latency, throughput and query counts of every API endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Measured requests per endpoint.")
+        parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests per endpoint first.")
+        parser.add_argument("--concurrency", type=int, default=1, help="Threads issuing the measured requests.")
+        parser.add_argument("--match", help="Only endpoints whose name matches this regular expression.")
+        parser.add_argument("--exports", action="store_true", help="Include the streaming full-table exports.")
+        parser.add_argument("--output", help="Write the JSON report to this file ('-' for standard output).")
+        parser.add_argument("--compare", help="Compare with an earlier JSON report.")
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            default=None,
+            help="With --compare, fail if a p50 latency grew by more than this percentage.",
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--repeat and --concurrency must be at least 1.")
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"], encoding="utf-8") as report:
+                    baseline = json.load(report)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+        selected = endpoints(options["exports"])
+        if options["match"]:
+            pattern = re.compile(options["match"])
+            selected = [(name, path) for name, path in selected if pattern.search(name)]
+        if not selected:
+            raise CommandError("No endpoint to benchmark.")
+        if settings.DEBUG:
+            self.stderr.write("DEBUG is on: every query is also logged, which inflates the timings.")
+
+        results = {}
+        for name, path in selected:
+            results[name] = measure(path, options["repeat"], options["warmup"], options["concurrency"])
+            result = results[name]
+            self.stdout.write(
+                f"{name:40} p50 {result['latency_ms']['p50']:9.2f} ms  p99 {result['latency_ms']['p99']:9.2f} ms  "
+                f"{result['throughput_rps']:8.1f} req/s  {result['queries']['median']:5g} queries"
+                + (f"  {result['errors']} error(s)" if result["errors"] else "")
+            )
+
+        report = {
+            "version": REPORT_VERSION,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git": git_revision(),
+            "environment": environment(),
+            "options": {key: options[key] for key in ("repeat", "warmup", "concurrency", "match", "exports")},
+            "rows": row_counts(),
+            "endpoints": results,
+        }
+        if options["output"] == "-":
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Report written to {options['output']}.")
+        if baseline is not None:
+            self.compare(baseline, report, options["max_regression"])
+        self.stdout.write(self.style.SUCCESS(f"Benchmarked {len(results)} endpoint(s)."))
+
+    def compare(self, baseline: dict, report: dict, max_regression: Optional[float]) -> None:
+        before = baseline.get("endpoints", {})
+        commit = (baseline.get("git") or {}).get("commit") or "baseline"
+        self.stdout.write(f"\nChange against {commit[:12]} (p50 latency, median queries):")
+        regressions = []
+        for name, result in report["endpoints"].items():
+            if name not in before:
+                self.stdout.write(f"  {name}: new")
+                continue
+            old_p50, new_p50 = before[name]["latency_ms"]["p50"], result["latency_ms"]["p50"]
+            old_queries, new_queries = before[name]["queries"]["median"], result["queries"]["median"]
+            change = (new_p50 - old_p50) / old_p50 * 100 if old_p50 else 0.0
+            self.stdout.write(
+                f"  {name:40} {old_p50:9.2f} -> {new_p50:9.2f} ms ({change:+6.1f}%)  "
+                f"queries {old_queries:g} -> {new_queries:g}"
+            )
+            if max_regression is not None and (change > max_regression or new_queries > old_queries):
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f"{len(regressions)} endpoint(s) regressed: {', '.join(regressions)}")
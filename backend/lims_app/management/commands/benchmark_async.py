@@ -0,0 +1,230 @@
+"""
+Management command load-testing the WSGI and ASGI read paths.
+
+Usage::
+
+    python manage.py benchmark_async [--clients 500] [--requests 5000]
+        [--wsgi-threads 32] [--path /api/samples/ ...] [--stack wsgi|asgi|both]
+
+`--clients` simulated clients each issue requests back to back, cycling over
+the given paths (by default the sample, result and equipment lists and one
+sample detail), until `--requests` responses have been received.  Requests
+are driven straight into Django's handlers, so the numbers cover the request
+stack, the views and the database but not a web server or the network:
+
+* `wsgi` – `WSGIHandler` behind a pool of `--wsgi-threads` threads, like a
+  threaded WSGI server; plain synchronous views.
+* `asgi` – the application from `lims_backend/asgi.py` on one event loop,
+  with the async read views from `async_views.py`.
+
+`both` (the default) runs each stack in a fresh process, since the async
+views are chosen when the URLs are loaded, and prints throughput and
+p50/p99 latency side by side.  Seed a scratch database first (for example
+with `seed_lims`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lims_app import models
+from lims_app.management.commands._bench import percentile
+
+HOST = "localhost"
+
+
+def default_paths() -> list[str]:
+    paths = ["/api/samples/", "/api/sample-test-links/", "/api/equipment/"]
+    sample_id = models.Sample.objects.values_list("pk", flat=True).first()
+    if sample_id is not None:
+        paths.append(f"/api/samples/{sample_id}/")
+    return paths
+
+
+def wsgi_caller(threads: int):
+    """Return a coroutine function issuing one GET through `WSGIHandler`."""
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+    pool = ThreadPoolExecutor(max_workers=threads)
+
+    def call(url: str) -> int:
+        parts = urlsplit(url)
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": parts.path,
+            "QUERY_STRING": parts.query,
+            "SERVER_NAME": HOST,
+            "SERVER_PORT": "80",
+            "HTTP_HOST": HOST,
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(b""),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        status = []
+        body = handler(environ, lambda code, headers, exc_info=None: status.append(code))
+        for _ in body:
+            pass
+        body.close()
+        return int(status[0].split()[0])
+
+    async def request(url: str) -> int:
+        return await asyncio.get_running_loop().run_in_executor(pool, call, url)
+
+    return request
+
+
+def asgi_caller():
+    """Return a coroutine function issuing one GET through the ASGI app."""
+
+    from lims_backend.asgi import application
+
+    async def request(url: str) -> int:
+        parts = urlsplit(url)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": parts.path,
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "root_path": "",
+            "headers": [(b"host", HOST.encode())],
+            "client": ("127.0.0.1", 0),
+            "server": (HOST, 80),
+        }
+        received = False
+        disconnected = asyncio.Event()
+        status = []
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await application(scope, receive, send)
+        return status[0]
+
+    return request
+
+
+async def load(request, paths: list[str], clients: int, total: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    issued = 0
+
+    async def client(offset: int) -> None:
+        nonlocal errors, issued
+        index = offset
+        while issued < total:
+            issued += 1
+            start = time.perf_counter()
+            status = await request(paths[index % len(paths)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                errors += 1
+            index += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(offset) for offset in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare throughput and tail latency of the WSGI and ASGI read paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=500, help="Concurrent simulated clients.")
+        parser.add_argument("--requests", type=int, default=5000, help="Total requests per stack.")
+        parser.add_argument("--wsgi-threads", type=int, default=32, help="Worker threads for the WSGI stack.")
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Request path with query string, e.g. /api/samples/?page_size=50 (may be repeated).",
+        )
+        parser.add_argument("--stack", choices=["wsgi", "asgi", "both"], default="both")
+        parser.add_argument("--json", action="store_true", help="Print the result of one stack as JSON.")
+
+    def handle(self, *args, **options):
+        if options["stack"] == "both":
+            return self.compare(options)
+        paths = options["paths"] or default_paths()
+        if options["stack"] == "wsgi":
+            request = wsgi_caller(options["wsgi_threads"])
+        else:
+            request = asgi_caller()
+        # One warm-up pass so that URL resolution and imports are excluded.
+        asyncio.run(load(request, paths, 1, len(paths)))
+        result = asyncio.run(load(request, paths, options["clients"], options["requests"]))
+        if options["json"]:
+            self.stdout.write(json.dumps(result))
+        else:
+            self.report(options["stack"], result)
+
+    def compare(self, options) -> None:
+        results = {}
+        for stack in ("wsgi", "asgi"):
+            command = [
+                sys.executable,
+                str(settings.BASE_DIR / "manage.py"),
+                "benchmark_async",
+                "--stack", stack,
+                "--json",
+                "--clients", str(options["clients"]),
+                "--requests", str(options["requests"]),
+                "--wsgi-threads", str(options["wsgi_threads"]),
+            ]
+            for path in options["paths"] or []:
+                command += ["--path", path]
+            env = {**os.environ, "LIMS_ASYNC_READS": "true" if stack == "asgi" else "false"}
+            output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+            results[stack] = json.loads(output.strip().splitlines()[-1])
+            self.report(stack, results[stack])
+        wsgi, asgi = results["wsgi"], results["asgi"]
+        self.stdout.write(
+            f"\nASGI vs WSGI: throughput {asgi['throughput'] / wsgi['throughput']:.2f}x, "
+            f"p99 {wsgi['p99_ms']:.1f} ms -> {asgi['p99_ms']:.1f} ms"
+        )
+
+    def report(self, stack: str, result: dict) -> None:
+        self.stdout.write(
+            f"{stack}: {result['requests']} requests in {result['seconds']:.2f}s "
+            f"({result['throughput']:.0f} req/s), p50 {result['p50_ms']:.1f} ms, "
+            f"p99 {result['p99_ms']:.1f} ms, {result['errors']} error(s)"
+        )
@@ -0,0 +1,208 @@
+"""
+Management command benchmarking concurrent sample intake per database profile.
+
+Usage::
+
+    python manage.py benchmark_db [--writers 16] [--samples 2000]
+        [--profile sqlite-default|sqlite-tuned|postgresql ...]
+
+`--writers` threads register `--samples` samples between them.  Each intake
+is one transaction inserting a `Sample` and its `UserSampleAction`, followed
+by `close_old_connections()` as at the end of a request, so `CONN_MAX_AGE`
+and pooling behave as they would behind a web server:
+
+* `sqlite-default` – SQLite with `LIMS_SQLITE_TUNING=false`: rollback
+  journal, full syncs, deferred transactions.
+* `sqlite-tuned` – SQLite with the PRAGMAs from `database.py`.
+* `postgresql` – `LIMS_DB_ENGINE=postgresql` with the `LIMS_DB_*` settings
+  from the environment; needs a running server.
+
+Each profile runs in a fresh process, because the settings are read at
+startup, and throughput, p50/p99 latency and failed intakes (for example
+"database is locked") are printed side by side.  The SQLite profiles default
+to a scratch file next to `db.sqlite3`; set `LIMS_DB_NAME` to use another.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from lims_app import database, models
+from lims_app.management.commands._bench import percentile
+
+PROFILES = {
+    "sqlite-default": {"LIMS_DB_ENGINE": "sqlite", "LIMS_SQLITE_TUNING": "false"},
+    "sqlite-tuned": {"LIMS_DB_ENGINE": "sqlite", "LIMS_SQLITE_TUNING": "true"},
+    "postgresql": {"LIMS_DB_ENGINE": "postgresql"},
+}
+
+
+def fixtures() -> dict:
+    """Create (once) the rows every benchmark sample refers to."""
+
+    today = timezone.now().date()
+    with transaction.atomic():
+        user, _ = models.UserAccount.objects.get_or_create(
+            account_username="bench-intake",
+            defaults={
+                "first_name": "Bench",
+                "last_name": "User",
+                "phone": "0",
+                "email": "bench-intake@example.com",
+                "department": "QC",
+            },
+        )
+        sop, _ = models.SOP.objects.get_or_create(
+            sop_name="BENCH-INTAKE", defaults={"version_number": Decimal("1.0"), "effective_date": today}
+        )
+        location, _ = models.Location.objects.get_or_create(location_type="Bench intake", room_number=1)
+        warehouse, _ = models.Warehouse.objects.get_or_create(
+            warehouse_facility="Bench intake",
+            defaults={"sop": sop, "warehouse_technician": "Bench", "warehouse_company": "Bench"},
+        )
+    return {"user": user, "sop": sop, "location": location, "warehouse": warehouse}
+
+
+def intake(rows: dict, number: int) -> None:
+    """Register one sample the way the sample form does, in one transaction."""
+
+    with transaction.atomic():
+        sample = models.Sample.objects.create(
+            location=rows["location"],
+            warehouse=rows["warehouse"],
+            sop=rows["sop"],
+            product_name=f"Product {number % 500}",
+            product_stage="Bulk",
+            quantity=Decimal(number % 99 + 1),
+            sample_type="IFS"[number % 3],
+            storage_conditions="RT",
+        )
+        models.UserSampleAction.objects.create(
+            user_account=rows["user"], sample=sample, receiving_analyst="Bench"
+        )
+
+
+def run(writers: int, total: int) -> dict:
+    rows = fixtures()
+    latencies: list[float] = []
+    errors: list[str] = []
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def writer() -> None:
+        while True:
+            with lock:
+                number = next(counter, None)
+            if number is None:
+                break
+            start = time.perf_counter()
+            try:
+                intake(rows, number)
+            except DatabaseError as exc:
+                with lock:
+                    errors.append(str(exc))
+            else:
+                with lock:
+                    latencies.append((time.perf_counter() - start) * 1000)
+            finally:
+                close_old_connections()
+        connection.close()
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "samples": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_ms": percentile(latencies, 0.99) if latencies else 0.0,
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent sample intake under the database profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=16, help="Concurrent writer threads.")
+        parser.add_argument("--samples", type=int, default=2000, help="Samples registered per profile.")
+        parser.add_argument(
+            "--profile",
+            action="append",
+            dest="profiles",
+            choices=sorted(PROFILES),
+            help="Profile to measure (may be repeated; default: both SQLite profiles).",
+        )
+        parser.add_argument("--json", action="store_true", help="Run in this process and print JSON.")
+
+    def handle(self, *args, **options):
+        if options["json"]:
+            return self.measure(options)
+        results = {}
+        for profile in options["profiles"] or ["sqlite-default", "sqlite-tuned"]:
+            command = [
+                sys.executable,
+                str(settings.BASE_DIR / "manage.py"),
+                "benchmark_db",
+                "--json",
+                "--writers", str(options["writers"]),
+                "--samples", str(options["samples"]),
+            ]
+            env = {**os.environ, **PROFILES[profile]}
+            if profile.startswith("sqlite"):
+                env.setdefault("LIMS_DB_NAME", str(settings.BASE_DIR / "benchmark_db.sqlite3"))
+            migrate = [sys.executable, str(settings.BASE_DIR / "manage.py"), "migrate", "--verbosity", "0"]
+            try:
+                subprocess.run(migrate, env=env, check=True, capture_output=True, text=True)
+                output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+            except subprocess.CalledProcessError as exc:
+                raise CommandError(f"{profile}: {exc.stderr.strip().splitlines()[-1]}") from exc
+            results[profile] = json.loads(output.strip().splitlines()[-1])
+            self.report(profile, results[profile])
+        if "sqlite-default" in results and "sqlite-tuned" in results:
+            default, tuned = results["sqlite-default"], results["sqlite-tuned"]
+            self.stdout.write(
+                f"\nTuned vs default SQLite: throughput "
+                f"{tuned['throughput'] / default['throughput']:.2f}x, "
+                f"p99 {default['p99_ms']:.1f} ms -> {tuned['p99_ms']:.1f} ms"
+                if default["throughput"]
+                else "\nDefault SQLite completed no intakes."
+            )
+
+    def measure(self, options) -> None:
+        if connection.vendor == "sqlite" and not settings.LIMS_SQLITE_PRAGMAS:
+            # WAL mode is stored in the database file, so undo a previous
+            # tuned run before measuring SQLite's defaults.
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode = DELETE")
+        result = run(options["writers"], options["samples"])
+        if connection.vendor == "sqlite":
+            result["pragmas"] = database.sqlite_pragmas(connection)
+        self.stdout.write(json.dumps(result))
+
+    def report(self, profile: str, result: dict) -> None:
+        self.stdout.write(
+            f"{profile}: {result['samples']} samples in {result['seconds']:.2f}s "
+            f"({result['throughput']:.0f}/s), p50 {result['p50_ms']:.1f} ms, "
+            f"p99 {result['p99_ms']:.1f} ms, {result['errors']} failed"
+        )
+        if result["first_error"]:
+            self.stdout.write(f"  first failure: {result['first_error']}")
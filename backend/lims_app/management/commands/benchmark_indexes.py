@@ -0,0 +1,231 @@
+"""
+Management command benchmarking the dashboard queries served by indexes.
+
+Usage::
+
+    python manage.py benchmark_indexes [--seed N] [--repeat R] [--compare]
+
+`--seed N` first inserts N synthetic samples, each with one test result, plus
+a proportional number of reagents and maintenance logs (use a scratch
+database; 1,000,000 is a realistic size).  Every dashboard query is then run
+`R` times and its median latency and query plan are printed.  With
+`--compare` the indexes declared on the `lims_app` models are dropped, the
+queries are measured again, and the indexes are recreated afterwards.
+"""
+
+from __future__ import annotations
+
+import datetime
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from lims_app import models
+
+INDEXED_MODELS = (models.Sample, models.SampleTestLink, models.Reagent, models.MaintenanceLog)
+
+
+def dashboard_queries():
+    """Return `(label, queryset)` pairs mirroring the dashboard filters."""
+
+    now = timezone.now()
+    today = now.date()
+    test_id = models.Test.objects.values_list("pk", flat=True).first()
+    return [
+        (
+            "stability samples received this week",
+            models.Sample.objects.filter(sample_type="S", time_received__gte=now - datetime.timedelta(days=7)),
+        ),
+        (
+            "newest samples page",
+            models.Sample.objects.order_by("-time_received", "-id")[:100],
+        ),
+        (
+            "failed results due in next 24h",
+            models.SampleTestLink.objects.filter(
+                pass_or_fail=False, deadline__range=(now, now + datetime.timedelta(hours=24))
+            ),
+        ),
+        (
+            "results of one test by deadline",
+            models.SampleTestLink.objects.filter(test_id=test_id).order_by("deadline")[:100],
+        ),
+        (
+            "reagents expiring within 30 days",
+            models.Reagent.objects.filter(expiration_date__range=(today, today + datetime.timedelta(days=30))),
+        ),
+        (
+            "maintenance due within 7 days",
+            models.MaintenanceLog.objects.filter(
+                next_service_date__range=(today, today + datetime.timedelta(days=7))
+            ),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Measure latency and query plans of the indexed dashboard queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic samples first.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per query; the median is reported.")
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="Also measure with the lims_app indexes temporarily dropped.",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            self.seed(options["seed"])
+        with_indexes = self.measure(options["repeat"])
+        if not options["compare"]:
+            return
+        self.drop_indexes()
+        try:
+            without_indexes = self.measure(options["repeat"])
+        finally:
+            self.create_indexes()
+        self.stdout.write("\nSummary (median ms): without indexes -> with indexes")
+        for label, fast in with_indexes.items():
+            slow = without_indexes[label]
+            speedup = slow / fast if fast else float("inf")
+            self.stdout.write(f"  {label}: {slow:.2f} -> {fast:.2f} ({speedup:.1f}x)")
+
+    def measure(self, repeat: int) -> dict[str, float]:
+        timings = {}
+        for label, queryset in dashboard_queries():
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[label] = statistics.median(samples)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{label}: {timings[label]:.2f} ms"))
+            self.stdout.write(queryset.explain())
+        return timings
+
+    def drop_indexes(self) -> None:
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+
+    def create_indexes(self) -> None:
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
+
+    def seed(self, count: int, batch_size: int = 5000) -> None:
+        """Insert `count` samples with one result each, in bulk batches."""
+
+        rng = random.Random(0)
+        now = timezone.now()
+        today = now.date()
+        with transaction.atomic():
+            user = models.UserAccount.objects.create(
+                account_username=f"bench-{now.timestamp()}",
+                first_name="Bench",
+                last_name="User",
+                phone="0",
+                email=f"bench-{now.timestamp()}@example.com",
+                department="QC",
+            )
+            sops = [
+                models.SOP.objects.create(
+                    sop_name=f"BENCH-{i}", version_number=Decimal("1.0"), effective_date=today
+                )
+                for i in range(10)
+            ]
+            location = models.Location.objects.create(location_type="Lab", room_number=1)
+            warehouse = models.Warehouse.objects.create(
+                sop=sops[0],
+                warehouse_technician="Bench",
+                warehouse_facility=f"Bench {now.timestamp()}",
+                warehouse_company="Bench",
+            )
+            tests = [
+                models.Test.objects.create(
+                    user_account=user,
+                    sop=sop,
+                    min_acceptable_result=Decimal("1"),
+                    max_acceptable_result=Decimal("9"),
+                )
+                for sop in sops
+            ]
+            equipment = models.Equipment.objects.create(
+                location=location,
+                sop=sops[0],
+                equipment_name="Bench HPLC",
+                min_use_range=Decimal("0"),
+                max_use_range=Decimal("10"),
+            )
+
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            with transaction.atomic():
+                samples = models.Sample.objects.bulk_create(
+                    [
+                        models.Sample(
+                            location=location,
+                            warehouse=warehouse,
+                            sop=sops[0],
+                            product_name=f"Product {rng.randrange(500)}",
+                            product_stage="Bulk",
+                            quantity=Decimal(rng.randrange(1, 100)),
+                            time_received=now - datetime.timedelta(minutes=rng.randrange(525600)),
+                            sample_type=rng.choice("ISF"),
+                            storage_conditions="RT",
+                        )
+                        for _ in range(size)
+                    ]
+                )
+                results = []
+                for sample in samples:
+                    value = Decimal(rng.randrange(0, 1100)) / 100
+                    results.append(
+                        models.SampleTestLink(
+                            sample=sample,
+                            test=rng.choice(tests),
+                            testing_analyst="Bench",
+                            reviewing_analyst="Bench",
+                            test_result=value,
+                            deadline=now + datetime.timedelta(minutes=rng.randrange(-43200, 43200)),
+                            pass_or_fail=Decimal("1") <= value <= Decimal("9"),
+                        )
+                    )
+                models.SampleTestLink.objects.bulk_create(results)
+                models.Reagent.objects.bulk_create(
+                    [
+                        models.Reagent(
+                            sop=sops[0],
+                            reagent_name=f"Reagent {rng.randrange(1000)}",
+                            cas_number="64-17-5",
+                            lot_number=f"LOT-{offset + i}",
+                            vendor="Bench",
+                            manufacturing_date=today - datetime.timedelta(days=365),
+                            expiration_date=today + datetime.timedelta(days=rng.randrange(-180, 720)),
+                        )
+                        for i in range(size // 10)
+                    ]
+                )
+                models.MaintenanceLog.objects.bulk_create(
+                    [
+                        models.MaintenanceLog(
+                            equipment=equipment,
+                            sop=sops[0],
+                            service_date=today,
+                            service_description="Bench",
+                            service_interval="90 days",
+                            next_service_date=today + datetime.timedelta(days=rng.randrange(-30, 365)),
+                        )
+                        for _ in range(size // 10)
+                    ]
+                )
+            self.stdout.write(f"Seeded {offset + size}/{count} samples")
@@ -0,0 +1,68 @@
+"""
+Management command comparing list serialization paths.
+
+Usage::
+
+    python manage.py benchmark_serializers [--limit N] [--repeat R] [--endpoint PREFIX ...]
+
+For every router endpoint (or those named with `--endpoint`) the first `N`
+rows are rendered both with the endpoint's `ModelSerializer(many=True)` and
+with the `values()` fast path from `fieldsets.py`, and the median time of
+each is printed.  Seed a scratch database first (for example with
+`benchmark_indexes --seed`) to get meaningful numbers.
+"""
+
+from __future__ import annotations
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from lims_app.fieldsets import render_rows, row_columns
+from lims_app.urls import router
+
+
+def _median_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = "Compare ModelSerializer and values() fast-path list serialization."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10000, help="Rows rendered per endpoint.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per path; the median is reported.")
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            dest="endpoints",
+            help="Router prefix to benchmark, e.g. sample-test-links (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        limit, repeat = options["limit"], options["repeat"]
+        for prefix, viewset, _ in router.registry:
+            if options["endpoints"] and prefix not in options["endpoints"]:
+                continue
+            queryset = viewset.queryset.order_by("pk")[:limit]
+            serializer_class = viewset.serializer_class
+            columns = row_columns(serializer_class(), queryset.model)
+            if columns is None:
+                self.stdout.write(f"{prefix}: no fast path for {serializer_class.__name__}")
+                continue
+            rows = len(queryset)
+            slow = _median_ms(lambda: serializer_class(queryset.all(), many=True).data, repeat)
+            fast = _median_ms(
+                lambda: render_rows(queryset.values(*{column for _, column, _ in columns}), columns),
+                repeat,
+            )
+            speedup = slow / fast if fast else float("inf")
+            self.stdout.write(
+                f"{prefix}: {rows} rows, ModelSerializer {slow:.1f} ms, fast path {fast:.1f} ms ({speedup:.1f}x)"
+            )
@@ -0,0 +1,49 @@
+"""
+Management command re-evaluating stored pass/fail verdicts.
+
+Usage::
+
+    python manage.py evaluate_results [--test ID ...] [--chunk-size N]
+
+Each test's results are walked in primary-key ranges and corrected with
+set-based `UPDATE` statements, one transaction per chunk, so the command runs
+in bounded memory over millions of rows and can be interrupted and re-run
+safely.
+"""
+
+from django.core.management.base import BaseCommand
+
+from lims_app import models
+from lims_app.evaluation import reevaluate_test
+
+
+class Command(BaseCommand):
+    help = "Re-evaluate SampleTestLink.pass_or_fail against each test's acceptance limits."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--test",
+            type=int,
+            action="append",
+            dest="tests",
+            help="Only re-evaluate results of this test id (may be repeated).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50000,
+            help="Width of each primary-key range updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        tests = models.Test.objects.order_by("pk")
+        if options["tests"]:
+            tests = tests.filter(pk__in=options["tests"])
+        total = 0
+        for test_id, minimum, maximum in tests.values_list(
+            "pk", "min_acceptable_result", "max_acceptable_result"
+        ):
+            changed = reevaluate_test(test_id, minimum, maximum, chunk_size=options["chunk_size"])
+            total += changed
+            self.stdout.write(f"Test {test_id}: {changed} result(s) changed")
+        self.stdout.write(self.style.SUCCESS(f"Re-evaluated results; {total} verdict(s) changed."))
@@ -0,0 +1,21 @@
+"""
+Django's `flush`, allowed to empty the append-only audit log.
+
+Usage::
+
+    python manage.py flush [--database ALIAS] [--noinput]
+
+The audit log's triggers reject deletes (see `audit.py`) unless the
+connection is inside `audit.purging()`; this override wraps the stock command
+in it.  `TransactionTestCase` flushes through this command between tests.
+"""
+
+from django.core.management.commands import flush
+
+from lims_app import audit
+
+
+class Command(flush.Command):
+    def handle(self, **options):
+        with audit.purging(options["database"]):
+            return super().handle(**options)
@@ -0,0 +1,32 @@
+"""
+Management command maintaining the audit log.
+
+Usage::
+
+    python manage.py maintain_audit_log [--months N]
+
+Writes the entries left in spill files by processes that have exited (see
+`audit.py`) and, on PostgreSQL, creates the monthly partitions of the
+current month and the next `N` (default 3), so that no entry lands in the
+default partition.  Run it daily.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from lims_app import audit
+
+
+class Command(BaseCommand):
+    help = "Replay audit spill files and create upcoming monthly partitions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=3, help="Months ahead to create partitions for.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "postgresql":
+            months = audit.upcoming_months(options["months"])
+            audit.ensure_partitions(months)
+            self.stdout.write(f"Ensured {len(months)} monthly partition(s).")
+        replayed = audit.flush()
+        self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} audit entr{'y' if replayed == 1 else 'ies'}."))
@@ -0,0 +1,32 @@
+"""
+Management command refreshing the reagent stock-out projection.
+
+Usage::
+
+    python manage.py project_reagent_stock [--window-days N] [--rebuild]
+
+Averages each lot's consumption over the last `N` days (default
+`LIMS_REAGENTS["USAGE_WINDOW_DAYS"]`) and stores the resulting daily usage
+and projected stock-out date on the lot (see `inventory.py`); run it daily.
+`--rebuild` first recomputes every lot's stock on hand from its receipt and
+recorded consumption, e.g. after loading usage with raw SQL.
+"""
+
+from django.core.management.base import BaseCommand
+
+from lims_app import inventory
+
+
+class Command(BaseCommand):
+    help = "Project reagent stock-out dates from recent consumption."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--window-days", type=int, default=None, help="Days of consumption to average.")
+        parser.add_argument("--rebuild", action="store_true", help="Recompute stock on hand first.")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            rebuilt = inventory.rebuild_stock()
+            self.stdout.write(f"Recomputed stock of {rebuilt} lot(s).")
+        updated = inventory.project_stock(options["window_days"])
+        self.stdout.write(self.style.SUCCESS(f"Updated the projection of {updated} lot(s)."))
@@ -0,0 +1,25 @@
+"""
+Management command rebuilding the chain-of-custody events.
+
+Usage::
+
+    python manage.py rebuild_custody_events
+
+Replaces every `CustodyEvent` with events derived from the current samples,
+action logs and tests (see `custody.py`).  Saves keep the events current on
+their own; run this after loading data with raw SQL.  Moves recorded since
+receipt cannot be derived and are dropped, and steps without a time of
+their own are placed at the sample's receipt.
+"""
+
+from django.core.management.base import BaseCommand
+
+from lims_app import custody
+
+
+class Command(BaseCommand):
+    help = "Rebuild the chain-of-custody events of every sample."
+
+    def handle(self, *args, **options):
+        count = custody.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Recorded {count} custody event(s)."))
@@ -0,0 +1,32 @@
+"""
+Management command recomputing the pre-aggregated result statistics.
+
+Usage::
+
+    python manage.py rebuild_result_stats [--test ID ...]
+
+The `ResultStatistic` rows are normally kept current on every result write;
+run this after loading results with raw SQL or to clear accumulated
+floating-point drift in the running sums.
+"""
+
+from django.core.management.base import BaseCommand
+
+from lims_app.result_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute ResultStatistic rows from SampleTestLink."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--test",
+            type=int,
+            action="append",
+            dest="tests",
+            help="Only rebuild statistics of this test id (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild(test_ids=options["tests"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} statistic row(s)."))
@@ -0,0 +1,24 @@
+"""
+Management command rebuilding the search index.
+
+Usage::
+
+    python manage.py rebuild_search_index
+
+Replaces every `SearchEntry` with one freshly built from the samples,
+reagents, equipment and SOPs in the database (see `search.py`).  Saves and
+deletes keep the index current on their own; run this after loading data
+with raw SQL or other writes that send no signals.
+"""
+
+from django.core.management.base import BaseCommand
+
+from lims_app import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search index of samples, reagents, equipment and SOPs."
+
+    def handle(self, *args, **options):
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} object(s)."))
@@ -0,0 +1,44 @@
+"""
+Management command taking instruments that are due for service out of service.
+
+Usage::
+
+    python manage.py schedule_maintenance [--window-days N] [--dry-run]
+
+Every instrument whose latest `next_service_date` is today or earlier, or
+within the next `N` days, is flagged `out_of_service` in one set-based
+`UPDATE` (see `maintenance.py`).  The pass is cheap enough to schedule every
+minute, e.g. from cron.  `--dry-run` only counts the instruments that would
+be flagged.
+"""
+
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lims_app import models
+from lims_app.maintenance import due_equipment, flag_due_equipment
+
+
+class Command(BaseCommand):
+    help = "Flag equipment that is overdue or due for service as out of service."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--window-days", type=int, default=0, help="Also flag instruments due within N days.")
+        parser.add_argument("--dry-run", action="store_true", help="Count the instruments without flagging them.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.localdate() + datetime.timedelta(days=options["window_days"])
+        start = time.perf_counter()
+        if options["dry_run"]:
+            count = models.Equipment.objects.filter(out_of_service=False, pk__in=due_equipment(cutoff)).count()
+            verb = "would be"
+        else:
+            count = flag_due_equipment(cutoff)
+            verb = "were"
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stdout.write(
+            self.style.SUCCESS(f"{count} instrument(s) due by {cutoff} {verb} taken out of service ({elapsed:.1f} ms).")
+        )
@@ -0,0 +1,306 @@
+"""
+Request-level latency and query instrumentation.
+
+`MetricsMiddleware` times every request and attributes it to the route that
+served it (the URL name, e.g. `sample-list` or `sample-detail`, plus the
+HTTP method).  While a request runs, its `RequestMetrics` record sits in a
+context variable, which the rest of the app adds to:
+
+* an execute wrapper installed on every database connection (see
+  `signals.py`) counts queries and their time, and tallies the SQL text,
+  which Django keeps separate from the parameters, so repeated identical
+  statements can be spotted;
+* `LimsModelSerializer.to_representation` and the `values()` fast path in
+  `fieldsets.py` add the time spent turning rows into response data.
+
+Completed requests are folded into per-route counters and histograms (wall
+time, query count, query time, serializer time, response size) served as
+Prometheus text at `/api/metrics/`.  When one statement runs
+`N_PLUS_ONE_THRESHOLD` times or more in a request, a warning naming the
+route and the statement is logged and `lims_n_plus_one_total` is bumped.
+
+The record lives in a context variable, so it follows the request into
+`sync_to_async` threads under ASGI.  Metrics are kept per process; scrape
+every worker, or aggregate downstream.  Streaming responses are counted
+without a size.  Configure with `LIMS_METRICS` in `settings.py`.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram bucket upper bounds; every histogram also has a +Inf bucket.
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class RequestMetrics:
+    """Measurements collected while one request is being served."""
+
+    __slots__ = ("queries", "query_time", "serializer_time", "serializing", "statements")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.statements: Counter = Counter()
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("lims_request_metrics", default=None)
+
+
+def current() -> Optional[RequestMetrics]:
+    """The record of the request being served, or `None` outside one."""
+
+    return _current.get()
+
+
+class serializing:
+    """Context manager adding the enclosed time to the serializer total.
+
+    Nested uses (a serializer rendering related serializers) are counted
+    once, by the outermost.
+    """
+
+    __slots__ = ("record", "start")
+
+    def __enter__(self):
+        record = _current.get()
+        if record is None or record.serializing:
+            self.record = None
+            return self
+        record.serializing = True
+        self.record = record
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record = self.record
+        if record is not None:
+            record.serializer_time += time.perf_counter() - self.start
+            record.serializing = False
+        return False
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting and timing statements."""
+
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record.query_time += time.perf_counter() - start
+        record.queries += 1
+        record.statements[sql] += 1
+
+
+def instrument_connection(sender, connection, **kwargs) -> None:
+    """`connection_created` handler installing `record_query`."""
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: tuple) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class RouteMetrics:
+    """Aggregated measurements of one route and method."""
+
+    __slots__ = ("statuses", "duration", "queries", "query_time", "serializer_time", "size", "n_plus_one")
+
+    def __init__(self) -> None:
+        self.statuses: Counter = Counter()
+        self.duration = Histogram(SECONDS_BUCKETS)
+        self.queries = Histogram(COUNT_BUCKETS)
+        self.query_time = Histogram(SECONDS_BUCKETS)
+        self.serializer_time = Histogram(SECONDS_BUCKETS)
+        self.size = Histogram(BYTES_BUCKETS)
+        self.n_plus_one = 0
+
+
+# (name, type, help) of each exported metric, in output order.
+METRICS = (
+    ("lims_http_requests_total", "counter", "Requests served, by response status."),
+    ("lims_http_request_duration_seconds", "histogram", "Wall time from middleware entry to response."),
+    ("lims_db_queries_per_request", "histogram", "Database queries issued per request."),
+    ("lims_db_query_duration_seconds", "histogram", "Time spent in database queries per request."),
+    ("lims_serializer_duration_seconds", "histogram", "Time spent building response data per request."),
+    ("lims_http_response_size_bytes", "histogram", "Response body size (non-streaming responses)."),
+    ("lims_n_plus_one_total", "counter", "Requests repeating one SQL statement past the threshold."),
+)
+
+
+class MetricsRegistry:
+    """Per-process store of route metrics."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: dict[tuple[str, str], RouteMetrics] = {}
+
+    def observe(self, route: str, method: str, status: int, duration: float, record: RequestMetrics,
+                size: Optional[int], n_plus_one: bool) -> None:
+        with self._lock:
+            metrics = self._routes.get((route, method))
+            if metrics is None:
+                metrics = self._routes[(route, method)] = RouteMetrics()
+            metrics.statuses[status] += 1
+            metrics.duration.observe(duration)
+            metrics.queries.observe(record.queries)
+            metrics.query_time.observe(record.query_time)
+            metrics.serializer_time.observe(record.serializer_time)
+            if size is not None:
+                metrics.size.observe(size)
+            metrics.n_plus_one += n_plus_one
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            routes = sorted(self._routes.items())
+            sections: dict[str, list[str]] = {name: [] for name, _, _ in METRICS}
+            for (route, method), metrics in routes:
+                labels = f'route="{route}",method="{method}"'
+                for status, count in sorted(metrics.statuses.items()):
+                    sections["lims_http_requests_total"].append(
+                        f'lims_http_requests_total{{{labels},status="{status}"}} {count}'
+                    )
+                for name, histogram in (
+                    ("lims_http_request_duration_seconds", metrics.duration),
+                    ("lims_db_queries_per_request", metrics.queries),
+                    ("lims_db_query_duration_seconds", metrics.query_time),
+                    ("lims_serializer_duration_seconds", metrics.serializer_time),
+                    ("lims_http_response_size_bytes", metrics.size),
+                ):
+                    sections[name].extend(histogram.lines(name, labels))
+                sections["lims_n_plus_one_total"].append(f"lims_n_plus_one_total{{{labels}}} {metrics.n_plus_one}")
+        lines = []
+        for name, kind, help_text in METRICS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(sections[name])
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def route_name(request) -> str:
+    """Label for the route that served `request`.
+
+    Unresolved paths share one label so that scanners probing random URLs
+    cannot blow up the number of series.
+    """
+
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route or "unnamed"
+
+
+class MetricsMiddleware:
+    """Record per-route latency, query and size metrics for every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.enabled = settings.LIMS_METRICS["ENABLED"]
+        self.threshold = settings.LIMS_METRICS["N_PLUS_ONE_THRESHOLD"]
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        record = RequestMetrics()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, record, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        record = RequestMetrics()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, record, time.perf_counter() - start)
+        return response
+
+    def finish(self, request, response, record: RequestMetrics, duration: float) -> None:
+        route = route_name(request)
+        n_plus_one = False
+        if record.statements:
+            sql, repeats = record.statements.most_common(1)[0]
+            if repeats >= self.threshold:
+                n_plus_one = True
+                logger.warning(
+                    "Possible N+1 queries on %s %s: statement ran %d times: %s",
+                    request.method, route, repeats, sql,
+                )
+        size = None if response.streaming else len(response.content)
+        registry.observe(route, request.method, response.status_code, duration, record, size, n_plus_one)
+
+
+def metrics_view(request):
+    """Serve the collected metrics in the Prometheus text format."""
+
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['next_service_date'], name='maint_next_service_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['equipment', 'next_service_date'], name='maint_equip_next_service_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reagent',
+            index=models.Index(fields=['expiration_date'], name='reagent_expiration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sample',
+            index=models.Index(fields=['time_received', 'id'], name='sample_received_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sample',
+            index=models.Index(fields=['sample_type', 'time_received'], name='sample_type_received_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sampletestlink',
+            index=models.Index(fields=['deadline', 'id'], name='result_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sampletestlink',
+            index=models.Index(fields=['test', 'deadline'], name='result_test_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sampletestlink',
+            index=models.Index(condition=models.Q(('pass_or_fail', False)), fields=['deadline'], name='result_failed_deadline_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0003_table_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(max_length=64)),
+                ('month', models.DateField()),
+                ('result_count', models.PositiveIntegerField(default=0)),
+                ('pass_count', models.PositiveIntegerField(default=0)),
+                ('result_sum', models.FloatField(default=0.0)),
+                ('result_sum_squares', models.FloatField(default=0.0)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lims_app.test')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('test', 'product_name', 'month'), name='result_stat_key_uniq')],
+            },
+        ),
+    ]
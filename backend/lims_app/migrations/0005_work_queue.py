@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:19
+
+from django.db import migrations, models
+from django.db.models.functions import Now
+
+
+def close_existing_results(apps, schema_editor):
+    # Results recorded before the work-queue existed carry no completion time.
+    # Those past their deadline are taken as completed at the deadline; the
+    # others stay open and enter the queue.
+    SampleTestLink = apps.get_model('lims_app', 'SampleTestLink')
+    SampleTestLink.objects.filter(deadline__lt=Now()).update(completed_at=models.F('deadline'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0004_result_statistic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sampletestlink',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sampletestlink',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='sampletestlink',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(close_existing_results, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='sampletestlink',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['deadline', 'id'], name='result_open_deadline_idx'),
+        ),
+    ]
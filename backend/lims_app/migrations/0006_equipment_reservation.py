@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0005_work_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reserved_by', models.CharField(max_length=64)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('equipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='lims_app.equipment')),
+                ('sample_test_link', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='lims_app.sampletestlink')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['equipment', 'start_time'], name='reservation_equip_start_idx')],
+            },
+        ),
+    ]
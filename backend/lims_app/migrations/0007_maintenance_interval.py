@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:23
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of lims_app.maintenance.parse_interval as of this migration, so
+# that later changes to the parser cannot change what this migration stores.
+UNITS = {
+    'd': 'D', 'day': 'D', 'days': 'D',
+    'w': 'W', 'wk': 'W', 'wks': 'W', 'week': 'W', 'weeks': 'W',
+    'm': 'M', 'mo': 'M', 'mos': 'M', 'mth': 'M', 'mths': 'M', 'month': 'M', 'months': 'M',
+    'y': 'Y', 'yr': 'Y', 'yrs': 'Y', 'year': 'Y', 'years': 'Y',
+}
+WORDS = {
+    'daily': (1, 'D'),
+    'weekly': (1, 'W'),
+    'biweekly': (2, 'W'),
+    'fortnightly': (2, 'W'),
+    'monthly': (1, 'M'),
+    'bimonthly': (2, 'M'),
+    'quarterly': (3, 'M'),
+    'semiannual': (6, 'M'),
+    'semiannually': (6, 'M'),
+    'biannual': (6, 'M'),
+    'biannually': (6, 'M'),
+    'annual': (1, 'Y'),
+    'annually': (1, 'Y'),
+    'yearly': (1, 'Y'),
+    'biennial': (2, 'Y'),
+    'biennially': (2, 'Y'),
+}
+COUNT_UNIT = re.compile(r'^(?:every\s+)?(\d+)?\s*([a-z]+)$')
+ISO = re.compile(r'^p(\d+)([dwmy])$')
+
+
+def parse_interval(text):
+    # (count, unit) of a free-text service interval, or None.
+    if not text:
+        return None
+    value = ' '.join(text.strip().lower().replace('-', '').split())
+    if value in WORDS:
+        return WORDS[value]
+    match = ISO.match(value.replace(' ', ''))
+    if match:
+        count, unit = int(match.group(1)), match.group(2).upper()
+    else:
+        match = COUNT_UNIT.match(value.replace(' ', '') if value[:1].isdigit() else value)
+        if match is None or match.group(2) not in UNITS:
+            return None
+        count, unit = int(match.group(1) or 1), UNITS[match.group(2)]
+    return (count, unit) if count > 0 else None
+
+
+def parse_existing_intervals(apps, schema_editor):
+    # Fill in the parsed interval; hand-entered next service dates are kept.
+    MaintenanceLog = apps.get_model('lims_app', 'MaintenanceLog')
+    for text in MaintenanceLog.objects.values_list('service_interval', flat=True).distinct():
+        interval = parse_interval(text)
+        if interval is not None:
+            MaintenanceLog.objects.filter(service_interval=text).update(
+                interval_count=interval[0], interval_unit=interval[1]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0006_equipment_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='out_of_service',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='interval_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='interval_unit',
+            field=models.CharField(blank=True, choices=[('D', 'days'), ('W', 'weeks'), ('M', 'months'), ('Y', 'years')], max_length=1, null=True),
+        ),
+        migrations.AlterField(
+            model_name='maintenancelog',
+            name='next_service_date',
+            field=models.DateField(blank=True),
+        ),
+        migrations.RunPython(parse_existing_intervals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:25
+
+import datetime
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_used_at(apps, schema_editor):
+    # Existing consumption has no date of its own.  Date it at the test's
+    # latest past deadline (or, failing that, its latest sample receipt), and
+    # links of tests without results at the lot's manufacture, so that past
+    # usage does not all count as recent in the stock projection.
+    TestReagentLink = apps.get_model('lims_app', 'TestReagentLink')
+    SampleTestLink = apps.get_model('lims_app', 'SampleTestLink')
+    Reagent = apps.get_model('lims_app', 'Reagent')
+    now = django.utils.timezone.now()
+    latest = {
+        row['test_id']: row['due'] or row['received']
+        for row in SampleTestLink.objects.values('test_id').annotate(
+            due=models.Max('deadline', filter=models.Q(deadline__lt=now)),
+            received=models.Max('sample__time_received', filter=models.Q(sample__time_received__lt=now)),
+        )
+    }
+    manufactured = dict(Reagent.objects.values_list('pk', 'manufacturing_date'))
+    batch = []
+    for link in TestReagentLink.objects.only('test_id', 'reagent_id').iterator(chunk_size=1000):
+        used_at = latest.get(link.test_id)
+        if used_at is None:
+            used_at = datetime.datetime.combine(manufactured[link.reagent_id], datetime.time(), datetime.timezone.utc)
+        link.used_at = used_at
+        batch.append(link)
+        if len(batch) >= 1000:
+            TestReagentLink.objects.bulk_update(batch, ['used_at'])
+            batch = []
+    TestReagentLink.objects.bulk_update(batch, ['used_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0007_maintenance_interval'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reagent',
+            name='daily_usage',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        # Nullable without a default: lots without a recorded receipt, existing
+        # ones included, read as unknown stock (NULL) rather than as empty.
+        migrations.AddField(
+            model_name='reagent',
+            name='quantity_on_hand',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='reagent',
+            name='quantity_received',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='reagent',
+            name='stockout_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='testreagentlink',
+            name='used_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_used_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='testreagentlink',
+            name='used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='reagent',
+            index=models.Index(fields=['stockout_date'], name='reagent_stockout_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reagent',
+            index=models.Index(fields=['cas_number', 'expiration_date'], name='reagent_cas_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testreagentlink',
+            index=models.Index(fields=['used_at'], name='reagent_use_time_idx'),
+        ),
+    ]
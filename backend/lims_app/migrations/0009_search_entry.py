@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:37
+
+from django.db import migrations, models
+
+SEARCH_FIELDS = {
+    'sample': ('Sample', ('product_name',)),
+    'reagent': ('Reagent', ('reagent_name', 'cas_number', 'lot_number', 'vendor')),
+    'equipment': ('Equipment', ('equipment_name',)),
+    'sop': ('SOP', ('sop_name',)),
+}
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE lims_app_searchentry_fts USING fts5("
+    "text, content='lims_app_searchentry', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER lims_app_searchentry_fts_insert AFTER INSERT ON lims_app_searchentry BEGIN "
+    "INSERT INTO lims_app_searchentry_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER lims_app_searchentry_fts_delete AFTER DELETE ON lims_app_searchentry BEGIN "
+    "INSERT INTO lims_app_searchentry_fts(lims_app_searchentry_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER lims_app_searchentry_fts_update AFTER UPDATE ON lims_app_searchentry BEGIN "
+    "INSERT INTO lims_app_searchentry_fts(lims_app_searchentry_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO lims_app_searchentry_fts(rowid, text) VALUES (new.id, new.text); END",
+]
+
+
+def create_trigram_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX search_entry_trgm_idx ON lims_app_searchentry USING gin (text gin_trgm_ops)'
+        )
+    elif connection.vendor == 'sqlite':
+        # The trigram tokenizer needs SQLite 3.34; older builds fall back to
+        # a substring scan (see lims_app/search.py).
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(text, tokenize='trigram')")
+                cursor.execute('DROP TABLE temp.fts_probe')
+        except Exception:
+            return
+        for statement in SQLITE_FTS:
+            schema_editor.execute(statement)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS search_entry_trgm_idx')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS lims_app_searchentry_fts')
+
+
+def index_existing_objects(apps, schema_editor):
+    SearchEntry = apps.get_model('lims_app', 'SearchEntry')
+    for kind, (model_name, fields) in SEARCH_FIELDS.items():
+        rows = apps.get_model('lims_app', model_name).objects.values_list('pk', *fields).iterator(chunk_size=1000)
+        SearchEntry.objects.bulk_create(
+            (
+                SearchEntry(kind=kind, object_id=pk, text=' '.join(str(v) for v in values if v not in (None, '')))
+                for pk, *values in rows
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0008_reagent_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('text', models.TextField(blank=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_entry_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(index_existing_objects, migrations.RunPython.noop),
+    ]
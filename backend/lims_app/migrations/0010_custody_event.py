@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def record_existing_custody(apps, schema_editor):
+    # Frozen copy of lims_app.custody.rebuild() as of this migration: receipts,
+    # action log entries and test assignments at the sample's receipt time,
+    # completions at their completed_at.
+    Sample = apps.get_model('lims_app', 'Sample')
+    UserSampleAction = apps.get_model('lims_app', 'UserSampleAction')
+    SampleTestLink = apps.get_model('lims_app', 'SampleTestLink')
+    CustodyEvent = apps.get_model('lims_app', 'CustodyEvent')
+    batch = []
+
+    def add(**fields):
+        batch.append(CustodyEvent(**fields))
+        if len(batch) >= 1000:
+            CustodyEvent.objects.bulk_create(batch)
+            batch.clear()
+
+    samples = Sample.objects.order_by('pk').values('pk', 'time_received', 'location_id', 'warehouse_id')
+    for row in samples.iterator(chunk_size=1000):
+        add(
+            sample_id=row['pk'], occurred_at=row['time_received'], event_type='received',
+            location_id=row['location_id'], warehouse_id=row['warehouse_id'],
+        )
+    actions = UserSampleAction.objects.order_by('pk').values(
+        'sample_id', 'user_account_id', 'receiving_analyst', 'aliquoting_analyst',
+        received=models.F('sample__time_received'),
+    )
+    for row in actions.iterator(chunk_size=1000):
+        add(
+            sample_id=row['sample_id'], occurred_at=row['received'], event_type='handled',
+            actor=row['receiving_analyst'], detail=f"Logged by user {row['user_account_id']}",
+        )
+        if row['aliquoting_analyst']:
+            add(
+                sample_id=row['sample_id'], occurred_at=row['received'], event_type='aliquoted',
+                actor=row['aliquoting_analyst'],
+            )
+    results = SampleTestLink.objects.order_by('pk').values(
+        'pk', 'sample_id', 'test_id', 'deadline', 'completed_at', 'testing_analyst', 'test_result',
+        'pass_or_fail', received=models.F('sample__time_received'),
+    )
+    for row in results.iterator(chunk_size=1000):
+        add(
+            sample_id=row['sample_id'], occurred_at=row['received'], event_type='test_assigned',
+            sample_test_link_id=row['pk'], detail=f"Test {row['test_id']}, due {row['deadline']:%Y-%m-%d %H:%M}",
+        )
+        if row['completed_at'] is not None:
+            verdict = 'pass' if row['pass_or_fail'] else 'fail'
+            add(
+                sample_id=row['sample_id'], occurred_at=row['completed_at'], event_type='test_completed',
+                actor=row['testing_analyst'], sample_test_link_id=row['pk'],
+                detail=f"Test {row['test_id']}: {row['test_result']} ({verdict})",
+            )
+    CustodyEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0009_search_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustodyEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurred_at', models.DateTimeField()),
+                ('event_type', models.CharField(choices=[('received', 'Received'), ('handled', 'Handled'), ('aliquoted', 'Aliquoted'), ('moved', 'Moved to another location'), ('transferred', 'Transferred to another warehouse'), ('test_assigned', 'Test assigned'), ('test_completed', 'Test completed')], max_length=16)),
+                ('actor', models.CharField(blank=True, max_length=64, null=True)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='warehouseclientlink',
+            index=models.Index(fields=['warehouse', 'shipping_time'], name='shipment_warehouse_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='custodyevent',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='lims_app.location'),
+        ),
+        migrations.AddField(
+            model_name='custodyevent',
+            name='sample',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='custody_events', to='lims_app.sample'),
+        ),
+        migrations.AddField(
+            model_name='custodyevent',
+            name='sample_test_link',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='lims_app.sampletestlink'),
+        ),
+        migrations.AddField(
+            model_name='custodyevent',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='lims_app.warehouse'),
+        ),
+        migrations.AddIndex(
+            model_name='custodyevent',
+            index=models.Index(fields=['sample', 'occurred_at', 'id'], name='custody_sample_time_idx'),
+        ),
+        migrations.RunPython(record_existing_custody, migrations.RunPython.noop),
+    ]
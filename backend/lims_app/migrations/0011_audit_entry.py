@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:52
+
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Same columns, indexes and constraint names as the model, but partitioned by
+# month; the primary key must include the partition key.
+POSTGRES_PARTITIONED = [
+    'DROP TABLE lims_app_auditentry',
+    'CREATE TABLE lims_app_auditentry ('
+    'id bigint GENERATED BY DEFAULT AS IDENTITY, '
+    'entry_id uuid NOT NULL, '
+    'occurred_at timestamp with time zone NOT NULL, '
+    'model varchar(64) NOT NULL, '
+    'object_pk varchar(64) NOT NULL, '
+    'action varchar(8) NOT NULL, '
+    'actor varchar(150) NULL, '
+    'request varchar(255) NOT NULL, '
+    'changes jsonb NOT NULL, '
+    'PRIMARY KEY (id, occurred_at), '
+    'CONSTRAINT audit_entry_uniq UNIQUE (entry_id, occurred_at)'
+    ') PARTITION BY RANGE (occurred_at)',
+    'CREATE INDEX audit_object_time_idx ON lims_app_auditentry (model, object_pk, occurred_at)',
+    'CREATE INDEX audit_time_idx ON lims_app_auditentry (occurred_at)',
+    'CREATE TABLE lims_app_auditentry_default PARTITION OF lims_app_auditentry DEFAULT',
+    'CREATE FUNCTION lims_audit_append_only() RETURNS trigger AS $$ BEGIN '
+    "IF TG_OP = 'DELETE' AND current_setting('lims.audit_purge', true) = 'on' THEN RETURN OLD; END IF; "
+    "RAISE EXCEPTION 'lims_app_auditentry is append-only'; END $$ LANGUAGE plpgsql",
+    'CREATE TRIGGER audit_entry_append_only BEFORE UPDATE OR DELETE ON lims_app_auditentry '
+    'FOR EACH ROW EXECUTE FUNCTION lims_audit_append_only()',
+]
+
+# Deletes are let through on a connection inside `audit.purging()` (flush and
+# test teardown): PostgreSQL reads the `lims.audit_purge` setting, SQLite calls
+# a function registered on each connection, so other clients cannot delete.
+SQLITE_APPEND_ONLY = [
+    'CREATE TRIGGER audit_entry_no_update BEFORE UPDATE ON lims_app_auditentry BEGIN '
+    "SELECT RAISE(ABORT, 'lims_app_auditentry is append-only'); END",
+    'CREATE TRIGGER audit_entry_no_delete BEFORE DELETE ON lims_app_auditentry '
+    'WHEN NOT lims_audit_purging() BEGIN '
+    "SELECT RAISE(ABORT, 'lims_app_auditentry is append-only'); END",
+]
+
+
+def month_partition(year, month):
+    # The partition of one calendar month (UTC), as audit.ensure_partitions()
+    # names it; frozen here so that later changes to it cannot alter this step.
+    def start(year, month):
+        return datetime.datetime(year + (month - 1) // 12, (month - 1) % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+
+    return (
+        f'CREATE TABLE IF NOT EXISTS lims_app_auditentry_y{year:04d}m{month:02d} PARTITION OF lims_app_auditentry'
+        f" FOR VALUES FROM ('{start(year, month).isoformat()}') TO ('{start(year, month + 1).isoformat()}')"
+    )
+
+
+def partition_and_protect(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for statement in POSTGRES_PARTITIONED:
+            schema_editor.execute(statement)
+        # This month and the next.
+        now = timezone.now().astimezone(datetime.timezone.utc)
+        schema_editor.execute(month_partition(now.year, now.month))
+        schema_editor.execute(month_partition(now.year + now.month // 12, now.month % 12 + 1))
+    elif vendor == 'sqlite':
+        for statement in SQLITE_APPEND_ONLY:
+            schema_editor.execute(statement)
+
+
+def unprotect(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP FUNCTION IF EXISTS lims_audit_append_only() CASCADE')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TRIGGER IF EXISTS audit_entry_no_update')
+        schema_editor.execute('DROP TRIGGER IF EXISTS audit_entry_no_delete')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0010_custody_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_id', models.UUIDField()),
+                ('occurred_at', models.DateTimeField()),
+                ('model', models.CharField(max_length=64)),
+                ('object_pk', models.CharField(max_length=64)),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=8)),
+                ('actor', models.CharField(blank=True, max_length=150, null=True)),
+                ('request', models.CharField(blank=True, max_length=255)),
+                ('changes', models.JSONField(default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_pk', 'occurred_at'], name='audit_object_time_idx'), models.Index(fields=['occurred_at'], name='audit_time_idx')],
+                'constraints': [models.UniqueConstraint(fields=('entry_id', 'occurred_at'), name='audit_entry_uniq')],
+            },
+        ),
+        migrations.RunPython(partition_and_protect, unprotect),
+    ]
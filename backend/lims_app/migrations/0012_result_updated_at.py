@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lims_app', '0011_audit_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sampletestlink',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='sampletestlink',
+            index=models.Index(fields=['test', 'updated_at'], name='result_test_updated_idx'),
+        ),
+    ]
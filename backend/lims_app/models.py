@@ -15,11 +15,89 @@ existing SOP, a `VersionChange` record is created automatically.
 
 from __future__ import annotations
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from . import maintenance
 
-class UserAccount(models.Model):
+
+class TrackedQuerySet(models.QuerySet):
+    """Query set whose bulk writes report themselves like saves do.
+
+    `update()`, `bulk_create()` and `bulk_update()` send no signals, so they
+    call `signals.table_changed()` themselves: the table's `TableVersion` is
+    bumped and the written rows are evicted from the lookup cache.  Used by
+    every model in `signals.VERSIONED_MODELS` and `lookup_cache.CACHED_MODELS`.
+    """
+
+    def update(self, **kwargs):
+        from .lookup_cache import lookups
+        from .signals import table_changed
+
+        with transaction.atomic(using=self.db):
+            # Row ids are only needed to evict cached lookups.
+            pks = list(self.values_list("pk", flat=True)) if lookups.is_cached(self.model) else []
+            updated = super().update(**kwargs)
+            table_changed(self.model, pks)
+        return updated
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .signals import table_changed
+
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            table_changed(self.model, [obj.pk for obj in objs if obj.pk is not None])
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        from .signals import table_changed
+
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            updated = super().bulk_update(objs, fields, batch_size=batch_size)
+            table_changed(self.model, [obj.pk for obj in objs])
+        return updated
+
+
+class ResultQuerySet(models.QuerySet):
+    """Query set keeping `SampleTestLink.updated_at` current on bulk writes.
+
+    `update()` and `bulk_update()` skip `auto_now`, so they stamp the column
+    themselves; the SPC chart cache is keyed on it (see `spc.py`).
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields = [*fields, "updated_at"] if "updated_at" not in fields else fields
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+
+class LimsModel(models.Model):
+    """Base of the LIMS models whose writes are audited.
+
+    `from_db()` keeps a reference to the column values each instance was
+    loaded with, which `audit.py` diffs saves against; nothing is copied
+    until a save needs it.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_row = (field_names, values)
+        return instance
+
+
+class UserAccount(LimsModel):
     """Represents a system user.
 
     Fields correspond closely to the columns in the original `UserAccount`
@@ -38,11 +116,13 @@ class UserAccount(models.Model):
     is_analyst = models.BooleanField(default=False)
     is_administrator = models.BooleanField(default=False)
 
+    objects = TrackedQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.account_username
 
 
-class Analyst(models.Model):
+class Analyst(LimsModel):
     """Profile model for analysts.
 
     Each analyst is linked to a single `UserAccount`.  The `access_level`
@@ -62,7 +142,7 @@ class Analyst(models.Model):
         return f"Analyst {self.user_account.account_username}"
 
 
-class Administrator(models.Model):
+class Administrator(LimsModel):
     """Profile model for administrators.
 
     Tied one‑to‑one with a `UserAccount`.  The `is_supervisor` flag indicates
@@ -80,44 +160,116 @@ class Administrator(models.Model):
         return f"Administrator {self.user_account.account_username}"
 
 
-class SOP(models.Model):
+VERSIONED_SOP_FIELDS = ("version_number", "effective_date")
+
+
+def _version_changes(old_values, new_values) -> list["VersionChange"]:
+    """Build `VersionChange` rows for SOPs whose version fields differ.
+
+    Both arguments map SOP primary keys to `(version_number, effective_date)`.
+    """
+
+    now = timezone.now()
+    return [
+        VersionChange(
+            old_version_number=old[0],
+            new_version_number=new_values[pk][0],
+            old_effective_date=old[1],
+            new_effective_date=new_values[pk][1],
+            sop_id=pk,
+            change_date=now,
+        )
+        for pk, old in old_values.items()
+        if pk in new_values and old != new_values[pk]
+    ]
+
+
+def _locked_versions(queryset) -> dict:
+    """Lock the SOP rows in `queryset` and return their version values."""
+
+    rows = queryset.select_for_update().values_list("pk", *VERSIONED_SOP_FIELDS)
+    return {pk: (version, date) for pk, version, date in rows}
+
+
+class SOPQuerySet(TrackedQuerySet):
+    """Query set that logs version changes made by bulk writes.
+
+    `update()` and `bulk_update()` bypass `SOP.save()`, so when they touch
+    the version fields they lock the affected rows, read the current values
+    and write the matching `VersionChange` rows in the same transaction.
+    Django's `bulk_update()` writes through `update()`, which does the
+    logging for it.
+    """
+
+    def update(self, **kwargs):
+        if not set(VERSIONED_SOP_FIELDS) & set(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            old_values = _locked_versions(self)
+            updated = super().update(**kwargs)
+            new_values = {
+                pk: (version, date)
+                for pk, version, date in self.model._base_manager.using(self.db)
+                .filter(pk__in=list(old_values))
+                .values_list("pk", *VERSIONED_SOP_FIELDS)
+            }
+            VersionChange.objects.using(self.db).bulk_create(_version_changes(old_values, new_values))
+        return updated
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        updated = super().bulk_update(objs, fields, batch_size=batch_size)
+        for obj in objs:
+            obj._loaded_versions = obj._version_values()
+        return updated
+
+
+class SOP(LimsModel):
     """Standard operating procedures.
 
     Versioning is handled automatically: when an existing SOP record is
     updated and either its version number or effective date changes, a
-    corresponding `VersionChange` record is created.  See the override of
-    `save()` below.
+    corresponding `VersionChange` record is created.  The values loaded from
+    the database are remembered on the instance, so an update that leaves the
+    version untouched costs no extra query; when the version does change the
+    row is locked and its committed values are logged in the same
+    transaction.  `QuerySet.update()` and `bulk_update()` are covered by
+    `SOPQuerySet`.
     """
 
     sop_name = models.CharField(max_length=16)
     version_number = models.DecimalField(max_digits=3, decimal_places=1)
     effective_date = models.DateField()
 
+    objects = SOPQuerySet.as_manager()
+
     def __str__(self) -> str:
         return f"{self.sop_name} v{self.version_number}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(name in instance.__dict__ for name in VERSIONED_SOP_FIELDS):
+            instance._loaded_versions = instance._version_values()
+        return instance
+
+    def _version_values(self) -> tuple:
+        return (self.version_number, self.effective_date)
+
     def save(self, *args, **kwargs) -> None:
-        creating = self.pk is None
+        current = self._version_values()
         # Only perform version change logging on updates (not creates)
-        if not creating:
-            old = SOP.objects.get(pk=self.pk)
-            if (
-                old.version_number != self.version_number
-                or old.effective_date != self.effective_date
-            ):
-                # Import inside to avoid circular import issues
-                VersionChange.objects.create(
-                    old_version_number=old.version_number,
-                    new_version_number=self.version_number,
-                    old_effective_date=old.effective_date,
-                    new_effective_date=self.effective_date,
-                    sop=self,
-                    change_date=timezone.now(),
-                )
-        super().save(*args, **kwargs)
+        if self.pk is None or getattr(self, "_loaded_versions", None) == current:
+            super().save(*args, **kwargs)
+        else:
+            with transaction.atomic(using=kwargs.get("using") or self._state.db):
+                old_values = _locked_versions(SOP.objects.filter(pk=self.pk))
+                super().save(*args, **kwargs)
+                VersionChange.objects.bulk_create(_version_changes(old_values, {self.pk: current}))
+        self._loaded_versions = current
 
 
-class UserSOPAction(models.Model):
+class UserSOPAction(LimsModel):
     """Records actions taken by users on SOPs (QA authoring/reviewing/approval)."""
 
     user_account = models.ForeignKey(UserAccount, on_delete=models.CASCADE)
@@ -130,16 +282,18 @@ class UserSOPAction(models.Model):
         return f"{self.user_account} → {self.sop}"
 
 
-class Client(models.Model):
+class Client(LimsModel):
     """Represents an external client (customer)."""
 
     client_name = models.CharField(max_length=64, unique=True)
 
+    objects = TrackedQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.client_name
 
 
-class Warehouse(models.Model):
+class Warehouse(LimsModel):
     """Represents a warehouse facility.
 
     Each warehouse is linked to an SOP which governs its procedures.
@@ -150,6 +304,8 @@ class Warehouse(models.Model):
     warehouse_facility = models.CharField(max_length=64)
     warehouse_company = models.CharField(max_length=64)
 
+    objects = TrackedQuerySet.as_manager()
+
     class Meta:
         unique_together = ("warehouse_facility", "warehouse_company")
 
@@ -157,7 +313,7 @@ class Warehouse(models.Model):
         return f"{self.warehouse_company} – {self.warehouse_facility}"
 
 
-class WarehouseClientLink(models.Model):
+class WarehouseClientLink(LimsModel):
     """Links warehouses to clients, recording shipments."""
 
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE)
@@ -168,22 +324,34 @@ class WarehouseClientLink(models.Model):
     delivery_time = models.DateTimeField()
     acceptable_delivery = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Shipments leaving a warehouse in a period (custody timelines).
+            models.Index(fields=["warehouse", "shipping_time"], name="shipment_warehouse_time_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Shipment {self.pk} from {self.warehouse} to {self.client}"
 
 
-class Location(models.Model):
+class Location(LimsModel):
     """Represents a physical location (room or area)."""
 
     location_type = models.CharField(max_length=64, null=True, blank=True)
     room_number = models.PositiveIntegerField()
 
+    objects = TrackedQuerySet.as_manager()
+
     def __str__(self) -> str:
         return f"{self.location_type or 'Room'} {self.room_number}"
 
 
-class Equipment(models.Model):
-    """Laboratory equipment or instruments."""
+class Equipment(LimsModel):
+    """Laboratory equipment or instruments.
+
+    `out_of_service` is set by the maintenance sweep when the instrument is
+    due for service (see `maintenance.py`).
+    """
 
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
     sop = models.ForeignKey(SOP, on_delete=models.CASCADE)
@@ -191,26 +359,50 @@ class Equipment(models.Model):
     min_use_range = models.DecimalField(max_digits=16, decimal_places=6)
     max_use_range = models.DecimalField(max_digits=16, decimal_places=6)
     in_use = models.BooleanField(default=False)
+    out_of_service = models.BooleanField(default=False)
 
     def __str__(self) -> str:
         return self.equipment_name
 
 
-class MaintenanceLog(models.Model):
-    """Records equipment maintenance events."""
+class MaintenanceLog(LimsModel):
+    """Records equipment maintenance events.
+
+    `service_interval` is parsed on save into `interval_count` and
+    `interval_unit`, and `next_service_date` is computed from it; when the
+    interval cannot be parsed both are left as given (see `maintenance.py`).
+    """
 
     equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE)
     sop = models.ForeignKey(SOP, on_delete=models.CASCADE)
     service_date = models.DateField()
     service_description = models.TextField()
     service_interval = models.CharField(max_length=64)
-    next_service_date = models.DateField()
+    next_service_date = models.DateField(blank=True)
+    interval_count = models.PositiveIntegerField(null=True, blank=True)
+    interval_unit = models.CharField(max_length=1, choices=maintenance.UNIT_CHOICES, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["next_service_date"], name="maint_next_service_idx"),
+            models.Index(fields=["equipment", "next_service_date"], name="maint_equip_next_service_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Maintenance {self.pk} on {self.equipment}"
 
+    def save(self, *args, **kwargs) -> None:
+        interval = maintenance.parse_interval(self.service_interval)
+        self.interval_count, self.interval_unit = interval or (None, None)
+        if interval is not None:
+            self.next_service_date = interval.add_to(self.service_date)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "interval_count", "interval_unit", "next_service_date"}
+        super().save(*args, **kwargs)
 
-class Sample(models.Model):
+
+class Sample(LimsModel):
     """Represents a product sample.
 
     Samples belong to a location and warehouse and are associated with an SOP.
@@ -228,11 +420,26 @@ class Sample(models.Model):
     sample_type = models.CharField(max_length=1, choices=[("I", "InProcess"), ("S", "Stability"), ("F", "FinishedProduct")])
     storage_conditions = models.CharField(max_length=5)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination order and time-range dashboards.
+            models.Index(fields=["time_received", "id"], name="sample_received_idx"),
+            models.Index(fields=["sample_type", "time_received"], name="sample_type_received_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Sample {self.pk} ({self.product_name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_product_name = instance.__dict__.get("product_name")
+        if "location_id" in instance.__dict__ and "warehouse_id" in instance.__dict__:
+            instance._loaded_custody = (instance.location_id, instance.warehouse_id)
+        return instance
+
 
-class InProcess(models.Model):
+class InProcess(LimsModel):
     """Detail for in-process samples."""
 
     sample = models.OneToOneField(Sample, on_delete=models.CASCADE, primary_key=True)
@@ -242,7 +449,7 @@ class InProcess(models.Model):
         return f"InProcess {self.sample}"
 
 
-class Stability(models.Model):
+class Stability(LimsModel):
     """Detail for stability samples."""
 
     sample = models.OneToOneField(Sample, on_delete=models.CASCADE, primary_key=True)
@@ -252,7 +459,7 @@ class Stability(models.Model):
         return f"Stability {self.sample}"
 
 
-class FinishedProduct(models.Model):
+class FinishedProduct(LimsModel):
     """Detail for finished product samples."""
 
     sample = models.OneToOneField(Sample, on_delete=models.CASCADE, primary_key=True)
@@ -262,7 +469,11 @@ class FinishedProduct(models.Model):
         return f"Finished {self.sample}"
 
 
-class UserSampleAction(models.Model):
+# Detail model of each sample subtype -> the `Sample.sample_type` it requires.
+SAMPLE_DETAIL_TYPES = {InProcess: "I", Stability: "S", FinishedProduct: "F"}
+
+
+class UserSampleAction(LimsModel):
     """Logs actions that users perform on samples."""
 
     user_account = models.ForeignKey(UserAccount, on_delete=models.CASCADE)
@@ -273,21 +484,66 @@ class UserSampleAction(models.Model):
     def __str__(self) -> str:
         return f"Sample action by {self.user_account} on {self.sample}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "aliquoting_analyst" in instance.__dict__:
+            instance._loaded_aliquoting = instance.aliquoting_analyst
+        return instance
+
 
-class Test(models.Model):
-    """Represents a laboratory test procedure."""
+class Test(LimsModel):
+    """Represents a laboratory test procedure.
+
+    The acceptance limits are remembered as loaded from the database; when a
+    save changes them, every stored result of the test is re-evaluated in
+    the same transaction.
+    """
 
     user_account = models.ForeignKey(UserAccount, on_delete=models.CASCADE)
     sop = models.ForeignKey(SOP, on_delete=models.CASCADE, unique=True)
     min_acceptable_result = models.DecimalField(max_digits=16, decimal_places=6, null=True, blank=True)
     max_acceptable_result = models.DecimalField(max_digits=16, decimal_places=6, null=True, blank=True)
 
+    objects = TrackedQuerySet.as_manager()
+
     def __str__(self) -> str:
         return f"Test {self.pk} for SOP {self.sop}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_limits = (
+            instance.__dict__.get("min_acceptable_result"),
+            instance.__dict__.get("max_acceptable_result"),
+        )
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        from .evaluation import reevaluate_test
+
+        limits = (self.min_acceptable_result, self.max_acceptable_result)
+        limits_changed = self.pk is not None and getattr(self, "_loaded_limits", None) != limits
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if limits_changed:
+                reevaluate_test(self.pk, *limits)
+        self._loaded_limits = limits
+
+
+class SampleTestLink(LimsModel):
+    """Links samples to tests and stores results.
+
+    `pass_or_fail` is derived from `test_result` and the test's acceptance
+    limits on every save; any value supplied by the caller is overwritten.
 
-class SampleTestLink(models.Model):
-    """Links samples to tests and stores results."""
+    A test is open until `completed_at` is set.  Open tests form the analyst
+    work-queue (see `work_queue.py`), where an analyst claims them by
+    deadline; `claimed_by`/`claimed_at` record the claim.
+
+    `updated_at` is stamped by every write, including set-based ones, and is
+    `NULL` for rows not written since the column was added.
+    """
 
     sample = models.ForeignKey(Sample, on_delete=models.CASCADE)
     test = models.ForeignKey(Test, on_delete=models.CASCADE)
@@ -296,12 +552,67 @@ class SampleTestLink(models.Model):
     test_result = models.DecimalField(max_digits=16, decimal_places=6)
     deadline = models.DateTimeField()
     pass_or_fail = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=64, null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
+    objects = ResultQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order and deadline-range dashboards.
+            models.Index(fields=["deadline", "id"], name="result_deadline_idx"),
+            # Partial index: the work-queue of open tests, in deadline order.
+            models.Index(
+                fields=["deadline", "id"],
+                condition=models.Q(completed_at__isnull=True),
+                name="result_open_deadline_idx",
+            ),
+            models.Index(fields=["test", "deadline"], name="result_test_deadline_idx"),
+            # Covers the per-test fingerprint keying the SPC chart cache.
+            models.Index(fields=["test", "updated_at"], name="result_test_updated_idx"),
+            # Partial index: only failing results, which dashboards list by deadline.
+            models.Index(
+                fields=["deadline"],
+                condition=models.Q(pass_or_fail=False),
+                name="result_failed_deadline_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"SampleTestLink {self.pk}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        from .result_stats import STAT_FIELDS
+
+        instance = super().from_db(db, field_names, values)
+        if all(name in instance.__dict__ for name in STAT_FIELDS):
+            instance._loaded_stats = tuple(instance.__dict__[name] for name in STAT_FIELDS)
+        if "completed_at" in instance.__dict__:
+            instance._loaded_completed_at = instance.completed_at
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        from .evaluation import evaluate, limits_for
+        from .result_stats import STAT_FIELDS
+
+        if self.pk is not None and getattr(self, "_loaded_stats", None) is None:
+            # Loaded with deferred fields: fetch the values the statistics
+            # currently count before they are overwritten.
+            self._loaded_stats = (
+                SampleTestLink.objects.filter(pk=self.pk).values_list(*STAT_FIELDS).first()
+            )
+        # Limits are read afresh: `self.test` may be a lookup cache copy.
+        self.pass_or_fail = evaluate(self.test_result, *limits_for([self.test_id])[self.test_id])
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "pass_or_fail"}
+        super().save(*args, **kwargs)
+
 
-class TestEquipmentLink(models.Model):
+class TestEquipmentLink(LimsModel):
     """Associates tests with the equipment used."""
 
     test = models.ForeignKey(Test, on_delete=models.CASCADE)
@@ -311,8 +622,18 @@ class TestEquipmentLink(models.Model):
         return f"TestEquipmentLink {self.pk}"
 
 
-class Reagent(models.Model):
-    """Chemical or reagent used in laboratory procedures."""
+class Reagent(LimsModel):
+    """Chemical or reagent used in laboratory procedures.
+
+    Each row is one lot.  `quantity_on_hand` starts at `quantity_received`
+    and is kept current by `inventory.py` as `TestReagentLink` rows record
+    consumption; it is never written by a regular save, so concurrent
+    consumption updates are not lost.  Both are NULL (unknown) for lots
+    whose receipt was never entered, including those received before stock
+    was tracked, until a receipt is entered.  `daily_usage`
+    and `stockout_date` are projections refreshed in batch by
+    `project_reagent_stock`.
+    """
 
     sop = models.ForeignKey(SOP, on_delete=models.CASCADE)
     reagent_name = models.CharField(max_length=255)
@@ -321,12 +642,59 @@ class Reagent(models.Model):
     vendor = models.CharField(max_length=255)
     manufacturing_date = models.DateField()
     expiration_date = models.DateField()
+    quantity_received = models.DecimalField(max_digits=16, decimal_places=6, null=True, blank=True)
+    quantity_on_hand = models.DecimalField(max_digits=16, decimal_places=6, null=True, blank=True)
+    daily_usage = models.FloatField(null=True, blank=True)
+    stockout_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["expiration_date"], name="reagent_expiration_idx"),
+            models.Index(fields=["stockout_date"], name="reagent_stockout_idx"),
+            # Usable lots of a reagent, looked up by blocked-test queries.
+            models.Index(fields=["cas_number", "expiration_date"], name="reagent_cas_expiry_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.reagent_name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_received = instance.__dict__.get("quantity_received")
+        return instance
 
-class UserReagentAction(models.Model):
+    def save(self, *args, **kwargs) -> None:
+        from .inventory import rebuild_stock
+
+        if self._state.adding:
+            self.quantity_on_hand = self.quantity_received
+            super().save(*args, **kwargs)
+            self._loaded_received = self.quantity_received
+            return
+        loaded = getattr(self, "_loaded_received", None)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+        kwargs["update_fields"] = [name for name in update_fields if name != "quantity_on_hand"]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if "quantity_received" in kwargs["update_fields"] and loaded != self.quantity_received:
+                if loaded is None or self.quantity_received is None:
+                    # Stock was or becomes unknown: recount it from the receipt.
+                    rebuild_stock([self.pk])
+                else:
+                    # Receiving more (or correcting the receipt) shifts the stock.
+                    Reagent.objects.filter(pk=self.pk).update(
+                        quantity_on_hand=models.F("quantity_on_hand") + (self.quantity_received - loaded)
+                    )
+                self.quantity_on_hand = Reagent.objects.filter(pk=self.pk).values_list(
+                    "quantity_on_hand", flat=True
+                ).get()
+        self._loaded_received = self.quantity_received
+
+
+class UserReagentAction(LimsModel):
     """Logs actions users take with reagents."""
 
     user_account = models.ForeignKey(UserAccount, on_delete=models.CASCADE)
@@ -337,16 +705,35 @@ class UserReagentAction(models.Model):
         return f"{self.user_account} handled {self.reagent}"
 
 
-class TestReagentLink(models.Model):
-    """Associates tests with reagents used and records the volume used."""
+class TestReagentLink(LimsModel):
+    """Associates tests with reagents used and records the volume used.
+
+    Saves and deletes adjust the lot's `quantity_on_hand` by the change in
+    consumption, using the values the row was loaded with (see
+    `inventory.py`).
+    """
 
     test = models.ForeignKey(Test, on_delete=models.CASCADE)
     reagent = models.ForeignKey(Reagent, on_delete=models.CASCADE)
     volume_used = models.DecimalField(max_digits=16, decimal_places=6)
+    used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Consumption history read by the stock projection.
+            models.Index(fields=["used_at"], name="reagent_use_time_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"TestReagentLink {self.pk}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "reagent_id" in instance.__dict__ and "volume_used" in instance.__dict__:
+            instance._loaded_usage = (instance.reagent_id, instance.volume_used)
+        return instance
+
 
 class VersionChange(models.Model):
     """Logs changes to SOP version numbers and effective dates."""
@@ -360,3 +747,193 @@ class VersionChange(models.Model):
 
     def __str__(self) -> str:
         return f"Version change on {self.sop}"
+
+
+class TableVersion(models.Model):
+    """Per-table version stamp used for HTTP conditional requests.
+
+    One row per versioned model (keyed by its `app_label.model` label) whose
+    `version` is incremented by signal handlers on every save or delete, in
+    the same transaction as the write.  Reference-data endpoints derive
+    their `ETag`/`Last-Modified` headers from it, so checking whether a
+    client's copy is current is a single primary-key lookup.
+    """
+
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def bump(cls, model) -> None:
+        """Increment the version of `model`'s table."""
+
+        name = model._meta.label_lower
+        now = timezone.now()
+        updated = cls.objects.filter(name=name).update(version=models.F("version") + 1, updated_at=now)
+        if not updated:
+            obj, created = cls.objects.get_or_create(name=name, defaults={"version": 1, "updated_at": now})
+            if not created:
+                cls.objects.filter(name=name).update(version=models.F("version") + 1, updated_at=now)
+
+    @classmethod
+    def current(cls, model_list) -> dict[str, "TableVersion"]:
+        """Fetch the stamps of several tables, keyed by label, in one query."""
+
+        names = [model._meta.label_lower for model in model_list]
+        return {row.name: row for row in cls.objects.filter(name__in=names)}
+
+
+class ResultStatistic(models.Model):
+    """Running totals of results for one test, product and month.
+
+    `month` is the first day of the month of the results' `deadline`.  The
+    mean and standard deviation are derived from `result_sum` and
+    `result_sum_squares`; rows are maintained incrementally by
+    `result_stats.py` and can be recomputed with `rebuild_result_stats`.
+    """
+
+    test = models.ForeignKey(Test, on_delete=models.CASCADE)
+    product_name = models.CharField(max_length=64)
+    month = models.DateField()
+    result_count = models.PositiveIntegerField(default=0)
+    pass_count = models.PositiveIntegerField(default=0)
+    result_sum = models.FloatField(default=0.0)
+    result_sum_squares = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["test", "product_name", "month"], name="result_stat_key_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.test} / {self.product_name} / {self.month:%Y-%m}"
+
+
+class EquipmentReservation(LimsModel):
+    """A booking of an instrument for the half-open interval [start, end).
+
+    Bookings of one instrument never overlap and last at most
+    `LIMS_RESERVATIONS["MAX_HOURS"]`; both are enforced by `reservations.py`,
+    which relies on that bound to find overlaps with a bounded range scan of
+    the `(equipment, start_time)` index.
+    """
+
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name="reservations")
+    sample_test_link = models.ForeignKey(SampleTestLink, on_delete=models.SET_NULL, null=True, blank=True)
+    reserved_by = models.CharField(max_length=64)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["equipment", "start_time"], name="reservation_equip_start_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.equipment} {self.start_time:%Y-%m-%d %H:%M}-{self.end_time:%H:%M}"
+
+
+class CustodyEvent(models.Model):
+    """One step in a sample's chain of custody.
+
+    Rows are appended by `custody.py` when a sample is received, moved to
+    another location or warehouse, handled or aliquoted, and when one of its
+    tests is assigned or completed.  A sample's timeline is a range scan of
+    `custody_sample_time_idx`.
+    """
+
+    RECEIVED = "received"
+    HANDLED = "handled"
+    ALIQUOTED = "aliquoted"
+    MOVED = "moved"
+    TRANSFERRED = "transferred"
+    TEST_ASSIGNED = "test_assigned"
+    TEST_COMPLETED = "test_completed"
+    EVENT_TYPES = [
+        (RECEIVED, "Received"),
+        (HANDLED, "Handled"),
+        (ALIQUOTED, "Aliquoted"),
+        (MOVED, "Moved to another location"),
+        (TRANSFERRED, "Transferred to another warehouse"),
+        (TEST_ASSIGNED, "Test assigned"),
+        (TEST_COMPLETED, "Test completed"),
+    ]
+
+    # The (sample, occurred_at, id) index below also serves the foreign key.
+    sample = models.ForeignKey(Sample, on_delete=models.CASCADE, related_name="custody_events", db_index=False)
+    occurred_at = models.DateTimeField()
+    event_type = models.CharField(max_length=16, choices=EVENT_TYPES)
+    actor = models.CharField(max_length=64, null=True, blank=True)
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True)
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.SET_NULL, null=True, blank=True)
+    sample_test_link = models.ForeignKey(SampleTestLink, on_delete=models.SET_NULL, null=True, blank=True)
+    detail = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["sample", "occurred_at", "id"], name="custody_sample_time_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_event_type_display()} {self.sample_id} at {self.occurred_at:%Y-%m-%d %H:%M}"
+
+
+class SearchEntry(models.Model):
+    """Searchable text of one sample, reagent, instrument or SOP.
+
+    Maintained by `search.py`, which also describes the trigram indexes the
+    migration adds on PostgreSQL and SQLite.
+    """
+
+    kind = models.CharField(max_length=16)
+    object_id = models.BigIntegerField()
+    text = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="search_entry_object_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.object_id}: {self.text}"
+
+
+class AuditEntry(models.Model):
+    """One create, update or delete of a row of another LIMS table.
+
+    `changes` maps each changed field to `[old, new]`, with `null` on the
+    side that does not exist (creates and deletes) or was not loaded.
+    Written in batches by `audit.py`; the table rejects updates and deletes
+    and, on PostgreSQL, is partitioned by month of `occurred_at`.
+    """
+
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+    ACTIONS = [(CREATE, "Create"), (UPDATE, "Update"), (DELETE, "Delete")]
+
+    # Assigned when the change is captured, so replaying a batch is idempotent.
+    entry_id = models.UUIDField()
+    occurred_at = models.DateTimeField()
+    model = models.CharField(max_length=64)
+    object_pk = models.CharField(max_length=64)
+    action = models.CharField(max_length=8, choices=ACTIONS)
+    actor = models.CharField(max_length=150, null=True, blank=True)
+    request = models.CharField(max_length=255, blank=True)
+    changes = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            # Unique constraints of a partitioned table must include its key.
+            models.UniqueConstraint(fields=["entry_id", "occurred_at"], name="audit_entry_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["model", "object_pk", "occurred_at"], name="audit_object_time_idx"),
+            models.Index(fields=["occurred_at"], name="audit_time_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.action} {self.model} {self.object_pk} at {self.occurred_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,147 @@
+"""
+Equipment reservations: conflict checks and free-slot search.
+
+An `EquipmentReservation` books one instrument for `[start_time, end_time)`.
+Overlap queries are interval queries, which a B-tree cannot answer directly;
+this module makes them range scans of the `(equipment, start_time)` index by
+bounding the length of a booking to `LIMS_RESERVATIONS["MAX_HOURS"]`.  A
+booking that overlaps `[start, end)` must then start in
+`(start - MAX_HOURS, end)`, so
+
+* a conflict check reads only the bookings of one instrument that start in
+  that short range, with the instrument row locked so that two concurrent
+  bookings cannot both pass the check;
+* a free-slot search over every candidate instrument fetches the bookings
+  touching the window in one query and sweeps each instrument's bookings in
+  start order, collecting the gaps of at least the requested duration.
+
+`available()` answers "which instruments that can run test X, optionally in
+location L, are free for D minutes within the window": one query for the
+instruments (through `TestEquipmentLink`) and one for their bookings.
+Instruments out of service are skipped, and so are instruments flagged
+`in_use` when the window starts now.  It is served at `equipment/available/`;
+bookings written through `equipment-reservations/` are conflict-checked on
+save.
+"""
+
+from __future__ import annotations
+
+import datetime
+from collections import defaultdict
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import models
+
+
+def max_length() -> datetime.timedelta:
+    return datetime.timedelta(hours=settings.LIMS_RESERVATIONS["MAX_HOURS"])
+
+
+def overlapping(equipment_ids, start: datetime.datetime, end: datetime.datetime):
+    """Bookings of `equipment_ids` that overlap `[start, end)`."""
+
+    return models.EquipmentReservation.objects.filter(
+        equipment_id__in=equipment_ids,
+        start_time__gt=start - max_length(),
+        start_time__lt=end,
+        end_time__gt=start,
+    )
+
+
+def check_interval(start: datetime.datetime, end: datetime.datetime) -> None:
+    if end <= start:
+        raise ValidationError({"end_time": ["Must be after start_time."]})
+    if end - start > max_length():
+        raise ValidationError(
+            {"end_time": [f"A reservation may last at most {settings.LIMS_RESERVATIONS['MAX_HOURS']} hours."]}
+        )
+
+
+def lock_free(equipment_id: int, start: datetime.datetime, end: datetime.datetime,
+              exclude: Optional[int] = None) -> None:
+    """Lock the instrument and fail unless `[start, end)` is free on it.
+
+    Must be called inside a transaction that then writes the booking.
+    """
+
+    check_interval(start, end)
+    list(models.Equipment.objects.select_for_update().filter(pk=equipment_id).values_list("pk"))
+    conflicts = overlapping([equipment_id], start, end)
+    if exclude is not None:
+        conflicts = conflicts.exclude(pk=exclude)
+    ids = list(conflicts.values_list("pk", flat=True)[:10])
+    if ids:
+        listed = ", ".join(map(str, ids))
+        raise ValidationError(
+            {"non_field_errors": [f"Equipment {equipment_id} is already reserved then (reservation {listed})."]}
+        )
+
+
+def save_reservation(serializer) -> None:
+    """Save a validated reservation serializer after the conflict check."""
+
+    instance = serializer.instance
+    data = serializer.validated_data
+    equipment = data.get("equipment", getattr(instance, "equipment", None))
+    start = data.get("start_time", getattr(instance, "start_time", None))
+    end = data.get("end_time", getattr(instance, "end_time", None))
+    with transaction.atomic():
+        lock_free(equipment.pk, start, end, exclude=getattr(instance, "pk", None))
+        serializer.save()
+
+
+def free_slots(bookings, start: datetime.datetime, end: datetime.datetime,
+               duration: datetime.timedelta) -> list[tuple]:
+    """Gaps of at least `duration` in `[start, end)` between sorted bookings."""
+
+    slots = []
+    cursor = start
+    for booked_start, booked_end in bookings:
+        if booked_start - cursor >= duration:
+            slots.append((cursor, booked_start))
+        cursor = max(cursor, booked_end)
+    if end - cursor >= duration:
+        slots.append((cursor, end))
+    return slots
+
+
+def available(start: datetime.datetime, end: datetime.datetime, duration: Optional[datetime.timedelta] = None,
+              test: Optional[int] = None, location: Optional[int] = None) -> list[dict]:
+    """Instruments with a free slot of `duration` (default: all of the window)."""
+
+    duration = duration or end - start
+    equipment = models.Equipment.objects.all()
+    if test is not None:
+        equipment = equipment.filter(
+            pk__in=models.TestEquipmentLink.objects.filter(test_id=test).values("equipment_id")
+        )
+    if location is not None:
+        equipment = equipment.filter(location_id=location)
+    equipment = equipment.filter(out_of_service=False)
+    if start <= timezone.now():
+        equipment = equipment.filter(in_use=False)
+    candidates = list(equipment.order_by("pk").values("pk", "equipment_name", "location_id"))
+
+    bookings = defaultdict(list)
+    rows = overlapping(equipment.values("pk"), start, end).order_by("equipment_id", "start_time")
+    for equipment_id, booked_start, booked_end in rows.values_list("equipment_id", "start_time", "end_time"):
+        bookings[equipment_id].append((booked_start, booked_end))
+
+    result = []
+    for row in candidates:
+        slots = free_slots(bookings[row["pk"]], start, end, duration)
+        if slots:
+            result.append(
+                {
+                    "equipment": row["pk"],
+                    "equipment_name": row["equipment_name"],
+                    "location": row["location_id"],
+                    "free_slots": [{"start": slot_start, "end": slot_end} for slot_start, slot_end in slots],
+                }
+            )
+    return result
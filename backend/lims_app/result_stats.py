@@ -0,0 +1,348 @@
+"""
+Incrementally maintained result statistics.
+
+QA reports pass rate, mean, standard deviation and out-of-spec counts per
+test, per product and per month.  Rather than scanning `SampleTestLink`, each
+`ResultStatistic` row keeps running totals (count, passes, sum and sum of
+squares of `test_result`) for one `(test, product_name, month)` key, where
+the month is that of the result's `deadline`.  Every write adjusts the
+affected rows by a delta:
+
+* single saves and deletes (including cascades) through the signal handlers
+  in `signals.py`, using the values the instance was loaded with;
+* bulk writes in `bulk.py` by calling `results_created` / `results_changed`
+  directly, and bulk deletes by wrapping the delete in `batched()` so the
+  per-row signal deltas are merged and applied together, with one read and
+  one bulk write for all the affected keys;
+* re-evaluation of a test's verdicts and sample product renames by
+  recomputing the affected keys with `rebuild()`.
+
+`rebuild()` (the `rebuild_result_stats` management command) recomputes the
+table from scratch with one aggregate query, which also clears any
+floating-point drift in the running sums.  `tests/{id}/stats/` serves the
+statistics of one test, by product and by month.
+"""
+
+from __future__ import annotations
+
+import datetime
+import math
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, TruncMonth
+from django.utils import timezone
+
+from . import models
+
+# Columns of SampleTestLink that determine its contribution.
+STAT_FIELDS = ("test_id", "sample_id", "deadline", "test_result", "pass_or_fail")
+
+Key = tuple  # (test_id, product_name, month)
+
+_state = threading.local()
+
+
+def month_of(deadline: datetime.datetime) -> datetime.date:
+    if timezone.is_aware(deadline):
+        deadline = timezone.localtime(deadline)
+    return deadline.date().replace(day=1)
+
+
+def stat_values(result: models.SampleTestLink) -> tuple:
+    return tuple(getattr(result, name) for name in STAT_FIELDS)
+
+
+def _product_names(results: Iterable[models.SampleTestLink], sample_ids: Iterable[int]) -> dict:
+    """Map sample ids to product names, querying only samples not loaded."""
+
+    names = dict(getattr(_state, "names", None) or {})
+    for result in results:
+        if models.SampleTestLink.sample.is_cached(result):
+            names[result.sample_id] = result.sample.product_name
+    missing = set(sample_ids) - set(names)
+    if missing:
+        names.update(models.Sample.objects.filter(pk__in=missing).values_list("pk", "product_name"))
+    return names
+
+
+class Deltas(dict):
+    """Accumulates `[count, passes, sum, sum of squares]` changes per key."""
+
+    def add(self, key: Key, value, passed: bool, sign: int) -> None:
+        delta = self.setdefault(key, [0, 0, 0.0, 0.0])
+        value = float(value)
+        delta[0] += sign
+        delta[1] += sign if passed else 0
+        delta[2] += sign * value
+        delta[3] += sign * value * value
+
+    def merge(self, other: "Deltas") -> None:
+        for key, delta in other.items():
+            mine = self.setdefault(key, [0, 0, 0.0, 0.0])
+            for index, amount in enumerate(delta):
+                mine[index] += amount
+
+
+STAT_COLUMNS = ("result_count", "pass_count", "result_sum", "result_sum_squares")
+
+
+def apply(deltas: Deltas) -> None:
+    """Write accumulated deltas.
+
+    A single key is adjusted with one `F()` UPDATE (or an INSERT).  Several
+    keys are read with one locking query, adjusted in Python and written
+    back with one `bulk_update` and one `bulk_create`, so a batch costs a
+    fixed number of queries however many keys it touches.
+    """
+
+    if getattr(_state, "pending", None) is not None:
+        _state.pending.merge(deltas)
+        return
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if len(deltas) > 1:
+        _apply_batch(deltas)
+    elif deltas:
+        _apply_one(*deltas.popitem())
+
+
+def _apply_one(key: Key, delta: list) -> None:
+    test_id, product_name, month = key
+    count, passed, total, squares = delta
+    changes = dict(
+        result_count=F("result_count") + count,
+        pass_count=F("pass_count") + passed,
+        result_sum=F("result_sum") + total,
+        result_sum_squares=F("result_sum_squares") + squares,
+    )
+    rows = models.ResultStatistic.objects.filter(test_id=test_id, product_name=product_name, month=month)
+    if rows.update(**changes) or count <= 0:
+        # A missing key with a negative delta was removed by a rebuild
+        # or a cascade from its test; there is nothing to subtract from.
+        return
+    try:
+        with transaction.atomic():
+            models.ResultStatistic.objects.create(
+                test_id=test_id,
+                product_name=product_name,
+                month=month,
+                result_count=count,
+                pass_count=passed,
+                result_sum=total,
+                result_sum_squares=squares,
+            )
+    except IntegrityError:
+        # Another writer created the row first.
+        rows.update(**changes)
+
+
+def _apply_batch(deltas: dict) -> None:
+    batch_size = settings.LIMS_BULK_BATCH_SIZE
+    with transaction.atomic():
+        # A superset of the keys, locked so that no concurrent delta is lost
+        # between the read and the write.
+        rows = models.ResultStatistic.objects.select_for_update().filter(
+            test_id__in={key[0] for key in deltas},
+            product_name__in={key[1] for key in deltas},
+            month__in={key[2] for key in deltas},
+        )
+        changed = []
+        for row in rows:
+            delta = deltas.pop((row.test_id, row.product_name, row.month), None)
+            if delta is not None:
+                for column, amount in zip(STAT_COLUMNS, delta):
+                    setattr(row, column, getattr(row, column) + amount)
+                changed.append(row)
+        models.ResultStatistic.objects.bulk_update(changed, STAT_COLUMNS, batch_size=batch_size)
+        # Missing keys with a negative delta have nothing to subtract from.
+        missing = {key: delta for key, delta in deltas.items() if delta[0] > 0}
+        if not missing:
+            return
+        try:
+            with transaction.atomic():
+                models.ResultStatistic.objects.bulk_create(
+                    [
+                        models.ResultStatistic(
+                            test_id=test_id, product_name=product_name, month=month, **dict(zip(STAT_COLUMNS, delta))
+                        )
+                        for (test_id, product_name, month), delta in missing.items()
+                    ],
+                    batch_size=batch_size,
+                )
+        except IntegrityError:
+            # Another writer created some of the rows first.
+            for key, delta in missing.items():
+                _apply_one(key, delta)
+
+
+@contextmanager
+def batched(names: Optional[dict] = None):
+    """Merge deltas reported inside the block and apply them once at exit.
+
+    `names` may map sample ids to product names known in advance, sparing a
+    lookup per deleted row.
+    """
+
+    if getattr(_state, "pending", None) is not None:
+        yield
+        return
+    _state.pending = Deltas()
+    _state.names = names
+    try:
+        yield
+        pending = _state.pending
+    finally:
+        _state.pending = None
+        _state.names = None
+    apply(pending)
+
+
+def results_created(results: Iterable[models.SampleTestLink]) -> None:
+    results = list(results)
+    names = _product_names(results, (result.sample_id for result in results))
+    deltas = Deltas()
+    for result in results:
+        key = (result.test_id, names[result.sample_id], month_of(result.deadline))
+        deltas.add(key, result.test_result, result.pass_or_fail, +1)
+        result._loaded_stats = stat_values(result)
+    apply(deltas)
+
+
+def results_changed(results: Iterable[models.SampleTestLink]) -> None:
+    """Move the contribution of updated results from their loaded values."""
+
+    results = [result for result in results if getattr(result, "_loaded_stats", None) != stat_values(result)]
+    if not results:
+        return
+    loaded = [result._loaded_stats for result in results if getattr(result, "_loaded_stats", None)]
+    names = _product_names(results, [result.sample_id for result in results] + [old[1] for old in loaded])
+    deltas = Deltas()
+    for result in results:
+        old = getattr(result, "_loaded_stats", None)
+        if old is not None:
+            test_id, sample_id, deadline, value, passed = old
+            deltas.add((test_id, names[sample_id], month_of(deadline)), value, passed, -1)
+        key = (result.test_id, names[result.sample_id], month_of(result.deadline))
+        deltas.add(key, result.test_result, result.pass_or_fail, +1)
+        result._loaded_stats = stat_values(result)
+    apply(deltas)
+
+
+def results_deleted(results: Iterable[models.SampleTestLink]) -> None:
+    results = list(results)
+    names = _product_names(results, (result.sample_id for result in results))
+    deltas = Deltas()
+    for result in results:
+        key = (result.test_id, names.get(result.sample_id), month_of(result.deadline))
+        if key[1] is not None:
+            deltas.add(key, result.test_result, result.pass_or_fail, -1)
+    apply(deltas)
+
+
+def rebuild(test_ids: Optional[Iterable[int]] = None, product_names: Optional[Iterable[str]] = None) -> int:
+    """Recompute statistics with one aggregate query.
+
+    Restricted to the given tests and/or products when those are passed.
+    Returns the number of rows written.
+    """
+
+    results = models.SampleTestLink.objects.all()
+    stats = models.ResultStatistic.objects.all()
+    if test_ids is not None:
+        test_ids = list(test_ids)
+        results = results.filter(test_id__in=test_ids)
+        stats = stats.filter(test_id__in=test_ids)
+    if product_names is not None:
+        product_names = list(product_names)
+        results = results.filter(sample__product_name__in=product_names)
+        stats = stats.filter(product_name__in=product_names)
+
+    value = Cast("test_result", FloatField())
+    rows = (
+        results.annotate(month=TruncMonth("deadline", output_field=DateField()))
+        .values("test_id", "sample__product_name", "month")
+        .annotate(
+            result_count=Count("id"),
+            pass_count=Count("id", filter=Q(pass_or_fail=True)),
+            result_sum=Sum(value),
+            result_sum_squares=Sum(value * value),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        stats.delete()
+        created = models.ResultStatistic.objects.bulk_create(
+            [
+                models.ResultStatistic(
+                    test_id=row["test_id"],
+                    product_name=row["sample__product_name"],
+                    month=row["month"],
+                    result_count=row["result_count"],
+                    pass_count=row["pass_count"],
+                    result_sum=row["result_sum"] or 0.0,
+                    result_sum_squares=row["result_sum_squares"] or 0.0,
+                )
+                for row in rows.iterator()
+            ],
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def product_renamed(sample: models.Sample, old_name: str) -> None:
+    """Move a renamed sample's results between product keys."""
+
+    test_ids = set(models.SampleTestLink.objects.filter(sample=sample).values_list("test_id", flat=True))
+    if test_ids:
+        rebuild(test_ids, [old_name, sample.product_name])
+
+
+def summarize(count: int, passed: int, total: float, squares: float) -> dict:
+    """Turn running totals into the reported statistics."""
+
+    mean = total / count if count else None
+    stddev = None
+    if count > 1:
+        stddev = math.sqrt(max(squares - total * total / count, 0.0) / (count - 1))
+    return {
+        "result_count": count,
+        "pass_count": passed,
+        "out_of_spec_count": count - passed,
+        "pass_rate": passed / count if count else None,
+        "mean": mean,
+        "stddev": stddev,
+    }
+
+
+def test_statistics(test_id: int) -> dict:
+    """Overall, per-product and per-month statistics for one test.
+
+    Reads only the test's aggregate rows, so the cost depends on the number
+    of products and months, not on the number of results.
+    """
+
+    overall = [0, 0, 0.0, 0.0]
+    by_product: dict[str, list] = {}
+    by_month: dict[datetime.date, list] = {}
+    rows = models.ResultStatistic.objects.filter(test_id=test_id).values_list(
+        "product_name", "month", "result_count", "pass_count", "result_sum", "result_sum_squares"
+    )
+    for product_name, month, *totals in rows:
+        for bucket in (overall, by_product.setdefault(product_name, [0, 0, 0.0, 0.0]),
+                       by_month.setdefault(month, [0, 0, 0.0, 0.0])):
+            for index, amount in enumerate(totals):
+                bucket[index] += amount
+    return {
+        "test": test_id,
+        "overall": summarize(*overall),
+        "by_product": [
+            {"product_name": name, **summarize(*totals)} for name, totals in sorted(by_product.items())
+        ],
+        "by_month": [
+            {"month": month.isoformat(), **summarize(*totals)} for month, totals in sorted(by_month.items())
+        ],
+    }
@@ -0,0 +1,237 @@
+"""
+Unified search over samples, reagents, equipment and SOPs.
+
+The searchable columns of each model (`SEARCH_FIELDS`) are copied into one
+`SearchEntry` row per object, written by the save and delete signals in
+`signals.py` and, for bulk inserts that send no signals, by
+`index_objects()`.  A save that leaves the searchable text unchanged costs
+one indexed read and no write.  `rebuild()` (`manage.py
+rebuild_search_index`) re-indexes everything.
+
+Queries are answered by the trigram index of the database in use
+(`LIMS_SEARCH["BACKEND"]`, default: by database vendor):
+
+* `postgres`: a GIN `gin_trgm_ops` index on `SearchEntry.text` (created by
+  the migration on PostgreSQL only) answers the `%>` word-similarity
+  operator, and results are ranked by `word_similarity`, so typos, partial
+  words and fragments of CAS or lot numbers all match.
+* `fts5`: on SQLite, the migration creates an FTS5 table with the `trigram`
+  tokenizer over `SearchEntry.text`, kept in step by triggers.  Every query
+  word of three or more characters must occur as a substring and shorter
+  words are checked with `LIKE` on the matched rows.  When nothing matches,
+  words of six or more characters are retried with one typo allowed: such a
+  word matches when all of its trigrams that do not touch some single
+  character position are present.
+* `scan`: a case-insensitive substring scan, for databases with neither.
+
+The last two fetch up to `LIMS_SEARCH["CANDIDATES"]` matches unordered and
+rank them in Python, whole-word matches first, then prefixes, substrings
+and near misses, shorter texts first.  Scores run from 0 to 1.  The API
+serves it at `search/?q=`.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import models
+
+SEARCH_FIELDS = {
+    "sample": (models.Sample, ("product_name",)),
+    "reagent": (models.Reagent, ("reagent_name", "cas_number", "lot_number", "vendor")),
+    "equipment": (models.Equipment, ("equipment_name",)),
+    "sop": (models.SOP, ("sop_name",)),
+}
+KINDS = tuple(SEARCH_FIELDS)
+SEARCH_MODELS = {model: kind for kind, (model, _) in SEARCH_FIELDS.items()}
+
+FTS_TABLE = f"{models.SearchEntry._meta.db_table}_fts"
+
+_WORD = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+
+
+def document_text(values: Iterable) -> str:
+    return " ".join(str(value) for value in values if value not in (None, ""))
+
+
+def _text(instance) -> str:
+    _, fields = SEARCH_FIELDS[SEARCH_MODELS[type(instance)]]
+    return document_text(getattr(instance, name) for name in fields)
+
+
+def object_saved(instance) -> None:
+    """Index a saved object unless its searchable text is unchanged."""
+
+    kind, text = SEARCH_MODELS[type(instance)], _text(instance)
+    entry = models.SearchEntry.objects.filter(kind=kind, object_id=instance.pk)
+    indexed = entry.values_list("text", flat=True).first()
+    if indexed is None:
+        models.SearchEntry.objects.create(kind=kind, object_id=instance.pk, text=text)
+    elif indexed != text:
+        entry.update(text=text)
+
+
+def object_deleted(instance) -> None:
+    models.SearchEntry.objects.filter(kind=SEARCH_MODELS[type(instance)], object_id=instance.pk).delete()
+
+
+def index_objects(objs) -> None:
+    """Index new objects written without signals (e.g. by `bulk_create`)."""
+
+    models.SearchEntry.objects.bulk_create(
+        [models.SearchEntry(kind=SEARCH_MODELS[type(obj)], object_id=obj.pk, text=_text(obj)) for obj in objs],
+        batch_size=settings.LIMS_BULK_BATCH_SIZE,
+    )
+
+
+def rebuild() -> int:
+    """Re-index every searchable object; returns the number of entries."""
+
+    batch_size = settings.LIMS_BULK_BATCH_SIZE
+    count = 0
+    with transaction.atomic():
+        models.SearchEntry.objects.all().delete()
+        for kind, (model, fields) in SEARCH_FIELDS.items():
+            batch = []
+            rows = model.objects.order_by("pk").values_list("pk", *fields)
+            for pk, *values in rows.iterator(chunk_size=batch_size):
+                batch.append(models.SearchEntry(kind=kind, object_id=pk, text=document_text(values)))
+                if len(batch) >= batch_size:
+                    models.SearchEntry.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            models.SearchEntry.objects.bulk_create(batch)
+            count += len(batch)
+    return count
+
+
+_backend = None
+
+
+def backend() -> str:
+    global _backend
+    if _backend is None:
+        configured = settings.LIMS_SEARCH["BACKEND"]
+        if configured != "auto":
+            _backend = configured
+        elif connection.vendor == "postgresql":
+            _backend = "postgres"
+        elif connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names():
+            _backend = "fts5"
+        else:
+            _backend = "scan"
+    return _backend
+
+
+def _rows(rows) -> list[dict]:
+    return [
+        {"kind": kind, "id": object_id, "text": text, "score": round(score, 6)}
+        for kind, object_id, text, score in rows
+    ]
+
+
+def _postgres_search(query: str, kinds: list[str], limit: int) -> list[dict]:
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    rows = (
+        models.SearchEntry.objects.filter(kind__in=kinds, text__trigram_word_similar=query)
+        .annotate(score=TrigramWordSimilarity(query, "text"))
+        .order_by("-score", "kind", "object_id")
+        .values_list("kind", "object_id", "text", "score")[:limit]
+    )
+    return _rows(rows)
+
+
+def _trigrams(word: str) -> set[str]:
+    return {word[i:i + 3] for i in range(len(word) - 2)} or {word}
+
+
+def _word_score(word: str, text: str, tokens: set[str]) -> float:
+    if word in tokens:
+        return 1.0
+    if any(token.startswith(word) for token in tokens):
+        return 0.9
+    if word in text:
+        return 0.8
+    grams = _trigrams(word)
+    return 0.7 * sum(gram in text for gram in grams) / len(grams)
+
+
+def _rank(words: list[str], rows, limit: int) -> list[dict]:
+    """Order candidate rows: whole words, then prefixes, substrings, near misses."""
+
+    scored = []
+    for kind, object_id, text in rows:
+        lowered = text.lower()
+        tokens = set(_WORD.findall(lowered))
+        score = sum(_word_score(word, lowered, tokens) for word in words) / len(words)
+        scored.append((-score, len(text), kind, object_id, text))
+    scored.sort()
+    return _rows((kind, object_id, text, -score) for score, _, kind, object_id, text in scored[:limit])
+
+
+def _scan_search(words: list[str], kinds: list[str], limit: int) -> list[dict]:
+    rows = models.SearchEntry.objects.filter(kind__in=kinds)
+    for word in words:
+        rows = rows.filter(text__icontains=word)
+    candidates = rows.values_list("kind", "object_id", "text")[:settings.LIMS_SEARCH["CANDIDATES"]]
+    return _rank(words, candidates, limit)
+
+
+def _phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _fuzzy(word: str) -> str:
+    """FTS5 query matching `word` with at most one character wrong."""
+
+    grams = [word[i:i + 3] for i in range(len(word) - 2)]
+    clauses = {
+        " AND ".join(_phrase(gram) for i, gram in enumerate(grams) if not k - 2 <= i <= k)
+        for k in range(len(word))
+    }
+    if "" in clauses:
+        return _phrase(word)
+    return "(" + " OR ".join(f"({clause})" for clause in sorted(clauses)) + ")"
+
+
+def _fts_search(words: list[str], kinds: list[str], limit: int) -> list[dict]:
+    long_words = [word for word in words if len(word) >= 3]
+    if not long_words:
+        return _scan_search(words, kinds, limit)
+    table = models.SearchEntry._meta.db_table
+    # No ORDER BY: BM25 would be computed for every match of a common word,
+    # while unordered matches stream in rowid order and stop at the LIMIT.
+    sql = (
+        f"SELECT e.kind, e.object_id, e.text FROM {FTS_TABLE} JOIN {table} e ON e.id = {FTS_TABLE}.rowid"
+        f" WHERE {FTS_TABLE} MATCH %s AND e.kind IN ({', '.join(['%s'] * len(kinds))})"
+        + "".join(" AND e.text LIKE %s" for word in words if len(word) < 3)
+        + " LIMIT %s"
+    )
+    params = [*kinds, *(f"%{word}%" for word in words if len(word) < 3), settings.LIMS_SEARCH["CANDIDATES"]]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [" AND ".join(map(_phrase, long_words)), *params])
+        rows = cursor.fetchall()
+        if not rows:
+            cursor.execute(sql, [" AND ".join(map(_fuzzy, long_words)), *params])
+            rows = cursor.fetchall()
+    return _rank(words, rows, limit)
+
+
+def search(query: str, kinds: Optional[Iterable[str]] = None, limit: int = 20) -> list[dict]:
+    """Objects matching `query`, best first, as `{kind, id, text, score}`."""
+
+    kinds = [kind for kind in KINDS if kinds is None or kind in kinds]
+    words = _WORD.findall(query.lower())
+    if not words:
+        return []
+    name = backend()
+    if name == "postgres":
+        return _postgres_search(query, kinds, limit)
+    if name == "fts5":
+        return _fts_search(words, kinds, limit)
+    return _scan_search(words, kinds, limit)
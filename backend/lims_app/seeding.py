@@ -0,0 +1,555 @@
+"""
+Synthetic, referentially consistent LIMS data for benchmarks and demos.
+
+`seed()` fills every table a user writes to, at a scale set by the number of
+samples (see `plan()`): users with their analyst and administrator profiles,
+SOPs with their version history and QA actions, clients, warehouses and
+shipments, locations, instruments with maintenance logs and reservations,
+one test per SOP with acceptance limits and instruments, reagent lots with
+their handling and consumption, and the samples themselves with their
+subtype detail, action log and `RESULTS_PER_SAMPLE` results each.
+
+Values follow the rules the application enforces on its own writes, so the
+data reads like production data: verdicts are evaluated against the test's
+limits, maintenance intervals are parsed, reservations of one instrument
+never overlap, deadlines and completions come after receipt, and most past
+tests are completed while some open ones are claimed.  The same `seed`
+gives the same data, relative to the time of the run.
+
+Rows are written with `bulk_create`, samples and everything hanging off
+them in batches of `batch_size` samples per transaction, so millions of
+samples fit in memory.  Bulk inserts send no signals: the tables derived
+from others (result statistics, search index, chain of custody, stock on
+hand and stock-out projections, table versions) are rebuilt at the end, and
+nothing is written to the audit log.  `clear()` empties the same tables
+first, leaving the audit log alone.
+"""
+
+from __future__ import annotations
+
+import datetime
+import random
+from decimal import Decimal
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import custody, inventory, maintenance, models, result_stats, search
+from .evaluation import evaluate
+from .signals import VERSIONED_MODELS
+
+RESULTS_PER_SAMPLE = 3
+
+# Written by `seed()`, parents before children.
+SEEDED_MODELS = (
+    models.UserAccount,
+    models.Analyst,
+    models.Administrator,
+    models.SOP,
+    models.VersionChange,
+    models.UserSOPAction,
+    models.Client,
+    models.Warehouse,
+    models.WarehouseClientLink,
+    models.Location,
+    models.Equipment,
+    models.MaintenanceLog,
+    models.Test,
+    models.TestEquipmentLink,
+    models.Reagent,
+    models.UserReagentAction,
+    models.TestReagentLink,
+    models.Sample,
+    models.InProcess,
+    models.Stability,
+    models.FinishedProduct,
+    models.UserSampleAction,
+    models.SampleTestLink,
+    models.EquipmentReservation,
+)
+DERIVED_MODELS = (models.ResultStatistic, models.SearchEntry, models.CustodyEvent, models.TableVersion)
+
+FIRST_NAMES = (
+    "Ada", "Ben", "Chen", "Dana", "Emil", "Fatima", "Goran", "Hana", "Ivan", "Julia", "Kofi", "Lena",
+    "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Sven", "Tariq", "Uma", "Viktor", "Wen", "Yara",
+)
+LAST_NAMES = (
+    "Alvarez", "Becker", "Costa", "Dubois", "Eriksen", "Fischer", "Garcia", "Haddad", "Ito", "Jensen",
+    "Kowalski", "Larsen", "Moreau", "Novak", "Okafor", "Patel", "Rossi", "Schmidt", "Tanaka", "Weber",
+)
+DEPARTMENTS = ("Quality Control", "Quality Assurance", "Microbiology", "Stability", "Analytical R&D")
+PRODUCTS = (
+    "Amoxicillin", "Atorvastatin", "Cetirizine", "Clopidogrel", "Ibuprofen", "Levothyroxine", "Lisinopril",
+    "Metformin", "Omeprazole", "Paracetamol", "Ramipril", "Sertraline", "Simvastatin", "Valsartan",
+)
+STRENGTHS = ("5 mg", "10 mg", "20 mg", "50 mg", "100 mg", "250 mg", "500 mg")
+PRODUCT_STAGES = ("Raw material", "Granulate", "Bulk", "Coated", "Packaged")
+STORAGE_CONDITIONS = ("RT", "2-8C", "-20C", "-80C")
+STABILITY_CONDITIONS = ("25C/60%RH", "30C/65%RH", "40C/75%RH", "5C", "Photostability")
+LOCATION_TYPES = ("QC Lab", "Micro Lab", "Stability Chamber", "Sample Store", "Receiving")
+INSTRUMENTS = (
+    "HPLC", "UPLC", "GC", "Dissolution Bath", "Karl Fischer", "UV-Vis", "FTIR", "Balance", "pH Meter",
+)
+SERVICE_INTERVALS = ("30 days", "90 days", "3 months", "6 months", "1 year", "weekly")
+REAGENTS = (
+    ("Acetonitrile", "75-05-8"),
+    ("Methanol", "67-56-1"),
+    ("Ethanol", "64-17-5"),
+    ("Acetone", "67-64-1"),
+    ("Hydrochloric acid", "7647-01-0"),
+    ("Sodium hydroxide", "1310-73-2"),
+    ("Phosphoric acid", "7664-38-2"),
+    ("Potassium dihydrogen phosphate", "7778-77-0"),
+    ("Trifluoroacetic acid", "76-05-1"),
+    ("Ammonium acetate", "631-61-8"),
+)
+VENDORS = ("Sigma-Aldrich", "Merck", "Fisher Scientific", "VWR", "TCI", "Honeywell")
+COMPANIES = ("Northwind", "Contoso", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Acme")
+DELIVERY_SERVICES = ("DHL", "FedEx", "UPS", "World Courier", "Marken")
+
+
+def plan(samples: int, results_per_sample: int = RESULTS_PER_SAMPLE) -> dict[str, int]:
+    """Row counts of the main tables for `samples` samples."""
+
+    def scaled(divisor: int, low: int, high: int) -> int:
+        return max(low, min(high, samples // divisor))
+
+    users = scaled(200, 20, 5000)
+    sops = scaled(500, 20, 5000)
+    equipment = scaled(500, 10, 5000)
+    return {
+        "users": users,
+        "sops": sops,
+        "tests": max(1, sops * 4 // 5),
+        "clients": scaled(1000, 10, 5000),
+        "warehouses": scaled(5000, 3, 500),
+        "locations": scaled(1000, 5, 1000),
+        "shipments": scaled(10, 50, 10_000_000),
+        "equipment": equipment,
+        "maintenance_logs": equipment * 4,
+        "reservations": equipment * 10,
+        "reagents": scaled(100, 20, 100_000),
+        "reagent_uses": scaled(5, 100, 10_000_000),
+        "samples": samples,
+        "results": samples * results_per_sample,
+    }
+
+
+def clear() -> None:
+    """Empty every seeded and derived table (not the audit log)."""
+
+    tables = [model._meta.db_table for model in (*reversed(SEEDED_MODELS), *DERIVED_MODELS)]
+    connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables, reset_sequences=True))
+
+
+class Seeder:
+    """Writes one data set; `run()` returns the rows written per model."""
+
+    def __init__(self, samples: int, results_per_sample: int = RESULTS_PER_SAMPLE, days: int = 365,
+                 seed: int = 0, batch_size: Optional[int] = None,
+                 log: Optional[Callable[[str], None]] = None) -> None:
+        self.plan = plan(samples, results_per_sample)
+        self.results_per_sample = results_per_sample
+        self.days = days
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size or settings.LIMS_BULK_BATCH_SIZE
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.today = timezone.localdate()
+        self.counts: dict[str, int] = {}
+
+    def insert(self, model, objs: list) -> list:
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+        label = model._meta.label
+        self.counts[label] = self.counts.get(label, 0) + len(objs)
+        return objs
+
+    def past(self, days: Optional[int] = None) -> datetime.datetime:
+        return self.now - datetime.timedelta(seconds=self.rng.uniform(0, (days or self.days) * 86400))
+
+    def decimal(self, low: float, high: float, places: int = 6) -> Decimal:
+        return Decimal(str(round(self.rng.uniform(low, high), places)))
+
+    def run(self) -> dict[str, int]:
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise RuntimeError("Seeding needs a database that returns the ids of bulk-inserted rows.")
+        with transaction.atomic():
+            self.people()
+            self.procedures()
+            self.logistics()
+            self.instruments()
+            self.testing()
+            self.reagents()
+        self.log("Reference data written.")
+        written = 0
+        while written < self.plan["samples"]:
+            size = min(self.batch_size, self.plan["samples"] - written)
+            with transaction.atomic():
+                self.samples(size)
+            written += size
+            self.log(f"Seeded {written}/{self.plan['samples']} samples.")
+        return self.counts
+
+    def people(self) -> None:
+        rng = self.rng
+        users = []
+        for i in range(self.plan["users"]):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            username = f"{first}.{last}.{i}".lower()
+            users.append(
+                models.UserAccount(
+                    account_username=username,
+                    first_name=first,
+                    last_name=last,
+                    phone=f"+1-555-{rng.randrange(10000):04d}",
+                    email=f"{username}@lab.example.com",
+                    department=rng.choice(DEPARTMENTS),
+                    training_completed=rng.random() < 0.9,
+                    is_analyst=i % 10 < 7,
+                    is_administrator=i % 10 >= 8,
+                )
+            )
+        self.users = self.insert(models.UserAccount, users)
+        analysts = [user for user in self.users if user.is_analyst]
+        self.analyst_names = [user.account_username for user in analysts]
+        self.insert(
+            models.Analyst,
+            [
+                models.Analyst(
+                    user_account=user,
+                    access_level=rng.randint(1, 3),
+                    analyst_supervisor=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                )
+                for user in analysts
+            ],
+        )
+        self.insert(
+            models.Administrator,
+            [
+                models.Administrator(user_account=user, is_supervisor=rng.random() < 0.3)
+                for user in self.users
+                if user.is_administrator
+            ],
+        )
+
+    def procedures(self) -> None:
+        rng = self.rng
+        sops = [
+            models.SOP(
+                sop_name=f"SOP-{i + 1:05d}",
+                version_number=Decimal(rng.randint(1, 5)),
+                effective_date=self.today - datetime.timedelta(days=rng.randrange(30, 720)),
+            )
+            for i in range(self.plan["sops"])
+        ]
+        self.sops = self.insert(models.SOP, sops)
+        self.insert(
+            models.VersionChange,
+            [
+                models.VersionChange(
+                    sop=sop,
+                    old_version_number=sop.version_number - 1,
+                    new_version_number=sop.version_number,
+                    old_effective_date=sop.effective_date - datetime.timedelta(days=rng.randrange(90, 720)),
+                    new_effective_date=sop.effective_date,
+                    change_date=sop.effective_date,
+                )
+                for sop in self.sops
+                if sop.version_number > 1
+            ],
+        )
+        self.insert(
+            models.UserSOPAction,
+            [
+                models.UserSOPAction(
+                    user_account=rng.choice(self.users),
+                    sop=sop,
+                    qa_author=rng.choice(self.analyst_names),
+                    qa_reviewer=rng.choice(self.analyst_names),
+                    qa_approver=rng.choice(self.analyst_names),
+                )
+                for sop in self.sops
+                for _ in range(rng.randint(1, 2))
+            ],
+        )
+
+    def logistics(self) -> None:
+        rng = self.rng
+        self.clients = self.insert(
+            models.Client,
+            [
+                models.Client(client_name=f"{rng.choice(COMPANIES)} Pharma {i + 1}")
+                for i in range(self.plan["clients"])
+            ],
+        )
+        self.warehouses = self.insert(
+            models.Warehouse,
+            [
+                models.Warehouse(
+                    sop=rng.choice(self.sops),
+                    warehouse_technician=rng.choice(self.analyst_names),
+                    warehouse_facility=f"Facility {i + 1}",
+                    warehouse_company=rng.choice(COMPANIES) + " Logistics",
+                )
+                for i in range(self.plan["warehouses"])
+            ],
+        )
+        self.locations = self.insert(
+            models.Location,
+            [
+                models.Location(location_type=rng.choice(LOCATION_TYPES), room_number=100 + i)
+                for i in range(self.plan["locations"])
+            ],
+        )
+        shipments = []
+        for _ in range(self.plan["shipments"]):
+            shipped = self.past()
+            shipments.append(
+                models.WarehouseClientLink(
+                    warehouse=rng.choice(self.warehouses),
+                    client=rng.choice(self.clients),
+                    quantity_shipped=Decimal(rng.randint(1, 500)),
+                    delivery_service=rng.choice(DELIVERY_SERVICES),
+                    shipping_time=shipped,
+                    delivery_time=shipped + datetime.timedelta(hours=rng.randint(12, 120)),
+                    acceptable_delivery=rng.random() < 0.95,
+                )
+            )
+            if len(shipments) >= self.batch_size:
+                self.insert(models.WarehouseClientLink, shipments)
+                shipments = []
+        self.insert(models.WarehouseClientLink, shipments)
+
+    def instruments(self) -> None:
+        rng = self.rng
+        equipment = []
+        for i in range(self.plan["equipment"]):
+            low = self.decimal(0, 10)
+            equipment.append(
+                models.Equipment(
+                    location=rng.choice(self.locations),
+                    sop=rng.choice(self.sops),
+                    equipment_name=f"{rng.choice(INSTRUMENTS)} {i + 1:04d}",
+                    min_use_range=low,
+                    max_use_range=low + self.decimal(10, 1000),
+                    in_use=rng.random() < 0.1,
+                )
+            )
+        self.equipment = self.insert(models.Equipment, equipment)
+
+        # Built as `MaintenanceLog.save()` would, which bulk inserts skip.
+        logs = []
+        for instrument in self.equipment:
+            service_date = self.today - datetime.timedelta(days=rng.randrange(0, 730))
+            for _ in range(self.plan["maintenance_logs"] // len(self.equipment)):
+                text = rng.choice(SERVICE_INTERVALS)
+                interval = maintenance.parse_interval(text)
+                logs.append(
+                    models.MaintenanceLog(
+                        equipment=instrument,
+                        sop=instrument.sop,
+                        service_date=service_date,
+                        service_description=f"Scheduled {text} service and calibration",
+                        service_interval=text,
+                        next_service_date=interval.add_to(service_date),
+                        interval_count=interval.count,
+                        interval_unit=interval.unit,
+                    )
+                )
+                service_date -= datetime.timedelta(days=rng.randrange(30, 365))
+        self.insert(models.MaintenanceLog, logs)
+
+        # Back to back with random gaps, so bookings of one instrument never overlap.
+        max_hours = min(8, settings.LIMS_RESERVATIONS["MAX_HOURS"])
+        reservations = []
+        for instrument in self.equipment:
+            start = self.now - datetime.timedelta(days=14)
+            for _ in range(self.plan["reservations"] // len(self.equipment)):
+                start += datetime.timedelta(hours=rng.randint(0, 24))
+                end = start + datetime.timedelta(hours=rng.randint(1, max_hours))
+                reservations.append(
+                    models.EquipmentReservation(
+                        equipment=instrument,
+                        reserved_by=rng.choice(self.analyst_names),
+                        start_time=start,
+                        end_time=end,
+                    )
+                )
+                start = end
+        self.insert(models.EquipmentReservation, reservations)
+
+    def testing(self) -> None:
+        rng = self.rng
+        tests, self.centres = [], {}
+        for sop in self.sops[:self.plan["tests"]]:
+            centre = rng.uniform(1, 200)
+            tests.append(
+                models.Test(
+                    user_account=rng.choice(self.users),
+                    sop=sop,
+                    min_acceptable_result=Decimal(str(round(centre * 0.9, 6))),
+                    max_acceptable_result=Decimal(str(round(centre * 1.1, 6))),
+                )
+            )
+        self.tests = self.insert(models.Test, tests)
+        for test in self.tests:
+            self.centres[test.pk] = float(test.min_acceptable_result + test.max_acceptable_result) / 2
+        self.insert(
+            models.TestEquipmentLink,
+            [
+                models.TestEquipmentLink(test=test, equipment=instrument)
+                for test in self.tests
+                for instrument in rng.sample(self.equipment, min(len(self.equipment), rng.randint(1, 3)))
+            ],
+        )
+
+    def reagents(self) -> None:
+        rng = self.rng
+        reagents = []
+        for i in range(self.plan["reagents"]):
+            name, cas = rng.choice(REAGENTS)
+            made = self.today - datetime.timedelta(days=rng.randrange(30, 900))
+            received = self.decimal(500, 5000, 2)
+            reagents.append(
+                models.Reagent(
+                    sop=rng.choice(self.sops),
+                    reagent_name=f"{name} {rng.choice(('HPLC grade', 'ACS reagent', 'LC-MS grade'))}",
+                    cas_number=cas,
+                    lot_number=f"LOT-{i + 1:07d}",
+                    vendor=rng.choice(VENDORS),
+                    manufacturing_date=made,
+                    expiration_date=made + datetime.timedelta(days=rng.randrange(365, 1100)),
+                    quantity_received=received,
+                    quantity_on_hand=received,
+                )
+            )
+        self.reagent_lots = self.insert(models.Reagent, reagents)
+        self.insert(
+            models.UserReagentAction,
+            [
+                models.UserReagentAction(
+                    user_account=rng.choice(self.users),
+                    reagent=reagent,
+                    reagent_manager=rng.choice(self.analyst_names),
+                )
+                for reagent in self.reagent_lots
+            ],
+        )
+        uses = []
+        for _ in range(self.plan["reagent_uses"]):
+            uses.append(
+                models.TestReagentLink(
+                    test=rng.choice(self.tests),
+                    reagent=rng.choice(self.reagent_lots),
+                    volume_used=self.decimal(0.1, 5, 3),
+                    used_at=self.past(),
+                )
+            )
+            if len(uses) >= self.batch_size:
+                self.insert(models.TestReagentLink, uses)
+                uses = []
+        self.insert(models.TestReagentLink, uses)
+
+    def samples(self, count: int) -> None:
+        rng = self.rng
+        samples = []
+        for _ in range(count):
+            samples.append(
+                models.Sample(
+                    location=rng.choice(self.locations),
+                    warehouse=rng.choice(self.warehouses),
+                    sop=rng.choice(self.sops),
+                    product_name=f"{rng.choice(PRODUCTS)} {rng.choice(STRENGTHS)}",
+                    product_stage=rng.choice(PRODUCT_STAGES),
+                    quantity=Decimal(rng.randint(1, 500)),
+                    time_received=self.past(),
+                    sample_type=rng.choices("ISF", weights=(5, 2, 3))[0],
+                    storage_conditions=rng.choice(STORAGE_CONDITIONS),
+                )
+            )
+        self.insert(models.Sample, samples)
+
+        details = {models.InProcess: [], models.Stability: [], models.FinishedProduct: []}
+        actions, results = [], []
+        per_sample = min(self.results_per_sample, len(self.tests))
+        for sample in samples:
+            received = sample.time_received
+            if sample.sample_type == "I":
+                sampled = received - datetime.timedelta(hours=rng.randint(1, 48))
+                details[models.InProcess].append(models.InProcess(sample=sample, time_sampled=sampled))
+            elif sample.sample_type == "S":
+                details[models.Stability].append(
+                    models.Stability(sample=sample, stability_conditions=rng.choice(STABILITY_CONDITIONS))
+                )
+            else:
+                lot = Decimal(rng.randrange(10**6, 10**9))
+                details[models.FinishedProduct].append(models.FinishedProduct(sample=sample, product_lot_number=lot))
+            actions.append(
+                models.UserSampleAction(
+                    user_account=rng.choice(self.users),
+                    sample=sample,
+                    receiving_analyst=rng.choice(self.analyst_names),
+                    aliquoting_analyst=rng.choice(self.analyst_names) if rng.random() < 0.6 else None,
+                )
+            )
+            for test in rng.sample(self.tests, per_sample):
+                results.append(self.result(sample, test))
+        for model, rows in details.items():
+            self.insert(model, rows)
+        self.insert(models.UserSampleAction, actions)
+        self.insert(models.SampleTestLink, results)
+
+    def result(self, sample: models.Sample, test: models.Test) -> models.SampleTestLink:
+        rng = self.rng
+        deadline = sample.time_received + datetime.timedelta(hours=rng.randint(24, 14 * 24))
+        centre = self.centres[test.pk]
+        value = Decimal(str(round(rng.gauss(centre, centre * 0.05), 6)))
+        done = rng.random() < (0.97 if deadline < self.now else 0.3)
+        completed_at = None
+        if done:
+            latest = min(deadline, self.now) - sample.time_received
+            completed_at = sample.time_received + latest * rng.uniform(0.2, 1.0)
+        claimed = not done and rng.random() < 0.2
+        return models.SampleTestLink(
+            sample=sample,
+            test=test,
+            testing_analyst=rng.choice(self.analyst_names),
+            reviewing_analyst=rng.choice(self.analyst_names),
+            test_result=value,
+            deadline=deadline,
+            pass_or_fail=evaluate(value, test.min_acceptable_result, test.max_acceptable_result),
+            completed_at=completed_at,
+            claimed_by=rng.choice(self.analyst_names) if claimed else None,
+            claimed_at=self.now - datetime.timedelta(minutes=rng.randint(1, 600)) if claimed else None,
+        )
+
+
+def rebuild_derived(log: Optional[Callable[[str], None]] = None) -> None:
+    """Recompute the tables maintained from the seeded ones."""
+
+    log = log or (lambda message: None)
+    inventory.rebuild_stock()
+    inventory.project_stock()
+    log("Reagent stock rebuilt.")
+    result_stats.rebuild()
+    log("Result statistics rebuilt.")
+    search.rebuild()
+    log("Search index rebuilt.")
+    custody.rebuild()
+    log("Custody events rebuilt.")
+    for model in VERSIONED_MODELS:
+        models.TableVersion.bump(model)
+
+
+def seed(samples: int, results_per_sample: int = RESULTS_PER_SAMPLE, days: int = 365, seed: int = 0,
+         batch_size: Optional[int] = None, derived: bool = True,
+         log: Optional[Callable[[str], None]] = None) -> dict[str, int]:
+    """Write a synthetic data set; returns the rows written per model."""
+
+    counts = Seeder(samples, results_per_sample, days, seed, batch_size, log).run()
+    if derived:
+        rebuild_derived(log)
+    return counts
@@ -6,144 +6,400 @@ implementation.  In a production system you might customise the fields list or
 add nested serializers where appropriate.
 """
 
+import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
 from rest_framework import serializers
 
-from . import models
+from . import metrics, models
+from .expansion import ExpandableFieldsMixin
+from .lookup_cache import lookups
+from .maintenance import parse_interval
+from .search import KINDS
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary-key field that resolves cached lookup models without a query."""
+
+    def to_internal_value(self, data):
+        model = self.get_queryset().model
+        if self.pk_field is not None or isinstance(data, bool) or not lookups.is_cached(model):
+            return super().to_internal_value(data)
+        try:
+            obj = lookups.get(model, model._meta.pk.to_python(data))
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if obj is None:
+            self.fail("does_not_exist", pk_value=data)
+        return obj
+
 
+class LimsModelSerializer(serializers.ModelSerializer):
+    """Base class for the LIMS model serializers."""
 
-class UserAccountSerializer(serializers.ModelSerializer):
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
+    def to_representation(self, instance):
+        with metrics.serializing():
+            return super().to_representation(instance)
+
+
+class UserAccountSerializer(LimsModelSerializer):
     class Meta:
         model = models.UserAccount
         fields = "__all__"
 
 
-class AnalystSerializer(serializers.ModelSerializer):
+class AnalystSerializer(LimsModelSerializer):
     class Meta:
         model = models.Analyst
         fields = "__all__"
 
 
-class AdministratorSerializer(serializers.ModelSerializer):
+class AdministratorSerializer(LimsModelSerializer):
     class Meta:
         model = models.Administrator
         fields = "__all__"
 
 
-class SOPSerializer(serializers.ModelSerializer):
+class SOPSerializer(LimsModelSerializer):
     class Meta:
         model = models.SOP
         fields = "__all__"
 
 
-class UserSOPActionSerializer(serializers.ModelSerializer):
+class UserSOPActionSerializer(LimsModelSerializer):
     class Meta:
         model = models.UserSOPAction
         fields = "__all__"
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSerializer(LimsModelSerializer):
     class Meta:
         model = models.Client
         fields = "__all__"
 
 
-class WarehouseSerializer(serializers.ModelSerializer):
+class WarehouseSerializer(ExpandableFieldsMixin, LimsModelSerializer):
+    expandable_fields = {
+        "sop": ("SOPSerializer", {}),
+    }
+
     class Meta:
         model = models.Warehouse
         fields = "__all__"
 
 
-class WarehouseClientLinkSerializer(serializers.ModelSerializer):
+class WarehouseClientLinkSerializer(LimsModelSerializer):
     class Meta:
         model = models.WarehouseClientLink
         fields = "__all__"
 
 
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(LimsModelSerializer):
     class Meta:
         model = models.Location
         fields = "__all__"
 
 
-class EquipmentSerializer(serializers.ModelSerializer):
+class EquipmentSerializer(ExpandableFieldsMixin, LimsModelSerializer):
+    expandable_fields = {
+        "location": ("LocationSerializer", {}),
+        "sop": ("SOPSerializer", {}),
+        "maintenance_logs": ("MaintenanceLogSerializer", {"source": "maintenancelog_set", "many": True}),
+    }
+
     class Meta:
         model = models.Equipment
         fields = "__all__"
 
 
-class MaintenanceLogSerializer(serializers.ModelSerializer):
+class MaintenanceLogSerializer(LimsModelSerializer):
     class Meta:
         model = models.MaintenanceLog
         fields = "__all__"
+        read_only_fields = ("interval_count", "interval_unit")
+
+    def validate(self, attrs):
+        interval = attrs.get("service_interval", getattr(self.instance, "service_interval", None))
+        next_date = attrs.get("next_service_date", getattr(self.instance, "next_service_date", None))
+        if parse_interval(interval) is None and next_date is None:
+            raise serializers.ValidationError(
+                {
+                    "next_service_date": [
+                        "Required when service_interval is not an interval such as \"90 days\" or \"quarterly\"."
+                    ]
+                }
+            )
+        return attrs
+
+
+class SampleSerializer(ExpandableFieldsMixin, LimsModelSerializer):
+    expandable_fields = {
+        "location": ("LocationSerializer", {}),
+        "warehouse": ("WarehouseSerializer", {}),
+        "sop": ("SOPSerializer", {}),
+        "results": ("SampleTestLinkSerializer", {"source": "sampletestlink_set", "many": True}),
+    }
 
-
-class SampleSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Sample
         fields = "__all__"
 
 
-class InProcessSerializer(serializers.ModelSerializer):
+class SampleDetailSerializer(LimsModelSerializer):
+    """Base class for the serializers of the sample subtype detail rows.
+
+    A detail row's sample must have the matching `sample_type`.
+    """
+
+    def validate_sample(self, sample):
+        expected = models.SAMPLE_DETAIL_TYPES[self.Meta.model]
+        if sample.sample_type != expected:
+            raise serializers.ValidationError(
+                f'Sample {sample.pk} has sample_type "{sample.sample_type}", expected "{expected}".'
+            )
+        return sample
+
+
+class InProcessSerializer(SampleDetailSerializer):
     class Meta:
         model = models.InProcess
         fields = "__all__"
 
 
-class StabilitySerializer(serializers.ModelSerializer):
+class StabilitySerializer(SampleDetailSerializer):
     class Meta:
         model = models.Stability
         fields = "__all__"
 
 
-class FinishedProductSerializer(serializers.ModelSerializer):
+class FinishedProductSerializer(SampleDetailSerializer):
     class Meta:
         model = models.FinishedProduct
         fields = "__all__"
 
 
-class UserSampleActionSerializer(serializers.ModelSerializer):
+class UserSampleActionSerializer(LimsModelSerializer):
     class Meta:
         model = models.UserSampleAction
         fields = "__all__"
 
 
-class TestSerializer(serializers.ModelSerializer):
+class TestSerializer(ExpandableFieldsMixin, LimsModelSerializer):
+    expandable_fields = {
+        "user_account": ("UserAccountSerializer", {}),
+        "sop": ("SOPSerializer", {}),
+    }
+
     class Meta:
         model = models.Test
         fields = "__all__"
 
 
-class SampleTestLinkSerializer(serializers.ModelSerializer):
+class SampleTestLinkSerializer(ExpandableFieldsMixin, LimsModelSerializer):
+    expandable_fields = {
+        "sample": ("SampleSerializer", {}),
+        "test": ("TestSerializer", {}),
+    }
+
     class Meta:
         model = models.SampleTestLink
         fields = "__all__"
+        # Claims are made through the work-queue (see `work_queue.py`).
+        read_only_fields = ("pass_or_fail", "claimed_by", "claimed_at")
 
 
-class TestEquipmentLinkSerializer(serializers.ModelSerializer):
+class TestEquipmentLinkSerializer(LimsModelSerializer):
     class Meta:
         model = models.TestEquipmentLink
         fields = "__all__"
 
 
-class ReagentSerializer(serializers.ModelSerializer):
+class ReagentSerializer(LimsModelSerializer):
     class Meta:
         model = models.Reagent
         fields = "__all__"
+        # Maintained by `inventory.py`.
+        read_only_fields = ("quantity_on_hand", "daily_usage", "stockout_date")
 
 
-class UserReagentActionSerializer(serializers.ModelSerializer):
+class UserReagentActionSerializer(LimsModelSerializer):
     class Meta:
         model = models.UserReagentAction
         fields = "__all__"
 
 
-class TestReagentLinkSerializer(serializers.ModelSerializer):
+class TestReagentLinkSerializer(LimsModelSerializer):
     class Meta:
         model = models.TestReagentLink
         fields = "__all__"
 
 
-class VersionChangeSerializer(serializers.ModelSerializer):
+class VersionChangeSerializer(LimsModelSerializer):
     class Meta:
         model = models.VersionChange
         fields = "__all__"
+
+
+class SampleTestLinkBulkSerializer(LimsModelSerializer):
+    """Row serializer for the bulk results endpoint.
+
+    Foreign keys are accepted as plain integers so that validating a batch
+    issues no per-row queries; their existence is checked for the whole
+    batch at once in `bulk.py`.
+    """
+
+    sample = serializers.IntegerField(source="sample_id", min_value=1)
+    test = serializers.IntegerField(source="test_id", min_value=1)
+
+    class Meta:
+        model = models.SampleTestLink
+        fields = "__all__"
+        read_only_fields = ("pass_or_fail", "claimed_by", "claimed_at")
+
+
+class InProcessIntakeSerializer(LimsModelSerializer):
+    class Meta:
+        model = models.InProcess
+        exclude = ("sample",)
+
+
+class StabilityIntakeSerializer(LimsModelSerializer):
+    class Meta:
+        model = models.Stability
+        exclude = ("sample",)
+
+
+class FinishedProductIntakeSerializer(LimsModelSerializer):
+    class Meta:
+        model = models.FinishedProduct
+        exclude = ("sample",)
+
+
+class UserSampleActionIntakeSerializer(LimsModelSerializer):
+    """Action log entry of an intake; the user is checked batch-wide."""
+
+    user_account = serializers.IntegerField(source="user_account_id", min_value=1)
+
+    class Meta:
+        model = models.UserSampleAction
+        exclude = ("sample",)
+
+
+class SampleIntakeSerializer(LimsModelSerializer):
+    """A sample with its subtype detail row and action log entry.
+
+    Exactly one of `in_process`, `stability` and `finished_product` must be
+    given, the one matching `sample_type`.
+    """
+
+    in_process = InProcessIntakeSerializer(required=False)
+    stability = StabilityIntakeSerializer(required=False)
+    finished_product = FinishedProductIntakeSerializer(required=False)
+    action = UserSampleActionIntakeSerializer()
+
+    # sample_type -> name of the detail field it requires.
+    detail_fields = {"I": "in_process", "S": "stability", "F": "finished_product"}
+
+    class Meta:
+        model = models.Sample
+        fields = "__all__"
+
+    def validate(self, attrs):
+        sample_type = attrs["sample_type"]
+        errors = {}
+        for code, name in self.detail_fields.items():
+            if code == sample_type and name not in attrs:
+                errors[name] = [f'This field is required for sample_type "{sample_type}".']
+            elif code != sample_type and name in attrs:
+                errors[name] = [f'Not allowed for sample_type "{sample_type}".']
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class WorkQueueQuerySerializer(serializers.Serializer):
+    """Query parameters of the work-queue listing and claims."""
+
+    analyst = serializers.CharField(max_length=64, required=False)
+    equipment = serializers.IntegerField(min_value=1, required=False)
+    test = serializers.IntegerField(min_value=1, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=settings.LIMS_WORK_QUEUE["MAX_ITEMS"], default=20)
+
+
+class WorkQueueClaimSerializer(WorkQueueQuerySerializer):
+    analyst = serializers.CharField(max_length=64)
+
+
+class WorkQueueReleaseSerializer(serializers.Serializer):
+    analyst = serializers.CharField(max_length=64)
+
+
+class WorkQueueCompleteSerializer(WorkQueueReleaseSerializer):
+    test_result = serializers.DecimalField(max_digits=16, decimal_places=6)
+    reviewing_analyst = serializers.CharField(max_length=64, required=False)
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Query parameters of `search/`; `types` is a comma-separated list of kinds."""
+
+    q = serializers.CharField(max_length=255)
+    types = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=settings.LIMS_SEARCH["MAX_RESULTS"], default=20)
+
+    def validate_types(self, value):
+        kinds = [kind.strip() for kind in value.split(",") if kind.strip()]
+        unknown = [kind for kind in kinds if kind not in KINDS]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown type(s): {', '.join(unknown)}; expected {', '.join(KINDS)}.")
+        return kinds
+
+
+class AuditEntrySerializer(LimsModelSerializer):
+    class Meta:
+        model = models.AuditEntry
+        fields = "__all__"
+
+
+class EquipmentReservationSerializer(LimsModelSerializer):
+    class Meta:
+        model = models.EquipmentReservation
+        fields = "__all__"
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """Query parameters of `equipment/available/`.
+
+    The window runs from `start` (default: now) for `hours`, or to `end`;
+    `duration` is the free time needed, in minutes (default: the window).
+    """
+
+    test = serializers.IntegerField(min_value=1, required=False)
+    location = serializers.IntegerField(min_value=1, required=False)
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    hours = serializers.FloatField(min_value=0, required=False)
+    duration = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        start = attrs.get("start") or timezone.now()
+        if "end" in attrs and "hours" in attrs:
+            raise serializers.ValidationError("Pass either end or hours, not both.")
+        end = attrs.get("end") or start + datetime.timedelta(hours=attrs.get("hours", 4))
+        if end <= start:
+            raise serializers.ValidationError({"end": ["Must be after start."]})
+        limit = settings.LIMS_RESERVATIONS["MAX_SEARCH_DAYS"]
+        if end - start > datetime.timedelta(days=limit):
+            raise serializers.ValidationError({"end": [f"The window may span at most {limit} days."]})
+        duration = attrs.get("duration")
+        return {
+            "start": start,
+            "end": end,
+            "duration": datetime.timedelta(minutes=duration) if duration else None,
+            "test": attrs.get("test"),
+            "location": attrs.get("location"),
+        }
+
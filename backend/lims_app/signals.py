@@ -0,0 +1,125 @@
+"""
+Signal handlers for the LIMS app.
+
+Connected from `LimsAppConfig.ready()`.  Writes to versioned tables bump
+their `TableVersion` stamp and evict cached lookups (`table_changed`); the
+other handlers hand model and connection signals to the feature modules
+that act on them, whose docstrings describe what they do.
+"""
+
+from typing import Iterable
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from . import audit, custody, database, inventory, metrics, models, result_stats, search, spc
+from .lookup_cache import CACHED_MODELS, lookups
+
+# Reference tables served with conditional-GET support.
+VERSIONED_MODELS = (models.SOP, models.Location, models.Warehouse, models.UserAccount)
+
+
+def table_changed(model, pks: Iterable) -> None:
+    """Record that rows `pks` of `model` were written or deleted.
+
+    Also called by the bulk writes of `models.TrackedQuerySet`, which send
+    no signals.  Cached lookups are evicted immediately and again once the
+    transaction commits, so a concurrent reader cannot re-cache the
+    pre-commit row.
+    """
+
+    if model in VERSIONED_MODELS:
+        models.TableVersion.bump(model)
+    if lookups.is_cached(model):
+        pks = list(pks)
+        lookups.invalidate(model, pks)
+        transaction.on_commit(lambda: lookups.invalidate(model, pks))
+
+
+def row_changed(sender, instance, **kwargs) -> None:
+    table_changed(sender, [instance.pk])
+
+
+def result_saved(sender, instance, created, **kwargs) -> None:
+    if created:
+        result_stats.results_created([instance])
+    else:
+        result_stats.results_changed([instance])
+
+
+def result_deleted(sender, instance, **kwargs) -> None:
+    result_stats.results_deleted([instance])
+
+
+def sample_saved(sender, instance, created, **kwargs) -> None:
+    old_name = getattr(instance, "_loaded_product_name", None)
+    if not created and old_name is not None and old_name != instance.product_name:
+        result_stats.product_renamed(instance, old_name)
+        spc.product_renamed(instance)
+    instance._loaded_product_name = instance.product_name
+
+
+def custody_sample_saved(sender, instance, created, **kwargs) -> None:
+    custody.samples_saved([instance], created)
+
+
+def custody_action_saved(sender, instance, created, **kwargs) -> None:
+    custody.actions_saved([instance], created)
+
+
+def custody_result_saved(sender, instance, created, **kwargs) -> None:
+    custody.results_saved([instance], created)
+
+
+def usage_saved(sender, instance, created, **kwargs) -> None:
+    inventory.usage_saved(instance, created)
+
+
+def usage_deleted(sender, instance, **kwargs) -> None:
+    inventory.usage_deleted(instance)
+
+
+def search_saved(sender, instance, **kwargs) -> None:
+    search.object_saved(instance)
+
+
+def search_deleted(sender, instance, **kwargs) -> None:
+    search.object_deleted(instance)
+
+
+def audit_saved(sender, instance, created, **kwargs) -> None:
+    audit.objects_saved([instance], created)
+
+
+def audit_deleted(sender, instance, **kwargs) -> None:
+    audit.objects_deleted([instance])
+
+
+def connect() -> None:
+    for model in {*VERSIONED_MODELS, *CACHED_MODELS}:
+        uid = f"row_changed:{model._meta.label_lower}"
+        post_save.connect(row_changed, sender=model, dispatch_uid=uid)
+        post_delete.connect(row_changed, sender=model, dispatch_uid=uid)
+
+    post_save.connect(result_saved, sender=models.SampleTestLink, dispatch_uid="result_stats:saved")
+    post_delete.connect(result_deleted, sender=models.SampleTestLink, dispatch_uid="result_stats:deleted")
+    post_save.connect(sample_saved, sender=models.Sample, dispatch_uid="result_stats:sample")
+    post_save.connect(custody_sample_saved, sender=models.Sample, dispatch_uid="custody:sample")
+    post_save.connect(custody_action_saved, sender=models.UserSampleAction, dispatch_uid="custody:action")
+    post_save.connect(custody_result_saved, sender=models.SampleTestLink, dispatch_uid="custody:result")
+    post_save.connect(usage_saved, sender=models.TestReagentLink, dispatch_uid="inventory:saved")
+    post_delete.connect(usage_deleted, sender=models.TestReagentLink, dispatch_uid="inventory:deleted")
+    for model in search.SEARCH_MODELS:
+        uid = f"search:{model._meta.label_lower}"
+        post_save.connect(search_saved, sender=model, dispatch_uid=uid)
+        post_delete.connect(search_deleted, sender=model, dispatch_uid=uid)
+    if settings.LIMS_AUDIT["ENABLED"]:
+        for model in audit.audited_models():
+            uid = f"audit:{model._meta.label_lower}"
+            post_save.connect(audit_saved, sender=model, dispatch_uid=uid)
+            post_delete.connect(audit_deleted, sender=model, dispatch_uid=uid)
+    connection_created.connect(database.configure_connection, dispatch_uid="database:configure")
+    connection_created.connect(metrics.instrument_connection, dispatch_uid="metrics:instrument")
+    connection_created.connect(audit.install_purge_check, dispatch_uid="audit:purge_check")
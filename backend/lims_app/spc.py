@@ -0,0 +1,257 @@
+"""
+Statistical process control (SPC) charts over sample test results.
+
+Stability studies chart `test_result` for one test and product in deadline
+order.  For each series this module computes, vectorized with NumPy:
+
+* the centre line and sigma of an individuals chart, estimated from the
+  first `baseline` points (all points by default) with sigma taken from the
+  average moving range (MR-bar / 1.128);
+* a trailing moving average over `window` points;
+* the four Western Electric rules: one point beyond 3 sigma (`we1`), two of
+  three beyond 2 sigma on one side (`we2`), four of five beyond 1 sigma on
+  one side (`we3`) and eight in a row on one side of the centre (`we4`);
+* a tabular CUSUM in sigma units with reference value `k` and decision
+  interval `h`, signalling `cusum_high` / `cusum_low`.
+
+All series of a test are read with a single `values_list` query ordered by
+the `(test, deadline)` index; deadlines are then fetched only for the points
+that violate a rule.  Results are cached (see `LIMS_SPC_CACHE`) under a key
+that includes the test's latest result id, its latest
+`SampleTestLink.updated_at` and its number of results, read with one
+aggregate over the `(test, updated_at)` index.  Every write of a result
+stamps `updated_at`, set-based ones included, and `product_renamed()` stamps
+the results of a renamed sample, so a new, edited, moved or regrouped point
+produces a fresh chart of that test only, and deletes change the count;
+stale entries simply expire.  `tests/{id}/spc/` returns a test's charts and
+`tests/{id}/spc/violations/` streams their rule violations.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, FloatField, Max
+from django.db.models.functions import Cast
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import models
+
+# d2 constant for moving ranges of two consecutive points.
+D2 = 1.128
+
+RULES = ("we1", "we2", "we3", "we4", "cusum_high", "cusum_low")
+
+
+@dataclass(frozen=True)
+class ChartParams:
+    window: int = 5
+    baseline: Optional[int] = None
+    k: float = 0.5
+    h: float = 5.0
+
+    @classmethod
+    def from_query(cls, params) -> "ChartParams":
+        """Parse `?window=&baseline=&k=&h=`, reporting bad values as a 400."""
+
+        errors = {}
+        values = {}
+        for name, kind, minimum in (("window", int, 2), ("baseline", int, 2), ("k", float, 0.0), ("h", float, 0.0)):
+            raw = params.get(name)
+            if raw in (None, ""):
+                continue
+            try:
+                value = kind(raw)
+            except ValueError:
+                errors[name] = [f"A valid {'integer' if kind is int else 'number'} is required."]
+                continue
+            if not np.isfinite(value) or value < minimum:
+                errors[name] = [f"Ensure this value is greater than or equal to {minimum}."]
+                continue
+            values[name] = value
+        if errors:
+            raise ValidationError(errors)
+        return cls(**values)
+
+
+def rolling_sum(flags: np.ndarray, width: int) -> np.ndarray:
+    """Sum of each trailing window of `width`; incomplete windows give 0."""
+
+    totals = np.cumsum(flags, dtype=np.int64)
+    totals[width:] -= totals[:-width].copy()
+    totals[: width - 1] = 0
+    return totals
+
+
+def moving_average(values: np.ndarray, width: int) -> np.ndarray:
+    """Trailing mean over `width` points; NaN until the window is full."""
+
+    result = np.full(values.shape, np.nan)
+    if len(values) >= width:
+        totals = np.cumsum(np.concatenate(([0.0], values)))
+        result[width - 1 :] = (totals[width:] - totals[:-width]) / width
+    return result
+
+
+def cusum(deviations: np.ndarray) -> np.ndarray:
+    """Tabular CUSUM `C[i] = max(0, C[i-1] + d[i])` without a Python loop.
+
+    With `S` the running sum of `d`, `C[i] = S[i] - min(0, min(S[:i+1]))`.
+    """
+
+    totals = np.cumsum(deviations)
+    return totals - np.minimum(np.minimum.accumulate(totals), 0.0)
+
+
+def analyse(values: np.ndarray, params: ChartParams) -> dict:
+    """Compute control limits, moving average, CUSUM and rule masks."""
+
+    baseline = values[: params.baseline] if params.baseline else values
+    centre = float(baseline.mean())
+    sigma = float(np.abs(np.diff(baseline)).mean() / D2) if len(baseline) > 1 else 0.0
+    masks = {rule: np.zeros(values.shape, dtype=bool) for rule in RULES}
+    high = low = np.zeros(values.shape)
+    if sigma > 0:
+        z = (values - centre) / sigma
+        masks["we1"] = np.abs(z) > 3
+        for rule, limit, hits, width in (("we2", 2, 2, 3), ("we3", 1, 4, 5)):
+            masks[rule] = (rolling_sum(z > limit, width) >= hits) | (rolling_sum(z < -limit, width) >= hits)
+        masks["we4"] = (rolling_sum(z > 0, 8) == 8) | (rolling_sum(z < 0, 8) == 8)
+        high = cusum(z - params.k)
+        low = cusum(-z - params.k)
+        masks["cusum_high"] = high > params.h
+        masks["cusum_low"] = low > params.h
+    return {
+        "centre": centre,
+        "sigma": sigma,
+        "moving_average": moving_average(values, params.window),
+        "cusum_high": high,
+        "cusum_low": low,
+        "masks": masks,
+    }
+
+
+def _float(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def fetch_series(test_id: int, product_name: Optional[str] = None) -> dict[str, tuple]:
+    """Read a test's results grouped by product, in deadline order.
+
+    Returns `{product_name: (ids, values)}` as NumPy arrays.  One query;
+    values are cast to float in the database and deadlines are not fetched
+    (converting them dominates the cost), so no `Decimal` or `datetime`
+    objects are built per point.
+    """
+
+    results = models.SampleTestLink.objects.filter(test_id=test_id)
+    if product_name is not None:
+        results = results.filter(sample__product_name=product_name)
+    rows = list(
+        results.order_by("deadline", "id").values_list(
+            "id", Cast("test_result", FloatField()), "sample__product_name"
+        )
+    )
+    if not rows:
+        return {}
+    ids, values, products = zip(*rows)
+    ids = np.fromiter(ids, dtype=np.int64, count=len(rows))
+    values = np.fromiter(values, dtype=float, count=len(rows))
+    codes: dict[str, int] = {}
+    groups = np.fromiter((codes.setdefault(name, len(codes)) for name in products), dtype=np.int64, count=len(rows))
+    return {name: (ids[groups == code], values[groups == code]) for name, code in codes.items()}
+
+
+def _deadlines(ids: list[int]) -> dict:
+    """Fetch the deadlines of flagged results, in batches of `pk__in`."""
+
+    deadlines = {}
+    for start in range(0, len(ids), 10000):
+        batch = ids[start : start + 10000]
+        deadlines.update(models.SampleTestLink.objects.filter(pk__in=batch).values_list("id", "deadline"))
+    return deadlines
+
+
+def build_charts(test_id: int, product_name: Optional[str], params: ChartParams) -> dict:
+    """Compute every chart of a test (or of one product of it)."""
+
+    charts = []
+    violations = []
+    for name, (ids, values) in sorted(fetch_series(test_id, product_name).items()):
+        chart = analyse(values, params)
+        masks = chart["masks"]
+        counts = {rule: int(mask.sum()) for rule, mask in masks.items()}
+        flagged = np.zeros(values.shape, dtype=bool)
+        for mask in masks.values():
+            flagged |= mask
+        for position in np.flatnonzero(flagged):
+            violations.append(
+                {
+                    "result": int(ids[position]),
+                    "product_name": name,
+                    "deadline": None,
+                    "test_result": float(values[position]),
+                    "rules": [rule for rule in RULES if masks[rule][position]],
+                    "moving_average": _float(chart["moving_average"][position]),
+                    "cusum_high": float(chart["cusum_high"][position]),
+                    "cusum_low": float(chart["cusum_low"][position]),
+                }
+            )
+        charts.append(
+            {
+                "product_name": name,
+                "points": len(values),
+                "centre_line": chart["centre"],
+                "sigma": chart["sigma"],
+                "upper_control_limit": chart["centre"] + 3 * chart["sigma"],
+                "lower_control_limit": chart["centre"] - 3 * chart["sigma"],
+                "moving_average": _float(chart["moving_average"][-1]),
+                "cusum_high": float(chart["cusum_high"][-1]),
+                "cusum_low": float(chart["cusum_low"][-1]),
+                "violations": counts,
+            }
+        )
+    deadlines = _deadlines([violation["result"] for violation in violations])
+    for violation in violations:
+        violation["deadline"] = deadlines.get(violation["result"])
+    violations.sort(key=lambda violation: (violation["deadline"], violation["result"]))
+    return {"charts": charts, "violations": violations}
+
+
+def product_renamed(sample: models.Sample) -> None:
+    """Mark a renamed sample's results as changed; their charts regroup them."""
+
+    models.SampleTestLink.objects.filter(sample=sample).update(updated_at=timezone.now())
+
+
+def _cache_key(test_id: int, product_name: Optional[str], params: ChartParams) -> str:
+    state = models.SampleTestLink.objects.filter(test_id=test_id).aggregate(
+        latest=Max("id"), updated=Max("updated_at"), count=Count("id")
+    )
+    fingerprint = repr((test_id, product_name, params, state["latest"], state["updated"], state["count"]))
+    return "lims:spc:" + hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+def test_charts(test_id: int, product_name: Optional[str], params: ChartParams) -> dict:
+    """Return the (possibly cached) charts and violations of one test."""
+
+    cache = caches[settings.LIMS_SPC_CACHE["ALIAS"]]
+    key = _cache_key(test_id, product_name, params)
+    result = cache.get(key)
+    if result is None:
+        result = build_charts(test_id, product_name, params)
+        cache.set(key, result, timeout=settings.LIMS_SPC_CACHE["TIMEOUT"])
+    return result
+
+
+def iter_violations(violations: list[dict]) -> Iterator[str]:
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for violation in violations:
+        yield encoder.encode(violation) + "\n"
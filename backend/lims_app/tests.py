@@ -0,0 +1,193 @@
+"""
+Tests for the LIMS backend API.
+
+Run with `python manage.py test lims_app`.
+"""
+
+import datetime
+import uuid
+from decimal import Decimal
+
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import audit, models, seeding
+
+# Every expandable relation of each list endpoint, and some nested paths.
+EXPANSIONS = {
+    "/api/warehouses/": ["sop"],
+    "/api/equipment/": ["location", "sop", "maintenance_logs", "location,sop,maintenance_logs"],
+    "/api/samples/": ["location", "warehouse", "sop", "results", "warehouse.sop", "results.test.sop"],
+    "/api/tests/": ["user_account", "sop", "user_account,sop"],
+    "/api/sample-test-links/": ["sample", "test", "sample.warehouse.sop", "test.user_account", "sample,test.sop"],
+}
+
+
+class ExpandQueryCountTests(TestCase):
+    """An expanded list page costs the same number of queries for 1 row as for N."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(samples=40, results_per_sample=2, derived=False)
+
+    def get(self, url: str) -> list:
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["results"]
+
+    def test_expand_query_count_is_independent_of_page_size(self):
+        for path, expansions in EXPANSIONS.items():
+            for expand in expansions:
+                with self.subTest(path=path, expand=expand):
+                    with CaptureQueriesContext(connection) as single:
+                        self.assertEqual(len(self.get(f"{path}?expand={expand}&page_size=1")), 1)
+                    with self.assertNumQueries(len(single)):
+                        self.assertGreater(len(self.get(f"{path}?expand={expand}&page_size=20")), 1)
+
+
+class SOPVersionChangeTests(TestCase):
+    """Set-based SOP writes log version changes like `SOP.save()` does."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sops = [
+            models.SOP.objects.create(sop_name=f"SOP-{n}", version_number=Decimal("1.0"),
+                                      effective_date=datetime.date(2026, 1, n))
+            for n in (1, 2)
+        ]
+
+    def changes(self) -> list[tuple]:
+        return list(
+            models.VersionChange.objects.order_by("sop_id").values_list(
+                "sop_id", "old_version_number", "new_version_number", "old_effective_date", "new_effective_date"
+            )
+        )
+
+    def test_update_logs_each_changed_sop(self):
+        first, second = self.sops
+        models.SOP.objects.filter(pk__in=[first.pk, second.pk]).update(version_number=Decimal("2.0"))
+        self.assertEqual(self.changes(), [
+            (first.pk, Decimal("1.0"), Decimal("2.0"), first.effective_date, first.effective_date),
+            (second.pk, Decimal("1.0"), Decimal("2.0"), second.effective_date, second.effective_date),
+        ])
+
+    def test_update_of_other_fields_logs_nothing(self):
+        models.SOP.objects.update(sop_name="Renamed")
+        self.assertEqual(self.changes(), [])
+
+    def test_bulk_update_logs_only_changed_sops(self):
+        first, second = models.SOP.objects.order_by("pk")
+        first.effective_date = datetime.date(2026, 6, 1)
+        models.SOP.objects.bulk_update([first, second], ["version_number", "effective_date"])
+        self.assertEqual(self.changes(), [
+            (first.pk, Decimal("1.0"), Decimal("1.0"), datetime.date(2026, 1, 1), datetime.date(2026, 6, 1)),
+        ])
+
+
+class BulkResultTests(TestCase):
+    """The bulk result endpoint reports errors per row and writes all or nothing."""
+
+    url = "/api/sample-test-links/bulk/"
+
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(samples=5, results_per_sample=1, derived=False)
+        cls.result = models.SampleTestLink.objects.order_by("pk").first()
+
+    def row(self, **overrides) -> dict:
+        row = {
+            "sample": self.result.sample_id,
+            "test": self.result.test_id,
+            "testing_analyst": "tester",
+            "reviewing_analyst": "reviewer",
+            "test_result": "1.5",
+            "deadline": timezone.now().isoformat(),
+        }
+        row.update(overrides)
+        return row
+
+    def send(self, method: str, rows: list):
+        return getattr(self.client, method)(self.url, rows, content_type="application/json")
+
+    def test_create_reports_errors_by_row_and_writes_nothing(self):
+        count = models.SampleTestLink.objects.count()
+        # Field errors are reported first; foreign keys are checked once every row is well-formed.
+        for rows, expected in [
+            ([self.row(), self.row(test_result="1.1234567"), self.row(test_result="x")],
+             {"1": ["test_result"], "2": ["test_result"]}),
+            ([self.row(), self.row(sample=10**9), self.row(test=10**9)], {"1": ["sample"], "2": ["test"]}),
+        ]:
+            with self.subTest(rows=rows):
+                response = self.send("post", rows)
+                self.assertEqual(response.status_code, 400, response.content)
+                errors = response.json()["errors"]
+                self.assertEqual({index: list(fields) for index, fields in errors.items()}, expected)
+        self.assertEqual(models.SampleTestLink.objects.count(), count)
+
+    def test_update_with_a_missing_id_rolls_back_the_batch(self):
+        before = self.result.test_result
+        response = self.send("patch", [{"id": self.result.pk, "test_result": "99"}, {"id": 10**9, "test_result": "1"}])
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(list(response.json()["errors"]), ["1"])
+        self.result.refresh_from_db()
+        self.assertEqual(self.result.test_result, before)
+
+    def test_valid_batch_is_created(self):
+        response = self.send("post", [self.row(), self.row(test_result="2")])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(models.SampleTestLink.objects.filter(pk__in=response.json()["ids"]).count(), 2)
+
+
+class WorkQueueClaimTests(TestCase):
+    """Claims are exclusive, and completed tests leave the queue."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(samples=5, results_per_sample=2, derived=False)
+        models.SampleTestLink.objects.update(completed_at=None, claimed_by=None, claimed_at=None)
+
+    def post(self, url: str, data: dict):
+        response = self.client.post(url, data, content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def claim(self, analyst: str, limit: int = 4) -> list[int]:
+        return [item["id"] for item in self.post("/api/work-queue/claim/", {"analyst": analyst, "limit": limit})]
+
+    def queue(self, analyst: str) -> list[int]:
+        response = self.client.get("/api/work-queue/", {"analyst": analyst, "limit": 50})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item["id"] for item in response.json()]
+
+    def test_claimed_tests_are_not_handed_out_again(self):
+        first, second = self.claim("alice"), self.claim("bob")
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 4)
+        self.assertFalse(set(first) & set(second))
+        self.assertFalse(set(first) & set(self.queue("bob")))
+        self.assertTrue(set(first) <= set(self.queue("alice")))
+
+    def test_completed_tests_leave_the_queue(self):
+        done = self.claim("alice", limit=1)[0]
+        self.post(f"/api/work-queue/{done}/complete/", {"analyst": "alice", "test_result": "1.5"})
+        self.assertNotIn(done, self.queue("alice"))
+        self.assertNotIn(done, self.claim("alice", limit=50))
+
+
+class AuditAppendOnlyTests(TransactionTestCase):
+    """The audit log rejects deletes, except inside `audit.purging()` (as the teardown flush is)."""
+
+    def test_delete_needs_purging(self):
+        entry = models.AuditEntry.objects.create(
+            entry_id=uuid.uuid4(), occurred_at=timezone.now(), model="lims_app.sample", object_pk="1", action="create"
+        )
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            models.AuditEntry.objects.filter(pk=entry.pk).delete()
+        with audit.purging():
+            models.AuditEntry.objects.filter(pk=entry.pk).delete()
+        self.assertFalse(models.AuditEntry.objects.exists())
+        models.AuditEntry.objects.create(
+            entry_id=uuid.uuid4(), occurred_at=timezone.now(), model="lims_app.sample", object_pk="1", action="create"
+        )
@@ -3,13 +3,14 @@ URLs for the LIMS backend API.
 
 This module configures the Django REST Framework router, mapping each
 viewset onto a RESTful route.  All endpoints are prefixed by `/api/` via the
-project's root URL configuration.
+project's root URL configuration.  `metrics/` serves the request metrics
+collected by `metrics.MetricsMiddleware` in the Prometheus text format.
 """
 
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import metrics, views
 
 
 router = DefaultRouter()
@@ -36,8 +37,13 @@ router.register(r"reagents", views.ReagentViewSet)
 router.register(r"user-reagent-actions", views.UserReagentActionViewSet)
 router.register(r"test-reagent-links", views.TestReagentLinkViewSet)
 router.register(r"version-changes", views.VersionChangeViewSet)
+router.register(r"equipment-reservations", views.EquipmentReservationViewSet)
+router.register(r"audit-log", views.AuditEntryViewSet)
+router.register(r"work-queue", views.WorkQueueViewSet, basename="work-queue")
+router.register(r"search", views.SearchViewSet, basename="search")
 
 
 urlpatterns = [
+    path("metrics/", metrics.metrics_view, name="metrics"),
     path("", include(router.urls)),
 ]
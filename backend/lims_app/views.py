@@ -10,121 +10,449 @@ restrict access based on the logged‑in user's role (e.g. analyst vs
 administrator) by adding appropriate permission classes.
 """
 
-from rest_framework import viewsets
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import filters, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
 
-from . import models, serializers
+from . import bulk, custody, intake, inventory, models, reservations, result_stats, search, serializers, spc, work_queue
+from .async_views import AsyncReadMixin
+from .conditional import ConditionalGetMixin
+from .expansion import ExpandableViewSetMixin
+from .exports import StreamingExportMixin
+from .fieldsets import SparseFieldsetMixin
+from .filters import RANGE_LOOKUPS, FieldFilterBackend
 
 
-class UserAccountViewSet(viewsets.ModelViewSet):
+class LimsModelViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    """Base class for the LIMS model viewsets."""
+
+
+class UserAccountViewSet(ConditionalGetMixin, LimsModelViewSet):
     queryset = models.UserAccount.objects.all()
     serializer_class = serializers.UserAccountSerializer
 
 
-class AnalystViewSet(viewsets.ModelViewSet):
+class AnalystViewSet(LimsModelViewSet):
     queryset = models.Analyst.objects.all()
     serializer_class = serializers.AnalystSerializer
 
 
-class AdministratorViewSet(viewsets.ModelViewSet):
+class AdministratorViewSet(LimsModelViewSet):
     queryset = models.Administrator.objects.all()
     serializer_class = serializers.AdministratorSerializer
 
 
-class SOPViewSet(viewsets.ModelViewSet):
+class SOPViewSet(ConditionalGetMixin, LimsModelViewSet):
     queryset = models.SOP.objects.all()
     serializer_class = serializers.SOPSerializer
 
 
-class UserSOPActionViewSet(viewsets.ModelViewSet):
+class UserSOPActionViewSet(LimsModelViewSet):
     queryset = models.UserSOPAction.objects.all()
     serializer_class = serializers.UserSOPActionSerializer
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(LimsModelViewSet):
     queryset = models.Client.objects.all()
     serializer_class = serializers.ClientSerializer
 
 
-class WarehouseViewSet(viewsets.ModelViewSet):
+class WarehouseViewSet(ConditionalGetMixin, ExpandableViewSetMixin, LimsModelViewSet):
     queryset = models.Warehouse.objects.all()
     serializer_class = serializers.WarehouseSerializer
+    etag_models = (models.SOP,)
 
 
-class WarehouseClientLinkViewSet(viewsets.ModelViewSet):
+class WarehouseClientLinkViewSet(LimsModelViewSet):
     queryset = models.WarehouseClientLink.objects.all()
     serializer_class = serializers.WarehouseClientLinkSerializer
 
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(ConditionalGetMixin, LimsModelViewSet):
     queryset = models.Location.objects.all()
     serializer_class = serializers.LocationSerializer
 
 
-class EquipmentViewSet(viewsets.ModelViewSet):
+class EquipmentViewSet(AsyncReadMixin, ExpandableViewSetMixin, LimsModelViewSet):
     queryset = models.Equipment.objects.all()
     serializer_class = serializers.EquipmentSerializer
-
-
-class MaintenanceLogViewSet(viewsets.ModelViewSet):
+    filter_backends = [FieldFilterBackend, filters.OrderingFilter]
+    filter_fields = {
+        "location": ["exact", "in"],
+        "sop": ["exact", "in"],
+        "in_use": ["exact"],
+        "out_of_service": ["exact"],
+    }
+    ordering_fields = ["id", "equipment_name"]
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def available(self, request):
+        """Instruments with free time in a window, with their free slots.
+
+        Accepts `?test=`, `?location=`, `?start=` (default now), `?hours=`
+        (default 4) or `?end=`, and `?duration=` in minutes (default: the
+        whole window).
+        """
+
+        query = serializers.AvailabilityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(reservations.available(**query.validated_data))
+
+
+class EquipmentReservationViewSet(LimsModelViewSet):
+    queryset = models.EquipmentReservation.objects.all()
+    serializer_class = serializers.EquipmentReservationSerializer
+    cursor_ordering = ("start_time", "id")
+    filter_backends = [FieldFilterBackend, filters.OrderingFilter]
+    filter_fields = {
+        "equipment": ["exact", "in"],
+        "equipment__location": ["exact", "in"],
+        "sample_test_link": ["exact"],
+        "reserved_by": ["exact", "in"],
+        "start_time": RANGE_LOOKUPS,
+        "end_time": RANGE_LOOKUPS,
+    }
+    ordering_fields = ["id", "start_time", "end_time"]
+
+    def perform_create(self, serializer):
+        reservations.save_reservation(serializer)
+
+    def perform_update(self, serializer):
+        reservations.save_reservation(serializer)
+
+
+class MaintenanceLogViewSet(LimsModelViewSet):
     queryset = models.MaintenanceLog.objects.all()
     serializer_class = serializers.MaintenanceLogSerializer
-
-
-class SampleViewSet(viewsets.ModelViewSet):
+    filter_backends = [FieldFilterBackend, filters.OrderingFilter]
+    filter_fields = {
+        "equipment": ["exact", "in"],
+        "sop": ["exact"],
+        "service_date": RANGE_LOOKUPS,
+        "next_service_date": RANGE_LOOKUPS,
+        "equipment__location": ["exact", "in"],
+    }
+    ordering_fields = ["id", "service_date", "next_service_date"]
+
+
+class SampleViewSet(AsyncReadMixin, ExpandableViewSetMixin, StreamingExportMixin, LimsModelViewSet):
     queryset = models.Sample.objects.all()
     serializer_class = serializers.SampleSerializer
-
-
-class InProcessViewSet(viewsets.ModelViewSet):
+    cursor_ordering = ("-time_received", "-id")
+    export_filename = "samples"
+    filter_backends = [FieldFilterBackend, filters.OrderingFilter]
+    filter_fields = {
+        "sample_type": ["exact", "in"],
+        "product_name": ["exact", "in", "icontains"],
+        "product_stage": ["exact"],
+        "storage_conditions": ["exact"],
+        "time_received": RANGE_LOOKUPS,
+        "quantity": RANGE_LOOKUPS,
+        "location": ["exact", "in"],
+        "warehouse": ["exact", "in"],
+        "sop": ["exact", "in"],
+    }
+    ordering_fields = ["id", "time_received", "product_name", "quantity"]
+    # sample_type -> serializer of the detail row returned by `intake/`.
+    detail_serializers = {
+        "I": serializers.InProcessSerializer,
+        "S": serializers.StabilitySerializer,
+        "F": serializers.FinishedProductSerializer,
+    }
+
+    @action(detail=False, methods=["post"], pagination_class=None)
+    def intake(self, request):
+        """Register a sample with its subtype detail and action log.
+
+        Takes the sample fields plus `action` (the `UserSampleAction`) and the
+        detail object matching `sample_type`: `in_process`, `stability` or
+        `finished_product`.
+        """
+
+        sample, detail, sample_action = intake.intake_sample(request.data)
+        detail_field, _ = intake.DETAIL_MODELS[sample.sample_type]
+        detail_serializer = self.detail_serializers[sample.sample_type]
+        return Response(
+            {
+                "sample": serializers.SampleSerializer(sample).data,
+                detail_field: detail_serializer(detail).data,
+                "action": serializers.UserSampleActionSerializer(sample_action).data,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["post"], url_path="intake/bulk", pagination_class=None)
+    def intake_bulk(self, request):
+        """Register a list of intakes in one transaction; all or nothing."""
+
+        ids = intake.intake_samples(request.data)
+        return Response({"created": len(ids), "ids": ids}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["get"], pagination_class=None)
+    def custody(self, request, pk=None):
+        """The sample's chain of custody: receipt, handling, moves, tests and
+        shipments from its warehouse, oldest first.
+        """
+
+        try:
+            sample_id = int(pk)
+        except ValueError:
+            raise NotFound(f"No sample with id {pk}.")
+        return Response(custody.timeline(sample_id))
+
+
+class InProcessViewSet(LimsModelViewSet):
     queryset = models.InProcess.objects.all()
     serializer_class = serializers.InProcessSerializer
 
 
-class StabilityViewSet(viewsets.ModelViewSet):
+class StabilityViewSet(LimsModelViewSet):
     queryset = models.Stability.objects.all()
     serializer_class = serializers.StabilitySerializer
 
 
-class FinishedProductViewSet(viewsets.ModelViewSet):
+class FinishedProductViewSet(LimsModelViewSet):
     queryset = models.FinishedProduct.objects.all()
     serializer_class = serializers.FinishedProductSerializer
 
 
-class UserSampleActionViewSet(viewsets.ModelViewSet):
+class UserSampleActionViewSet(LimsModelViewSet):
     queryset = models.UserSampleAction.objects.all()
     serializer_class = serializers.UserSampleActionSerializer
 
 
-class TestViewSet(viewsets.ModelViewSet):
+class TestViewSet(ExpandableViewSetMixin, LimsModelViewSet):
     queryset = models.Test.objects.all()
     serializer_class = serializers.TestSerializer
 
+    @action(detail=True, methods=["get"], pagination_class=None)
+    def stats(self, request, pk=None):
+        """Pass rate, mean, standard deviation and out-of-spec counts.
 
-class SampleTestLinkViewSet(viewsets.ModelViewSet):
-    queryset = models.SampleTestLink.objects.all()
-    serializer_class = serializers.SampleTestLinkSerializer
+        Reported overall, per product and per month of the result deadline.
+        """
+
+        test = self.get_object()
+        return Response(result_stats.test_statistics(test.pk))
+
+    def _charts(self, request):
+        test = self.get_object()
+        params = spc.ChartParams.from_query(request.query_params)
+        return test, spc.test_charts(test.pk, request.query_params.get("product_name") or None, params)
 
+    @action(detail=True, methods=["get"], pagination_class=None)
+    def spc(self, request, pk=None):
+        """Control limits, latest moving average/CUSUM and rule counts per product.
 
-class TestEquipmentLinkViewSet(viewsets.ModelViewSet):
+        Accepts `?product_name=`, `?window=`, `?baseline=`, `?k=` and `?h=`.
+        """
+
+        test, charts = self._charts(request)
+        return Response({"test": test.pk, "charts": charts["charts"]})
+
+    @action(detail=True, methods=["get"], url_path="spc/violations", pagination_class=None)
+    def spc_violations(self, request, pk=None):
+        """Stream every point violating a rule as NDJSON, in deadline order."""
+
+        _, charts = self._charts(request)
+        return StreamingHttpResponse(spc.iter_violations(charts["violations"]), content_type="application/x-ndjson")
+
+
+class SampleTestLinkViewSet(AsyncReadMixin, ExpandableViewSetMixin, StreamingExportMixin, LimsModelViewSet):
+    queryset = models.SampleTestLink.objects.all()
+    serializer_class = serializers.SampleTestLinkSerializer
+    cursor_ordering = ("deadline", "id")
+    export_filename = "sample-test-links"
+    filter_backends = [FieldFilterBackend, filters.OrderingFilter]
+    filter_fields = {
+        "sample": ["exact", "in"],
+        "test": ["exact", "in"],
+        "pass_or_fail": ["exact"],
+        "deadline": RANGE_LOOKUPS,
+        "test_result": RANGE_LOOKUPS,
+        "testing_analyst": ["exact", "in"],
+        "reviewing_analyst": ["exact", "in"],
+        "sample__sample_type": ["exact", "in"],
+        "sample__product_name": ["exact", "in"],
+        "test__sop": ["exact", "in"],
+    }
+    ordering_fields = ["id", "deadline", "test_result"]
+
+    @action(detail=False, methods=["post", "patch", "delete"], url_path="bulk")
+    def bulk(self, request):
+        """Create (POST), update (PATCH) or delete (DELETE) results in batch.
+
+        POST and PATCH take a list of result objects (PATCH rows must carry
+        `id`); DELETE takes a list of ids.  Any invalid row rejects the whole
+        batch with per-row errors.
+        """
+
+        if request.method == "POST":
+            ids = bulk.bulk_create_results(request.data)
+            return Response({"created": len(ids), "ids": ids}, status=status.HTTP_201_CREATED)
+        if request.method == "PATCH":
+            return Response({"updated": bulk.bulk_update_results(request.data)})
+        return Response({"deleted": bulk.bulk_delete_results(request.data)})
+
+
+class TestEquipmentLinkViewSet(LimsModelViewSet):
     queryset = models.TestEquipmentLink.objects.all()
     serializer_class = serializers.TestEquipmentLinkSerializer
 
 
-class ReagentViewSet(viewsets.ModelViewSet):
+class ReagentViewSet(LimsModelViewSet):
     queryset = models.Reagent.objects.all()
     serializer_class = serializers.ReagentSerializer
-
-
-class UserReagentActionViewSet(viewsets.ModelViewSet):
+    filter_backends = [FieldFilterBackend, filters.OrderingFilter]
+    filter_fields = {
+        "sop": ["exact", "in"],
+        "reagent_name": ["exact", "icontains"],
+        "cas_number": ["exact", "in"],
+        "lot_number": ["exact", "in"],
+        "vendor": ["exact", "in"],
+        "manufacturing_date": RANGE_LOOKUPS,
+        "expiration_date": RANGE_LOOKUPS,
+        "quantity_on_hand": RANGE_LOOKUPS,
+        "stockout_date": RANGE_LOOKUPS,
+    }
+    ordering_fields = ["id", "expiration_date", "manufacturing_date", "reagent_name", "stockout_date"]
+
+    @staticmethod
+    def _int_param(request, name: str, default: int) -> int:
+        raw = request.query_params.get(name)
+        if raw in (None, ""):
+            return default
+        try:
+            value = int(raw)
+        except ValueError:
+            raise ValidationError({name: ["A valid integer is required."]})
+        if value < 0:
+            raise ValidationError({name: ["Ensure this value is greater than or equal to 0."]})
+        return value
+
+    def _page(self, queryset):
+        queryset = self.filter_queryset(queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @action(detail=False, methods=["get"])
+    def expiring(self, request):
+        """Lots with stock left that expire within `?days=` (default 30).
+
+        Accepts the reagent list filters; `?ordering=expiration_date` lists
+        the soonest first.
+        """
+
+        return self._page(inventory.expiring(self._int_param(request, "days", 30)))
+
+    @action(detail=False, methods=["get"], url_path="low-stock")
+    def low_stock(self, request):
+        """Lots out of stock or projected to run out within `?days=`.
+
+        The projection is refreshed by `manage.py project_reagent_stock`.
+        """
+
+        days = self._int_param(request, "days", settings.LIMS_REAGENTS["LOW_STOCK_DAYS"])
+        return self._page(inventory.low_stock(days))
+
+    @action(detail=False, methods=["get"], url_path="blocked-tests", pagination_class=None)
+    def blocked_tests(self, request):
+        """Open tests needing a reagent with no usable lot, one row per reagent.
+
+        Returns at most `?limit=` rows (default 1000), in deadline order.
+        """
+
+        limit = min(self._int_param(request, "limit", 1000), settings.LIMS_MAX_PAGE_SIZE)
+        return Response(list(inventory.blocked_tests()[:limit]))
+
+
+class UserReagentActionViewSet(LimsModelViewSet):
     queryset = models.UserReagentAction.objects.all()
     serializer_class = serializers.UserReagentActionSerializer
 
 
-class TestReagentLinkViewSet(viewsets.ModelViewSet):
+class TestReagentLinkViewSet(LimsModelViewSet):
     queryset = models.TestReagentLink.objects.all()
     serializer_class = serializers.TestReagentLinkSerializer
 
 
-class VersionChangeViewSet(viewsets.ModelViewSet):
+class VersionChangeViewSet(LimsModelViewSet):
     queryset = models.VersionChange.objects.all()
     serializer_class = serializers.VersionChangeSerializer
+
+
+class AuditEntryViewSet(LimsModelViewSet):
+    queryset = models.AuditEntry.objects.all()
+    serializer_class = serializers.AuditEntrySerializer
+    http_method_names = ["get", "head", "options"]
+    cursor_ordering = ("-occurred_at", "-id")
+    filter_backends = [FieldFilterBackend, filters.OrderingFilter]
+    filter_fields = {
+        "model": ["exact", "in"],
+        "object_pk": ["exact", "in"],
+        "action": ["exact"],
+        "actor": ["exact", "in"],
+        "occurred_at": RANGE_LOOKUPS,
+    }
+    ordering_fields = ["id", "occurred_at"]
+
+
+class WorkQueueViewSet(viewsets.ViewSet):
+    """Open tests in deadline order, claimed by analysts.
+
+    `GET work-queue/?analyst=&equipment=&test=&limit=` lists the next tests
+    the analyst may take; `POST work-queue/claim/` claims them.  A claimed
+    test is handed back with `POST work-queue/{id}/release/` or closed with
+    `POST work-queue/{id}/complete/`.
+    """
+
+    def _validated(self, serializer_class, data) -> dict:
+        serializer = serializer_class(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def _items(self, objs) -> list:
+        return serializers.SampleTestLinkSerializer(objs, many=True).data
+
+    def list(self, request):
+        params = self._validated(serializers.WorkQueueQuerySerializer, request.query_params)
+        return Response(self._items(work_queue.next_due(**params)))
+
+    @action(detail=False, methods=["post"])
+    def claim(self, request):
+        params = self._validated(serializers.WorkQueueClaimSerializer, request.data)
+        return Response(self._items(work_queue.claim(**params)))
+
+    @action(detail=True, methods=["post"])
+    def release(self, request, pk=None):
+        params = self._validated(serializers.WorkQueueReleaseSerializer, request.data)
+        return Response(self._items([work_queue.release(self._pk(pk), **params)])[0])
+
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        params = self._validated(serializers.WorkQueueCompleteSerializer, request.data)
+        return Response(self._items([work_queue.complete(self._pk(pk), **params)])[0])
+
+    @staticmethod
+    def _pk(pk) -> int:
+        try:
+            return int(pk)
+        except ValueError:
+            raise NotFound(f"No open test with id {pk}.")
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """`GET search/?q=&types=&limit=`: samples, reagents, equipment and SOPs
+    matching `q`, best match first, as `{kind, id, text, score}` rows.
+    """
+
+    def list(self, request):
+        serializer = serializers.SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        return Response(search.search(params["q"], kinds=params.get("types"), limit=params["limit"]))
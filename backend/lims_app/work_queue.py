@@ -0,0 +1,130 @@
+"""
+Analyst work-queue over open sample tests.
+
+A `SampleTestLink` is open until its `completed_at` is set.  The queue is
+the set of open tests in deadline order, served by the partial index
+`result_open_deadline_idx` over `(deadline, id) WHERE completed_at IS NULL`.
+The database keeps that index current on every write, and completed tests
+drop out of it, so reading the next N due tests is a short index range scan
+however many results the table holds.
+
+* `next_due` lists the next tests an analyst can take: unclaimed ones, ones
+  whose claim has lapsed (`CLAIM_TIMEOUT`) and the analyst's own claims,
+  optionally narrowed to one test or to the tests run on one instrument
+  (through `TestEquipmentLink`).
+* `claim` takes the next N of those for an analyst.  Candidate rows are
+  locked with `select_for_update(skip_locked=True)`, so concurrent analysts
+  skip each other's rows instead of waiting or claiming the same test.
+  The update is also conditional on the row still being claimable, which
+  keeps claims exclusive on backends without row locks (SQLite).
+* `release` hands a claimed test back; `complete` records the result,
+  which is evaluated and counted like any other result save.
+
+The `work-queue/` endpoint exposes all four, its input validated by the
+`WorkQueue*Serializer` classes in `serializers.py`.  Settings live in
+`LIMS_WORK_QUEUE`.
+"""
+
+from __future__ import annotations
+
+import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+
+from . import models
+
+
+def _claimable(analyst: Optional[str], now: datetime.datetime) -> Q:
+    """Rows free to claim, plus `analyst`'s own claims."""
+
+    lapsed = now - datetime.timedelta(seconds=settings.LIMS_WORK_QUEUE["CLAIM_TIMEOUT"])
+    free = Q(claimed_by__isnull=True) | Q(claimed_at__lt=lapsed)
+    if analyst:
+        free |= Q(claimed_by=analyst)
+    return free
+
+
+def open_tests(equipment: Optional[int] = None, test: Optional[int] = None):
+    """Open tests in deadline order, optionally for one instrument or test."""
+
+    queryset = models.SampleTestLink.objects.filter(completed_at__isnull=True)
+    if test is not None:
+        queryset = queryset.filter(test_id=test)
+    if equipment is not None:
+        tests = models.TestEquipmentLink.objects.filter(equipment_id=equipment).values("test_id")
+        queryset = queryset.filter(test_id__in=tests)
+    return queryset.order_by("deadline", "id")
+
+
+def next_due(limit: int, analyst: Optional[str] = None, equipment: Optional[int] = None,
+             test: Optional[int] = None) -> list[models.SampleTestLink]:
+    """The next `limit` open tests `analyst` may work on."""
+
+    now = timezone.now()
+    return list(open_tests(equipment, test).filter(_claimable(analyst, now))[:limit])
+
+
+def claim(analyst: str, limit: int, equipment: Optional[int] = None,
+          test: Optional[int] = None) -> list[models.SampleTestLink]:
+    """Claim up to `limit` of the most urgent open tests for `analyst`.
+
+    Tests the analyst already holds are not claimed again.
+    """
+
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = (
+            open_tests(equipment, test)
+            .filter(_claimable(None, now))
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)[:limit]
+        )
+        pks = list(candidates)
+        models.SampleTestLink.objects.filter(pk__in=pks).filter(_claimable(None, now)).update(
+            claimed_by=analyst, claimed_at=now
+        )
+        claimed = models.SampleTestLink.objects.filter(pk__in=pks, claimed_by=analyst, claimed_at=now)
+        return list(claimed.order_by("deadline", "id"))
+
+
+def _held(pk: int, analyst: str) -> models.SampleTestLink:
+    """Lock an open test and check that `analyst` holds its claim."""
+
+    obj = models.SampleTestLink.objects.select_for_update().filter(pk=pk, completed_at__isnull=True).first()
+    if obj is None:
+        raise NotFound(f"No open test with id {pk}.")
+    if obj.claimed_by != analyst:
+        raise ValidationError({"analyst": [f"Test {pk} is not claimed by {analyst}."]})
+    return obj
+
+
+def release(pk: int, analyst: str) -> models.SampleTestLink:
+    """Hand a test claimed by `analyst` back to the queue."""
+
+    with transaction.atomic():
+        obj = _held(pk, analyst)
+        obj.claimed_by = None
+        obj.claimed_at = None
+        obj.save(update_fields=["claimed_by", "claimed_at"])
+    return obj
+
+
+def complete(pk: int, analyst: str, test_result, reviewing_analyst: Optional[str] = None) -> models.SampleTestLink:
+    """Record the result of a test claimed by `analyst` and close it."""
+
+    with transaction.atomic():
+        obj = _held(pk, analyst)
+        obj.test_result = test_result
+        obj.testing_analyst = analyst
+        obj.completed_at = timezone.now()
+        fields = ["test_result", "testing_analyst", "completed_at"]
+        if reviewing_analyst:
+            obj.reviewing_analyst = reviewing_analyst
+            fields.append("reviewing_analyst")
+        obj.save(update_fields=fields)
+    return obj
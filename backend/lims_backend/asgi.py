@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lims_backend.settings")
+# Serve the heavy list/detail reads from async views (lims_app/async_views.py).
+os.environ.setdefault("LIMS_ASYNC_READS", "true")
 
 application = get_asgi_application()
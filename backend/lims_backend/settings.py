@@ -10,6 +10,8 @@ or another relational database server.
 from pathlib import Path
 import os
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,12 +40,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that its wall time covers the whole middleware stack.
+    "lims_app.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "lims_app.audit.AuditMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -70,12 +75,65 @@ WSGI_APPLICATION = "lims_backend.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+#
+# LIMS_DB_ENGINE selects the profile: "sqlite" (default) or "postgresql".
+# See lims_app/database.py for what each profile tunes.
+LIMS_DB_ENGINE = os.environ.get("LIMS_DB_ENGINE", "sqlite").lower()
+
+if LIMS_DB_ENGINE in ("postgres", "postgresql"):
+    # Trigram lookups for the search index (lims_app/search.py).
+    INSTALLED_APPS.append("django.contrib.postgres")
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("LIMS_DB_NAME", "lims"),
+            "USER": os.environ.get("LIMS_DB_USER", "lims"),
+            "PASSWORD": os.environ.get("LIMS_DB_PASSWORD", ""),
+            "HOST": os.environ.get("LIMS_DB_HOST", "localhost"),
+            "PORT": os.environ.get("LIMS_DB_PORT", "5432"),
+            # Keep connections open across requests (seconds; 0 closes them
+            # after every request) and check them before reuse.
+            "CONN_MAX_AGE": int(os.environ.get("LIMS_DB_CONN_MAX_AGE", "60")),
+            "CONN_HEALTH_CHECKS": True,
+            # PgBouncer in transaction-pooling mode cannot hold the named
+            # cursors used by the streaming exports.
+            "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("LIMS_DB_PGBOUNCER", "false").lower()
+            in ("1", "true", "yes", "on"),
+            "OPTIONS": {},
+        }
+    }
+    # With psycopg 3 (Django 5.1+), LIMS_DB_POOL_SIZE > 0 replaces persistent
+    # connections with a per-process connection pool of that size.
+    LIMS_DB_POOL_SIZE = int(os.environ.get("LIMS_DB_POOL_SIZE", "0"))
+    if LIMS_DB_POOL_SIZE:
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {"min_size": 1, "max_size": LIMS_DB_POOL_SIZE}
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("LIMS_DB_NAME", BASE_DIR / "db.sqlite3"),
+            "OPTIONS": {},
+        }
     }
-}
+
+# SQLite tuning applied to every new connection (lims_app/database.py):
+# write-ahead logging so readers never block the writer, NORMAL syncs (safe
+# in WAL mode), memory-mapped reads and a busy timeout so concurrent writers
+# wait for the lock instead of failing.  LIMS_SQLITE_TUNING=false restores
+# SQLite's defaults.
+LIMS_SQLITE_TUNING = os.environ.get("LIMS_SQLITE_TUNING", "true").lower() in ("1", "true", "yes", "on")
+LIMS_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.environ.get("LIMS_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.environ.get("LIMS_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+} if LIMS_SQLITE_TUNING else {}
+if LIMS_SQLITE_TUNING and DATABASES["default"]["ENGINE"].endswith("sqlite3") and django.VERSION >= (5, 1):
+    # Take the write lock when a transaction begins, so that a transaction
+    # which reads before writing waits out the busy timeout instead of
+    # failing with "database is locked" when it tries to upgrade.
+    DATABASES["default"]["OPTIONS"]["transaction_mode"] = "IMMEDIATE"
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -118,3 +176,108 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
+
+# Django REST Framework
+# List endpoints use keyset (cursor) pagination; see lims_app/pagination.py.
+# Clients may pass `?paginate=false` to receive the full, unpaginated list.
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "lims_app.pagination.KeysetPagination",
+    "PAGE_SIZE": int(os.environ.get("LIMS_PAGE_SIZE", "100")),
+}
+
+# Upper bound for the `?page_size=` query parameter on list endpoints.
+LIMS_MAX_PAGE_SIZE = int(os.environ.get("LIMS_MAX_PAGE_SIZE", "1000"))
+
+# Rows fetched per database round trip by the streaming export endpoints.
+LIMS_EXPORT_CHUNK_SIZE = int(os.environ.get("LIMS_EXPORT_CHUNK_SIZE", "2000"))
+
+# Limits for the bulk results endpoint (`sample-test-links/bulk/`).
+LIMS_BULK_MAX_ROWS = int(os.environ.get("LIMS_BULK_MAX_ROWS", "50000"))
+LIMS_BULK_BATCH_SIZE = int(os.environ.get("LIMS_BULK_BATCH_SIZE", "1000"))
+
+# Lookup-table cache (see lims_app/lookup_cache.py).  Rows of SOP, Location,
+# Warehouse, Client and Test are kept in a per-process LRU for TIMEOUT
+# seconds.  Set LIMS_LOOKUP_SHARED_CACHE to the alias of an entry in CACHES
+# (e.g. a RedisCache, FileBasedCache or DatabaseCache) to share them between
+# worker processes as well.
+LIMS_LOOKUP_CACHE = {
+    "TIMEOUT": int(os.environ.get("LIMS_LOOKUP_CACHE_TIMEOUT", "60")),
+    "MAX_ENTRIES": int(os.environ.get("LIMS_LOOKUP_CACHE_MAX_ENTRIES", "10000")),
+    "SHARED_CACHE": os.environ.get("LIMS_LOOKUP_SHARED_CACHE") or None,
+}
+
+# Statistical process control charts (see lims_app/spc.py).  Computed charts
+# are cached in the CACHES entry named by LIMS_SPC_CACHE for TIMEOUT seconds,
+# keyed on the test's latest result, last result write and result count, so a
+# write to one of its results (or their samples' product) invalidates them.
+LIMS_SPC_CACHE = {
+    "ALIAS": os.environ.get("LIMS_SPC_CACHE", "default"),
+    "TIMEOUT": int(os.environ.get("LIMS_SPC_CACHE_TIMEOUT", "600")),
+}
+
+# Analyst work-queue of open tests (see lims_app/work_queue.py).  A claim
+# older than CLAIM_TIMEOUT seconds may be taken over by another analyst;
+# MAX_ITEMS caps `?limit=` on listings and claims.
+LIMS_WORK_QUEUE = {
+    "CLAIM_TIMEOUT": int(os.environ.get("LIMS_WORK_QUEUE_CLAIM_TIMEOUT", str(4 * 3600))),
+    "MAX_ITEMS": int(os.environ.get("LIMS_WORK_QUEUE_MAX_ITEMS", "500")),
+}
+
+# Equipment reservations (see lims_app/reservations.py).  MAX_HOURS bounds a
+# single booking, which keeps conflict checks a short index range scan;
+# MAX_SEARCH_DAYS bounds the window of `equipment/available/`.
+LIMS_RESERVATIONS = {
+    "MAX_HOURS": int(os.environ.get("LIMS_RESERVATION_MAX_HOURS", "72")),
+    "MAX_SEARCH_DAYS": int(os.environ.get("LIMS_RESERVATION_MAX_SEARCH_DAYS", "31")),
+}
+
+# Reagent inventory (see lims_app/inventory.py).  The stock-out projection
+# averages consumption over USAGE_WINDOW_DAYS; `reagents/low-stock/` lists
+# lots projected to run out within LOW_STOCK_DAYS unless `?days=` is given.
+LIMS_REAGENTS = {
+    "USAGE_WINDOW_DAYS": int(os.environ.get("LIMS_REAGENT_USAGE_WINDOW_DAYS", "30")),
+    "LOW_STOCK_DAYS": int(os.environ.get("LIMS_REAGENT_LOW_STOCK_DAYS", "14")),
+}
+
+# Unified search (see lims_app/search.py).  BACKEND is "postgres" (pg_trgm
+# index), "fts5" (SQLite trigram full-text table), "scan" or "auto" to pick
+# by database.  On SQLite, up to CANDIDATES matches are ranked per query;
+# MAX_RESULTS caps `?limit=`.
+LIMS_SEARCH = {
+    "BACKEND": os.environ.get("LIMS_SEARCH_BACKEND", "auto").lower(),
+    "CANDIDATES": int(os.environ.get("LIMS_SEARCH_CANDIDATES", "500")),
+    "MAX_RESULTS": int(os.environ.get("LIMS_SEARCH_MAX_RESULTS", "100")),
+}
+
+# Chain-of-custody timelines (see lims_app/custody.py).  Shipments from the
+# warehouses holding a sample are listed up to MAX_SHIPMENTS per timeline.
+LIMS_CUSTODY = {
+    "MAX_SHIPMENTS": int(os.environ.get("LIMS_CUSTODY_MAX_SHIPMENTS", "200")),
+}
+
+# Audit log (see lims_app/audit.py).  Entries are appended to a spill file
+# in SPILL_DIR and written by a background thread every FLUSH_INTERVAL
+# seconds, or sooner once BATCH_SIZE entries are waiting.  FSYNC forces each
+# append to disk, so entries also survive a power loss.  ASYNC=false writes
+# them when their transaction commits instead (scripts, tests).
+LIMS_AUDIT = {
+    "ENABLED": os.environ.get("LIMS_AUDIT", "true").lower() in ("1", "true", "yes", "on"),
+    "ASYNC": os.environ.get("LIMS_AUDIT_ASYNC", "true").lower() in ("1", "true", "yes", "on"),
+    "FLUSH_INTERVAL": float(os.environ.get("LIMS_AUDIT_FLUSH_INTERVAL", "1.0")),
+    "BATCH_SIZE": int(os.environ.get("LIMS_AUDIT_BATCH_SIZE", "1000")),
+    "SPILL_DIR": os.environ.get("LIMS_AUDIT_SPILL_DIR", str(BASE_DIR / "audit_spill")),
+    "FSYNC": os.environ.get("LIMS_AUDIT_FSYNC", "false").lower() in ("1", "true", "yes", "on"),
+}
+
+# Serve GET list/retrieve of the heaviest viewsets from async handlers (see
+# lims_app/async_views.py).  Enabled by lims_backend/asgi.py; leave it off
+# under WSGI.
+LIMS_ASYNC_READS = os.environ.get("LIMS_ASYNC_READS", "false").lower() in ("1", "true", "yes", "on")
+
+# Per-route request metrics served at /api/metrics/ (see lims_app/metrics.py).
+# A request that runs one SQL statement N_PLUS_ONE_THRESHOLD times or more
+# is logged as a likely N+1 query pattern.
+LIMS_METRICS = {
+    "ENABLED": os.environ.get("LIMS_METRICS", "true").lower() in ("1", "true", "yes", "on"),
+    "N_PLUS_ONE_THRESHOLD": int(os.environ.get("LIMS_METRICS_N_PLUS_ONE_THRESHOLD", "10")),
+}
@@ -7,9 +7,13 @@ import axios from 'axios';
  * to production you should adjust this value to the correct host and
  * optionally set up a reverse proxy (e.g. Nginx) to serve both the
  * frontend and backend from the same domain.
+ *
+ * The pages currently expect list endpoints to return plain arrays, so
+ * every request opts into the backend's legacy unpaginated mode.
  */
 const api = axios.create({
   baseURL: 'http://localhost:8000/api/',
+  params: { paginate: 'false' },
 });
 
 export default api;
\ No newline at end of file
@@ -42,9 +42,9 @@ interface Result {
 /**
  * ResultsPage displays sample test links (results) and provides a form
  * to add new results.  To improve user experience it fetches lists
- * of samples and tests so users can select from dropdowns.  When a
- * result is submitted the pass_or_fail field is computed on the
- * client based on the selected test's acceptable result range.
+ * of samples and tests so users can select from dropdowns.  The
+ * pass_or_fail verdict is computed by the backend from the selected
+ * test's acceptable result range.
  */
 const ResultsPage: React.FC = () => {
   const [results, setResults] = useState<Result[]>([]);
@@ -75,24 +75,7 @@ const ResultsPage: React.FC = () => {
 
   const handleSubmit = (e: FormEvent) => {
     e.preventDefault();
-    // Find the selected test to compute pass/fail
-    const selectedTest = tests.find((t) => t.id === Number(formData.test));
     const resultValue = Number(formData.test_result);
-    let pass = true;
-    if (selectedTest) {
-      if (
-        selectedTest.min_acceptable_result !== null &&
-        resultValue < selectedTest.min_acceptable_result
-      ) {
-        pass = false;
-      }
-      if (
-        selectedTest.max_acceptable_result !== null &&
-        resultValue > selectedTest.max_acceptable_result
-      ) {
-        pass = false;
-      }
-    }
     const payload = {
       sample: Number(formData.sample),
       test: Number(formData.test),
@@ -100,7 +83,6 @@ const ResultsPage: React.FC = () => {
       reviewing_analyst: formData.reviewing_analyst,
       test_result: resultValue,
       deadline: formData.deadline,
-      pass_or_fail: pass,
     };
     api
       .post('sample-test-links/', payload)